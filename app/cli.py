@@ -0,0 +1,96 @@
+import os
+import argparse
+from app.repositories.file_repository import FileRepository
+from app.repositories.journal_metadata_repository import JournalMetadataRepository
+from app.repositories.sqlite_metadata_repository import SqliteMetadataRepository
+from app.repositories.upload_session_repository import UploadSessionRepository
+from app.static_files import precompress_directory
+
+def import_metadata(args: argparse.Namespace):
+    """Import an existing metadata.json file into the SQLite metadata database."""
+
+    repo = SqliteMetadataRepository(database_file=args.database)
+    try:
+        imported = repo.import_json(args.metadata)
+    finally:
+        repo.close()
+    print(f"Imported {imported} entries from {args.metadata} into {args.database}.")
+
+def compact_journal(args: argparse.Namespace):
+    """Fold the metadata journal into metadata.json."""
+
+    repo = JournalMetadataRepository(metadata_file=args.metadata)
+    folded = repo.compact()
+    print(f"Compacted {folded} journal entries into {args.metadata}.")
+
+def gc_blobs(args: argparse.Namespace):
+    """Remove content-addressed blobs that no upload references any more."""
+
+    repo = FileRepository(upload_dir=args.upload_dir, content_addressed=True)
+    removed = repo.collect_garbage()
+    print(f"Removed {removed} unreferenced blobs from {args.upload_dir}.")
+
+def migrate_uploads(args: argparse.Namespace):
+    """Move uploads from the flat layout into the sharded layout while the server keeps running."""
+
+    repo = FileRepository(upload_dir=args.upload_dir, shard_depth=args.depth)
+    total = 0
+    for moved in repo.migrate_to_shards(batch_size=args.batch_size, grace_seconds=args.grace):
+        total += moved
+        print(f"Moved {total} files so far.")
+    print(f"Moved {total} files into {args.depth}-level shards under {args.upload_dir}.")
+
+def gc_uploads(args: argparse.Namespace):
+    """Remove resumable upload sessions that have been abandoned."""
+
+    staging_dir = os.path.join(args.upload_dir, UploadSessionRepository.STAGING_DIR_NAME)
+    repo = UploadSessionRepository(staging_dir=staging_dir, session_ttl_seconds=args.ttl_hours * 3600)
+    removed = repo.collect_expired()
+    print(f"Removed {removed} expired upload sessions from {staging_dir}.")
+
+def precompress_static(args: argparse.Namespace):
+    """Write .gz / .br siblings for the static assets."""
+
+    written = precompress_directory(args.static_dir)
+    print(f"Wrote {written} precompressed files under {args.static_dir}.")
+
+def main(argv: list = None):
+    """Entry point for `python -m app.cli`."""
+
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="ClassDrop maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_import = commands.add_parser("import-metadata", help="Import metadata.json into a SQLite database.")
+    parser_import.add_argument("--metadata", default="metadata.json", help="Path to the metadata.json file.")
+    parser_import.add_argument("--database", default="metadata.db", help="Path to the SQLite database file.")
+    parser_import.set_defaults(func=import_metadata)
+
+    parser_compact = commands.add_parser("compact-journal", help="Fold the metadata journal into metadata.json.")
+    parser_compact.add_argument("--metadata", default="metadata.json", help="Path to the metadata.json snapshot.")
+    parser_compact.set_defaults(func=compact_journal)
+
+    parser_gc = commands.add_parser("gc-blobs", help="Remove unreferenced content-addressed blobs.")
+    parser_gc.add_argument("--upload-dir", default="uploads", help="Path to the upload directory.")
+    parser_gc.set_defaults(func=gc_blobs)
+
+    parser_migrate = commands.add_parser("migrate-uploads", help="Move flat uploads into sharded directories.")
+    parser_migrate.add_argument("--upload-dir", default="uploads", help="Path to the upload directory.")
+    parser_migrate.add_argument("--depth", type=int, default=2, help="Number of shard directory levels.")
+    parser_migrate.add_argument("--batch-size", type=int, default=1000, help="Files moved per batch.")
+    parser_migrate.add_argument("--grace", type=float, default=5.0, help="Seconds to keep the old names of each batch.")
+    parser_migrate.set_defaults(func=migrate_uploads)
+
+    parser_gc_uploads = commands.add_parser("gc-uploads", help="Remove abandoned resumable upload sessions.")
+    parser_gc_uploads.add_argument("--upload-dir", default="uploads", help="Path to the upload directory.")
+    parser_gc_uploads.add_argument("--ttl-hours", type=float, default=24, help="Hours of inactivity before a session is removed.")
+    parser_gc_uploads.set_defaults(func=gc_uploads)
+
+    parser_precompress = commands.add_parser("precompress-static", help="Write .gz / .br siblings for static assets.")
+    parser_precompress.add_argument("--static-dir", default="app/static", help="Path to the static assets directory.")
+    parser_precompress.set_defaults(func=precompress_static)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import asyncio
+import contextvars
+from typing import AsyncIterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from app import config
+
+# Bounded pool of threads for blocking file and metadata I/O. Requests that
+# find every thread busy wait on the event loop instead of blocking it.
+_io_executor: ThreadPoolExecutor | None = None
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Return the process-wide I/O thread pool, creating it on first use."""
+
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=config.IO_THREADS, thread_name_prefix="classdrop-io")
+    return _io_executor
+
+async def run_io(func, *args, **kwargs):
+    """
+    Run a blocking call on the I/O thread pool and await its result.
+    Context variables are copied into the worker thread.
+    """
+
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_io_executor(), partial(context.run, func, *args, **kwargs))
+
+def iterate_from_thread(parts: AsyncIterable[bytes], loop: asyncio.AbstractEventLoop) -> Iterator[bytes]:
+    """
+    Iterate an async stream, such as a request body, from an I/O thread:
+    each part is fetched on the event loop only when the blocking writer
+    asks for the next one, so the body is never buffered as a whole.
+    Returns an iterator of the parts.
+    """
+
+    iterator = parts.__aiter__()
+
+    async def next_part():
+        return await iterator.__anext__()
+
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(next_part(), loop).result()
+        except StopAsyncIteration:
+            return
+
+def shutdown_io_executor():
+    """Wait for queued I/O to finish and release the thread pool."""
+
+    global _io_executor
+    if _io_executor is not None:
+        _io_executor.shutdown(wait=True)
+        _io_executor = None
@@ -0,0 +1,62 @@
+import os
+
+# Directory where uploaded files are stored
+UPLOAD_DIR: str = os.environ.get("CLASSDROP_UPLOAD_DIR", "uploads")
+
+# Metadata file used by the "json" and "journal" backends
+METADATA_FILE: str = os.environ.get("CLASSDROP_METADATA_FILE", "metadata.json")
+
+# Metadata storage backend: "json" (metadata.json, default), "journal" or "sqlite"
+METADATA_BACKEND: str = os.environ.get("CLASSDROP_METADATA_BACKEND", "json")
+
+# Database file used when METADATA_BACKEND is "sqlite"
+METADATA_DATABASE_FILE: str = os.environ.get("CLASSDROP_METADATA_DATABASE_FILE", "metadata.db")
+
+# Store each distinct upload once under uploads/.blobs and hard-link duplicates to it
+CONTENT_ADDRESSED_STORAGE: bool = os.environ.get("CLASSDROP_CONTENT_ADDRESSED_STORAGE", "0") == "1"
+
+# Store compressible uploads gzip-compressed and serve them with Content-Encoding where accepted
+COMPRESS_AT_REST: bool = os.environ.get("CLASSDROP_COMPRESS_AT_REST", "0") == "1"
+
+# Number of two-hex-digit directory levels under uploads/ (0 = flat, 2 = uploads/ab/cd/<file>)
+UPLOAD_SHARD_DEPTH: int = int(os.environ.get("CLASSDROP_UPLOAD_SHARD_DEPTH", "0"))
+
+# Threads available for blocking file and metadata I/O in each worker process
+IO_THREADS: int = int(os.environ.get("CLASSDROP_IO_THREADS", "32"))
+
+# Milliseconds the "json" backend waits to group concurrent metadata writes into one commit
+METADATA_GROUP_COMMIT_MS: float = float(os.environ.get("CLASSDROP_METADATA_GROUP_COMMIT_MS", "2"))
+
+# Seconds a metadata write waits for the file lock before the request is answered with 503
+METADATA_LOCK_TIMEOUT: float = float(os.environ.get("CLASSDROP_METADATA_LOCK_TIMEOUT", "5"))
+
+# Initial and largest pause between attempts to take a busy metadata lock, in milliseconds (doubling in between)
+METADATA_LOCK_POLL_MS: float = float(os.environ.get("CLASSDROP_METADATA_LOCK_POLL_MS", "5"))
+METADATA_LOCK_MAX_POLL_MS: float = float(os.environ.get("CLASSDROP_METADATA_LOCK_MAX_POLL_MS", "100"))
+
+# Largest file accepted through a resumable upload session, in MB
+MAX_UPLOAD_SESSION_MB: float = float(os.environ.get("CLASSDROP_MAX_UPLOAD_SESSION_MB", "2048"))
+
+# Size of each chunk of a resumable upload, in bytes
+UPLOAD_SESSION_CHUNK_SIZE: int = int(os.environ.get("CLASSDROP_UPLOAD_SESSION_CHUNK_SIZE", str(8 * 1024 * 1024)))
+
+# Hours without activity after which a resumable upload session is discarded
+UPLOAD_SESSION_TTL_HOURS: float = float(os.environ.get("CLASSDROP_UPLOAD_SESSION_TTL_HOURS", "24"))
+
+# How downloads are sent: "direct" (streamed by the worker), "x-accel-redirect" (nginx) or "x-sendfile"
+DOWNLOAD_MODE: str = os.environ.get("CLASSDROP_DOWNLOAD_MODE", "direct")
+
+# nginx internal location that maps to the upload directory, used with "x-accel-redirect"
+DOWNLOAD_INTERNAL_PREFIX: str = os.environ.get("CLASSDROP_DOWNLOAD_INTERNAL_PREFIX", "/internal-uploads/")
+
+# Directory where each worker process writes its metrics so /metrics can add them up (unset = single process)
+METRICS_DIR: str | None = os.environ.get("CLASSDROP_METRICS_DIR") or None
+
+# Runtime type checks (typeguard) on service and repository methods; set to "0" in production to skip them
+TYPECHECK: bool = os.environ.get("CLASSDROP_TYPECHECK", "1") == "1"
+
+# Worker processes for background jobs on new uploads (0 = do that work inline, without a job queue)
+JOB_WORKERS: int = int(os.environ.get("CLASSDROP_JOB_WORKERS", "0"))
+
+# SQLite database holding the background job queue
+JOB_DATABASE_FILE: str = os.environ.get("CLASSDROP_JOB_DATABASE_FILE", "jobs.db")
@@ -0,0 +1,90 @@
+import os
+from app import config
+from app.services.file_service import FileService
+from app.repositories.file_repository import FileRepository
+from app.repositories.upload_session_repository import UploadSessionRepository
+from app.repositories.job_repository import JobRepository
+from app.services.job_dispatcher import JobDispatcher
+from app.repositories.metadata_repository import MetadataRepository
+from app.repositories.journal_metadata_repository import JournalMetadataRepository
+from app.repositories.sqlite_metadata_repository import SqliteMetadataRepository
+
+def build_metadata_repository() -> MetadataRepository | SqliteMetadataRepository:
+    """
+    Creates the metadata repository selected by CLASSDROP_METADATA_BACKEND.
+    Raises ValueError for an unknown backend.
+    """
+    if config.METADATA_BACKEND == "json":
+        return MetadataRepository(
+            metadata_file=config.METADATA_FILE,
+            group_commit_window=config.METADATA_GROUP_COMMIT_MS / 1000,
+            **_lock_options(),
+        )
+    if config.METADATA_BACKEND == "journal":
+        return JournalMetadataRepository(metadata_file=config.METADATA_FILE, **_lock_options())
+    if config.METADATA_BACKEND == "sqlite":
+        return SqliteMetadataRepository(database_file=config.METADATA_DATABASE_FILE)
+
+    raise ValueError(f"Unknown metadata backend: {config.METADATA_BACKEND}")
+
+def _lock_options() -> dict:
+    """Metadata lock timeout and backoff of the file-based backends, in seconds."""
+
+    return {
+        "lock_timeout": config.METADATA_LOCK_TIMEOUT,
+        "lock_poll_interval": config.METADATA_LOCK_POLL_MS / 1000,
+        "lock_max_poll_interval": config.METADATA_LOCK_MAX_POLL_MS / 1000,
+    }
+
+class ServiceContainer:
+    """Application-scoped service graph, built once at startup and shared by every request."""
+
+    def __init__(self, file_service: FileService, job_dispatcher: JobDispatcher = None):
+        self.file_service = file_service
+        self.job_dispatcher = job_dispatcher
+
+    @classmethod
+    def from_config(cls) -> "ServiceContainer":
+        """Build the repositories and services described by app.config."""
+
+        if config.DOWNLOAD_MODE not in ("direct", "x-accel-redirect", "x-sendfile"):
+            raise ValueError(f"Unknown download mode: {config.DOWNLOAD_MODE}")
+
+        file_repo = FileRepository(
+            upload_dir=config.UPLOAD_DIR,
+            content_addressed=config.CONTENT_ADDRESSED_STORAGE,
+            shard_depth=config.UPLOAD_SHARD_DEPTH,
+            compress=config.COMPRESS_AT_REST,
+        )
+        metadata_repo = build_metadata_repository()
+        upload_session_repo = UploadSessionRepository(
+            staging_dir=os.path.join(config.UPLOAD_DIR, UploadSessionRepository.STAGING_DIR_NAME),
+            chunk_size=config.UPLOAD_SESSION_CHUNK_SIZE,
+            session_ttl_seconds=config.UPLOAD_SESSION_TTL_HOURS * 3600,
+        )
+        job_repo = JobRepository(database_file=config.JOB_DATABASE_FILE) if config.JOB_WORKERS > 0 else None
+        file_service = FileService(
+            file_repo=file_repo,
+            metadata_repo=metadata_repo,
+            upload_session_repo=upload_session_repo,
+            max_session_size_mb=config.MAX_UPLOAD_SESSION_MB,
+            job_repo=job_repo,
+        )
+        job_dispatcher = None
+        if job_repo is not None:
+            job_dispatcher = JobDispatcher(job_repo, file_service, max_workers=config.JOB_WORKERS)
+        return cls(file_service, job_dispatcher)
+
+    def start(self):
+        """Start the background job dispatcher, if there is one."""
+
+        if self.job_dispatcher is not None:
+            self.job_dispatcher.start()
+
+    def close(self):
+        """Stop the job dispatcher and release resources held by the repositories."""
+
+        if self.job_dispatcher is not None:
+            self.job_dispatcher.stop()
+            self.job_dispatcher.job_repo.close()
+        self.file_service.metadata_repo.close()
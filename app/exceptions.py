@@ -1,35 +1,57 @@
 import json
+import sqlite3
 from filelock import Timeout
 from fastapi import HTTPException, status
 from functools import wraps
+from app.metrics import count_error
 
 def handle_file_errors(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
-        except Timeout:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Server busy, please try again shortly."
-            )
-        except FileNotFoundError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Requested file not found."
-            )
-        except json.JSONDecodeError:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Metadata corrupted. Please contact the administrator."
-            )
+        except GroupCommitFailedException as e:
+            # A caller whose write was batched with a failed one is answered as the batch's own error
+            raise _to_http_exception(e.__cause__)
         except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Unexpected server error: {str(e)}"
-            )
+            raise _to_http_exception(e)
     return wrapper
 
+def _to_http_exception(e: BaseException) -> HTTPException:
+    """
+    Count an error from the metadata or file layer and translate it.
+    Returns the HTTPException to raise in its place.
+    """
+
+    count_error(e)
+    if isinstance(e, Timeout):
+        # InstrumentedLock estimates the wait from recent lock hold times
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please try again shortly.",
+            headers={"Retry-After": str(getattr(e, "retry_after", 1))}
+        )
+    if isinstance(e, FileNotFoundError):
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Requested file not found."
+        )
+    if isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e)):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please try again shortly.",
+            headers={"Retry-After": "1"}
+        )
+    if isinstance(e, json.JSONDecodeError):
+        return HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Metadata corrupted. Please contact the administrator."
+        )
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f"Unexpected server error: {str(e)}"
+    )
+
 class FileSizeExceededException(Exception):
     """Exception raised when a file exceeds the maximum allowed size."""
     def __init__(self, message: str = "File size exceeds the allowed limit."):
@@ -47,4 +69,34 @@ class InvalidFilenameException(Exception):
     """Exception raised when a filename is contains invalid characters."""
     def __init__(self, message: str = "Filename contains invalid characters."):
         self.message = message
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+class InvalidCursorException(Exception):
+    """Exception raised when a pagination cursor cannot be decoded."""
+    def __init__(self, message: str = "Cursor is malformed."):
+        self.message = message
+        super().__init__(self.message)
+
+class UploadSessionNotFoundException(Exception):
+    """Exception raised when a resumable upload session does not exist or has expired."""
+    def __init__(self, message: str = "Upload session not found."):
+        self.message = message
+        super().__init__(self.message)
+
+class InvalidUploadChunkException(Exception):
+    """Exception raised when an upload chunk has the wrong index or length."""
+    def __init__(self, message: str = "Upload chunk is invalid."):
+        self.message = message
+        super().__init__(self.message)
+
+class IncompleteUploadException(Exception):
+    """Exception raised when an upload session is completed before all chunks arrived."""
+    def __init__(self, message: str = "Upload is missing chunks."):
+        self.message = message
+        super().__init__(self.message)
+
+class GroupCommitFailedException(Exception):
+    """Exception raised to each caller whose metadata write was in a group commit that failed."""
+    def __init__(self, message: str = "The metadata write batched with this one failed."):
+        self.message = message
+        super().__init__(self.message)
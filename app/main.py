@@ -1,19 +1,48 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, status, Request
 from fastapi.responses import RedirectResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
-from app.routes import course_router, files_router, professor_router
+from app.routes import course_router, files_router, metrics_router, professor_router, uploads_router
 from app.middleware import catch_exceptions_middleware  # Import the middleware
+from app.container import ServiceContainer
+from app.static_files import PrecompressedStaticFiles, precompress_directory
+from app.concurrency import shutdown_io_executor
+from app.metrics import MetricsMiddleware, count_error, get_registry
 import app.exceptions as ex
 
-app = FastAPI(title="ClassDrop API", description="API for Class File Sharing.")
+STATIC_DIR = "app/static"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the service graph once at startup and release it on shutdown."""
+
+    try:
+        precompress_directory(STATIC_DIR)
+    except OSError:
+        pass  # A read-only deployment serves whatever siblings were built into it
+
+    container = ServiceContainer.from_config()
+    app.state.container = container
+    container.start()
+    get_registry().start_flusher()
+    try:
+        yield
+    finally:
+        shutdown_io_executor()
+        container.close()
+        get_registry().stop_flusher()
+        get_registry().flush(force=True)
+
+app = FastAPI(title="ClassDrop API", description="API for Class File Sharing.", lifespan=lifespan)
 
 # Include routers
+app.include_router(uploads_router.router)
 app.include_router(files_router.router)
 app.include_router(course_router.router)
 app.include_router(professor_router.router)
+app.include_router(metrics_router.router)
 
 # Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR), name="static")
 
 # Redirect root to /course
 @app.get("/")
@@ -24,10 +53,12 @@ async def root():
 
 # Register middleware
 app.middleware('http')(catch_exceptions_middleware)
+app.add_middleware(MetricsMiddleware, routes=app.router.routes)  # Outermost, so it also sees 500s
 
 # Exception handlers
 @app.exception_handler(ex.FileSizeExceededException)
 async def file_size_exceeded_exception_handler(request: Request, exc: ex.FileSizeExceededException):
+    count_error(exc)
     return JSONResponse(
         status_code=status.HTTP_413_CONTENT_TOO_LARGE,
         content={"detail": exc.message},
@@ -35,6 +66,7 @@ async def file_size_exceeded_exception_handler(request: Request, exc: ex.FileSiz
 
 @app.exception_handler(FileNotFoundError)
 async def file_not_found_exception_handler(request: Request, exc: FileNotFoundError):
+    count_error(exc)
     return JSONResponse(
         status_code=status.HTTP_404_NOT_FOUND,
         content={"detail": str(exc)},
@@ -42,6 +74,7 @@ async def file_not_found_exception_handler(request: Request, exc: FileNotFoundEr
 
 @app.exception_handler(ex.DangerousFileExtensionException)
 async def dangerous_file_extension_exception_handler(request: Request, exc: ex.DangerousFileExtensionException):
+    count_error(exc)
     return JSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST,
         content={"detail": exc.message},
@@ -49,7 +82,40 @@ async def dangerous_file_extension_exception_handler(request: Request, exc: ex.D
 
 @app.exception_handler(ex.InvalidFilenameException)
 async def validation_exception_handler(request: Request, exc: ex.InvalidFilenameException):
+    count_error(exc)
     return JSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST,
         content={"detail": str(exc)},
-    )
\ No newline at end of file
+    )
+
+@app.exception_handler(ex.InvalidCursorException)
+async def invalid_cursor_exception_handler(request: Request, exc: ex.InvalidCursorException):
+    count_error(exc)
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": exc.message},
+    )
+
+@app.exception_handler(ex.UploadSessionNotFoundException)
+async def upload_session_not_found_exception_handler(request: Request, exc: ex.UploadSessionNotFoundException):
+    count_error(exc)
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content={"detail": exc.message},
+    )
+
+@app.exception_handler(ex.InvalidUploadChunkException)
+async def invalid_upload_chunk_exception_handler(request: Request, exc: ex.InvalidUploadChunkException):
+    count_error(exc)
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": exc.message},
+    )
+
+@app.exception_handler(ex.IncompleteUploadException)
+async def incomplete_upload_exception_handler(request: Request, exc: ex.IncompleteUploadException):
+    count_error(exc)
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": exc.message},
+    )
@@ -0,0 +1,325 @@
+import os
+import json
+import time
+import threading
+from fastapi import HTTPException
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app import config
+from app.concurrency import run_io
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help text); label names are given where the metric is updated
+METRICS = {
+    "classdrop_http_requests_total": ("counter", "HTTP requests by route, method and status code."),
+    "classdrop_http_request_duration_seconds": ("histogram", "HTTP request latency by route and method."),
+    "classdrop_http_requests_in_flight": ("gauge", "HTTP requests currently being served."),
+    "classdrop_http_request_body_bytes_total": ("counter", "Request body bytes received (uploads)."),
+    "classdrop_http_response_body_bytes_total": ("counter", "Response body bytes sent by the worker (downloads)."),
+    "classdrop_errors_total": ("counter", "Errors by exception type, as mapped by the exception handlers."),
+    "classdrop_metadata_entries": ("gauge", "Number of entries in the metadata store."),
+    "classdrop_lock_wait_seconds": ("histogram", "Time spent waiting to acquire a file lock."),
+    "classdrop_lock_hold_seconds": ("histogram", "Time a file lock was held."),
+    "classdrop_lock_waiters": ("gauge", "Callers currently waiting for a file lock."),
+    "classdrop_lock_timeouts_total": ("counter", "Lock acquisitions that gave up after the timeout."),
+}
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms of one worker process. With a metrics
+    directory configured, each process periodically writes its values to a
+    file of its own there, and rendering sums the files of every worker;
+    gauges are only taken from workers that are still running. A file is
+    only taken as a running worker's if it is the newest one with its pid,
+    so a restarted worker that reuses a pid does not revive old gauges.
+    """
+
+    FLUSH_INTERVAL: float = 1.0
+
+    def __init__(self, directory: str | None = None):
+        self.directory = directory
+        self.values = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        # Serialises writes of this process's file, which share one temporary path
+        self.flush_lock = threading.Lock()
+        self.last_flush = 0.0
+        self.started = time.time_ns()
+        self.file_name = f"{os.getpid()}-{self.started}.json"
+        # Background thread that keeps the file current while no requests arrive
+        self.flusher = None
+        self.stop_flushing = threading.Event()
+
+    def inc(self, name: str, labels: tuple, amount: float = 1):
+        """Add amount to a counter or gauge."""
+
+        key = (name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name: str, labels: tuple, value: float):
+        """Record one observation in a histogram."""
+
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * len(DURATION_BUCKETS) + [0, 0.0]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-2] += 1
+            histogram[-1] += value
+
+    def snapshot(self) -> dict:
+        """Return this process's values in a JSON-friendly form."""
+
+        with self.lock:
+            return {
+                "pid": os.getpid(),
+                "started": self.started,
+                "values": [[name, list(labels), value] for (name, labels), value in self.values.items()],
+                "histograms": [[name, list(labels), list(h)] for (name, labels), h in self.histograms.items()],
+            }
+
+    def flush_due(self) -> bool:
+        """Check, without any I/O, whether flush() would write anything now."""
+
+        return self.directory is not None and time.monotonic() - self.last_flush >= self.FLUSH_INTERVAL
+
+    def flush(self, force: bool = False):
+        """
+        Write this process's values to the metrics directory, at most every
+        FLUSH_INTERVAL unless forced. Blocking: call it through run_io from
+        the event loop.
+        """
+
+        with self.flush_lock:
+            if self.directory is None or (not force and not self.flush_due()):
+                return
+            self.last_flush = time.monotonic()
+
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, self.file_name)
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(f"{path}.tmp", path)
+
+    def start_flusher(self):
+        """
+        Flush from a daemon thread every FLUSH_INTERVAL, starting now, so
+        that an idle worker's file is not left behind its counters, or with
+        the in-flight gauge of its last burst.
+        """
+
+        if self.directory is None or self.flusher is not None:
+            return
+        self.stop_flushing.clear()
+        self.flusher = threading.Thread(target=self._flush_periodically, name="metrics-flusher", daemon=True)
+        self.flusher.start()
+
+    def stop_flusher(self):
+        """Stop the background flushes; the caller does the final flush(force=True)."""
+
+        if self.flusher is None:
+            return
+        self.stop_flushing.set()
+        self.flusher.join()
+        self.flusher = None
+
+    def _flush_periodically(self):
+        """Body of the flusher thread."""
+
+        while True:
+            try:
+                self.flush()
+            except OSError:
+                pass  # Written again on the next tick
+            if self.stop_flushing.wait(self.FLUSH_INTERVAL):
+                return
+
+    def collect(self) -> tuple:
+        """
+        Merge the values of every worker.
+        Returns (values, histograms) keyed by (name, labels).
+        """
+
+        own = self.snapshot()
+        snapshots = [own]
+        if self.directory is not None and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json") or name == self.file_name:
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+
+        # Only the newest file of a pid can belong to a running worker
+        newest = {}
+        for snapshot in snapshots:
+            newest[snapshot["pid"]] = max(newest.get(snapshot["pid"], 0), snapshot.get("started", 0))
+
+        values, histograms = {}, {}
+        for snapshot in snapshots:
+            alive = snapshot is own or (
+                snapshot.get("started", 0) == newest[snapshot["pid"]] and is_process_alive(snapshot["pid"])
+            )
+            for name, labels, value in snapshot["values"]:
+                if METRICS[name][0] == "gauge" and not alive:
+                    continue
+                key = (name, tuple(map(tuple, labels)))
+                values[key] = values.get(key, 0) + value
+            for name, labels, histogram in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.setdefault(key, [0] * len(histogram))
+                histograms[key] = [a + b for a, b in zip(merged, histogram)]
+        return values, histograms
+
+    def render(self, extra: dict | None = None) -> str:
+        """
+        Render the merged metrics in the Prometheus text exposition format.
+        extra maps (name, labels) to values computed at scrape time.
+        """
+
+        values, histograms = self.collect()
+        values.update(extra or {})
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            series = [(labels, value) for (n, labels), value in values.items() if n == name]
+            series += [(labels, h) for (n, labels), h in histograms.items() if n == name]
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(series, key=lambda item: item[0]):
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS, value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {value[-2]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value[-2]}")
+        return "\n".join(lines) + "\n"
+
+
+_registry: MetricsRegistry | None = None
+
+def get_registry() -> MetricsRegistry:
+    """Return the process-wide metrics registry, creating it on first use."""
+
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry(directory=config.METRICS_DIR)
+    return _registry
+
+def count_error(exc: BaseException):
+    """Count an exception handled by handle_file_errors or an exception handler in app.main."""
+
+    # Already mapped (and counted) by an inner handle_file_errors
+    if isinstance(exc, HTTPException):
+        return
+    get_registry().inc("classdrop_errors_total", (("exception", type(exc).__name__),))
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency, in-flight requests,
+    status codes and body bytes. Routes are labelled by their path template,
+    so /files/{file_id} is one series however many files there are.
+    """
+
+    def __init__(self, app: ASGIApp, routes: list):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = get_registry()
+        labels = (("method", scope["method"]), ("route", self._route_label(scope)))
+        status_code = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def counting_receive() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        registry.inc("classdrop_http_requests_in_flight", labels)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            registry.observe("classdrop_http_request_duration_seconds", labels, time.perf_counter() - started)
+            registry.inc("classdrop_http_requests_in_flight", labels, -1)
+            registry.inc("classdrop_http_requests_total", labels + (("status", str(status_code)),))
+            if request_bytes:
+                registry.inc("classdrop_http_request_body_bytes_total", labels, request_bytes)
+            if response_bytes:
+                registry.inc("classdrop_http_response_body_bytes_total", labels, response_bytes)
+            if registry.flush_due():
+                await run_io(registry.flush)
+
+    def _route_label(self, scope: Scope) -> str:
+        """Return the path template of the route that will handle the request."""
+
+        partial = None
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path
+        return partial or "unmatched"
+
+
+def is_process_alive(pid: int) -> bool:
+    """Check whether a worker process is still running."""
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _format_labels(labels: tuple) -> str:
+    """Format label pairs as {name="value",...}, escaping the values."""
+
+    if not labels:
+        return ""
+    escaped = (f'{name}="{_escape(str(value))}"' for name, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_value(value: float) -> str:
+    """Format a sample value, without a trailing .0 for whole numbers."""
+
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
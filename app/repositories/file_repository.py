@@ -1,15 +1,76 @@
 import os
+import gzip
+import time
+import errno
+import shutil
+import hashlib
+import tempfile
+from typing import Iterable, Iterator, NamedTuple
 from uuid import UUID
-from typeguard import typechecked
+from app.typecheck import typechecked
+
+# Leading bytes of formats that are already compressed, so compressing them again is wasted work
+COMPRESSED_SIGNATURES = (
+    b"PK\x03\x04",            # zip and zip-based formats (docx, pptx, xlsx, jar, epub)
+    b"\x1f\x8b",              # gzip
+    b"BZh",                   # bzip2
+    b"\xfd7zXZ\x00",          # xz
+    b"(\xb5/\xfd",            # zstd
+    b"7z\xbc\xaf\x27\x1c",    # 7-zip
+    b"Rar!\x1a\x07",          # rar
+    b"\x89PNG",               # png
+    b"\xff\xd8\xff",          # jpeg
+    b"GIF8",                  # gif
+    b"\x1aE\xdf\xa3",         # matroska / webm
+    b"ID3",                   # mp3 with ID3 tag
+    b"OggS",                  # ogg
+    b"fLaC",                  # flac
+)
+
+class StagedFile(NamedTuple):
+    """
+    A fully received upload waiting in a temporary file. size and sha256
+    describe the uploaded content; when the temporary file holds it
+    compressed, content_encoding and stored_size describe what is on disk.
+    """
+
+    path: str
+    size: int
+    sha256: str
+    content_encoding: str | None = None
+    stored_size: int | None = None
 
 class FileRepository:
     """Repository for managing file storage and retrieval."""
 
     UPLOAD_DIR: str = "uploads"
+    TEMP_SUFFIX: str = ".part"
+    BLOB_DIR_NAME: str = ".blobs"
+
+    # Store each distinct content once and hard-link uploads to it
+    CONTENT_ADDRESSED: bool = False
+
+    # Number of two-hex-digit directory levels above each upload (0 = flat)
+    SHARD_DEPTH: int = 0
+
+    # Store compressible uploads gzip-compressed, with ENCODING_SUFFIXES appended to their names
+    COMPRESS: bool = False
+    COMPRESSION_LEVEL: int = 6
+    ENCODING_SUFFIXES: dict = {"gzip": ".gz"}
 
-    def __init__(self, upload_dir: str = None):
+    # Keep the original bytes unless compression saves at least this fraction
+    COMPRESSION_MIN_SAVING: float = 0.1
+    COMPRESSION_MIN_SIZE: int = 1024
+
+    def __init__(self, upload_dir: str = None, content_addressed: bool = None, shard_depth: int = None, compress: bool = None):
         if upload_dir:
             self.UPLOAD_DIR = upload_dir
+        if content_addressed is not None:
+            self.CONTENT_ADDRESSED = content_addressed
+        if shard_depth is not None:
+            self.SHARD_DEPTH = shard_depth
+        if compress is not None:
+            self.COMPRESS = compress
 
         # Ensure upload dir and metadata file exist
         os.makedirs(self.UPLOAD_DIR, exist_ok=True)
@@ -18,10 +79,306 @@ class FileRepository:
     def write_file(self, file_id: UUID, ext: str, content: bytes):
         """Write file content to the upload directory."""
 
-        path = os.path.join(self.UPLOAD_DIR, f"{file_id}{ext}")
+        path = self._storage_path(file_id, ext)
         with open(path, "wb") as f:
             f.write(content)
 
+    @typechecked
+    def write_temp_file(self, chunks: Iterable[bytes], compress: bool | None = None) -> StagedFile:
+        """
+        Stream chunks into a temporary file inside the upload directory,
+        hashing them on the way. With compression enabled (compress, or
+        COMPRESS when it is None), the file is then gzip-compressed unless
+        its leading bytes show an already-compressed format or compressing
+        it saves too little.
+        The data is fsynced before returning, and the temporary file is
+        removed if the chunk iterator raises.
+        Returns a StagedFile with the temp path, size and SHA-256 hex digest.
+        """
+
+        fd, temp_path = tempfile.mkstemp(dir=self.UPLOAD_DIR, suffix=self.TEMP_SUFFIX)
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    if len(head) < 16:
+                        head += chunk[:16 - len(head)]
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            self.discard_temp_file(temp_path)
+            raise
+
+        staged = StagedFile(temp_path, size, digest.hexdigest())
+        if compress is None:
+            compress = self.COMPRESS
+        if compress and size >= self.COMPRESSION_MIN_SIZE and self.is_compressible(head):
+            staged = self._compress_temp_file(staged)
+        return staged
+
+    @typechecked
+    def compress_to_temp_file(self, path: str, size: int | None = None) -> tuple[str, int] | None:
+        """
+        Gzip a file into a temporary file in the upload directory, leaving the
+        original in place. The gzip header carries no name or time, so equal
+        content always compresses to equal bytes (and can share a blob).
+        CPU-bound, so background jobs run it in a worker process.
+        Returns (temp_path, compressed_size), or None if the file is an
+        already-compressed format or compression saves too little.
+        """
+
+        if size is None:
+            size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            if not self.is_compressible(f.read(16)):
+                return None
+
+        fd, compressed_path = tempfile.mkstemp(dir=self.UPLOAD_DIR, suffix=self.TEMP_SUFFIX)
+        try:
+            with open(path, "rb") as source, os.fdopen(fd, "wb") as target:
+                with gzip.GzipFile(filename="", mode="wb", fileobj=target, compresslevel=self.COMPRESSION_LEVEL, mtime=0) as gz:
+                    shutil.copyfileobj(source, gz, 1024 * 1024)
+                target.flush()
+                os.fsync(target.fileno())
+            stored_size = os.path.getsize(compressed_path)
+        except BaseException:
+            self.discard_temp_file(compressed_path)
+            raise
+
+        if stored_size > size * (1 - self.COMPRESSION_MIN_SAVING):
+            self.discard_temp_file(compressed_path)
+            return None
+        return compressed_path, stored_size
+
+    @typechecked
+    def is_compressible(self, head: bytes) -> bool:
+        """
+        Sniff the first bytes of a file for already-compressed formats.
+        Returns False for those, True otherwise.
+        """
+
+        if head.startswith(COMPRESSED_SIGNATURES):
+            return False
+        # ISO base media (mp4, mov, m4a, heic) and RIFF WebP / AVI keep their tag at offset 4 / 8
+        if head[4:8] == b"ftyp" or (head.startswith(b"RIFF") and head[8:12] in (b"WEBP", b"AVI ")):
+            return False
+        return True
+
+    @typechecked
+    def commit_temp_file(self, temp_path: str, file_id: UUID, ext: str, sha256: str | None = None, content_encoding: str | None = None):
+        """
+        Atomically move a temporary file to its final location.
+        In content-addressed mode the bytes are kept once per SHA-256 digest
+        and the final location is a hard link to that blob, so a duplicate
+        upload only costs a link.
+        The directories gaining a name are fsynced before returning, so the
+        file survives a crash once its metadata is committed.
+        """
+
+        path = self._storage_path(file_id, ext + self._encoding_suffix(content_encoding))
+        if not (self.CONTENT_ADDRESSED and sha256):
+            os.replace(temp_path, path)
+            self._fsync_directory(os.path.dirname(path))
+            return
+
+        blob_path = self.get_blob_path(sha256, content_encoding)
+        try:
+            linked = self._link_to_blob(temp_path, blob_path, path)
+        except OSError as e:
+            # Filesystems without hard links, or a blob at the link limit
+            if e.errno not in (errno.EPERM, errno.EXDEV, errno.EMLINK, errno.ENOTSUP):
+                raise
+            linked = False
+
+        if linked:
+            self.discard_temp_file(temp_path)
+            self._fsync_directory(os.path.dirname(blob_path))
+        else:
+            os.replace(temp_path, path)
+        self._fsync_directory(os.path.dirname(path))
+
+    @typechecked
+    def delete_file(self, file_id: UUID, filename: str, sha256: str | None = None, content_encoding: str | None = None):
+        """
+        Remove a stored file. In content-addressed mode the blob is
+        reclaimed as well once no other upload references it.
+        """
+
+        os.remove(self.get_file_path(file_id, filename, content_encoding))
+        if self.CONTENT_ADDRESSED and sha256 and self.get_blob_refcount(sha256, content_encoding) == 0:
+            try:
+                os.remove(self.get_blob_path(sha256, content_encoding))
+            except FileNotFoundError:
+                pass
+
+    @typechecked
+    def get_blob_path(self, sha256: str, content_encoding: str | None = None) -> str:
+        """
+        Get the path of the content-addressed blob for a SHA-256 digest.
+        Compressed and uncompressed copies of the same content are separate blobs.
+        Returns the path, fanned out by the first two hex digits.
+        """
+
+        name = sha256 + self._encoding_suffix(content_encoding)
+        return os.path.join(self.UPLOAD_DIR, self.BLOB_DIR_NAME, sha256[:2], name)
+
+    @typechecked
+    def get_blob_refcount(self, sha256: str, content_encoding: str | None = None) -> int:
+        """
+        Count the uploads sharing a blob; each one is a hard link to it.
+        Returns 0 if the blob does not exist.
+        """
+
+        try:
+            return os.stat(self.get_blob_path(sha256, content_encoding)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    @typechecked
+    def collect_garbage(self) -> int:
+        """
+        Remove blobs that no upload links to any more.
+        Returns the number of blobs removed.
+        """
+
+        removed = 0
+        blob_root = os.path.join(self.UPLOAD_DIR, self.BLOB_DIR_NAME)
+        for dirpath, _, filenames in os.walk(blob_root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.stat(path).st_nlink == 1:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    @typechecked
+    def discard_temp_file(self, temp_path: str):
+        """Remove a temporary file, ignoring it if it is already gone."""
+
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+
+    def _fsync_directory(self, directory: str):
+        """Flush a directory's entries to disk, so a rename or link into it is durable."""
+
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _encoding_suffix(self, content_encoding: str | None) -> str:
+        """Return the file name suffix for a stored content encoding ("" when uncompressed)."""
+
+        if content_encoding is None:
+            return ""
+        return self.ENCODING_SUFFIXES[content_encoding]
+
+    def _compress_temp_file(self, staged: StagedFile) -> StagedFile:
+        """
+        Gzip a staged file into a second temporary file and keep whichever
+        is worth storing.
+        Returns the StagedFile to commit.
+        """
+
+        try:
+            compressed = self.compress_to_temp_file(staged.path, staged.size)
+        except BaseException:
+            self.discard_temp_file(staged.path)
+            raise
+
+        if compressed is None:
+            return staged
+
+        compressed_path, stored_size = compressed
+        self.discard_temp_file(staged.path)
+        return staged._replace(path=compressed_path, content_encoding="gzip", stored_size=stored_size)
+
+    def _storage_path(self, file_id: UUID, ext: str, create_dirs: bool = True) -> str:
+        """Return where a file is stored in the configured layout, creating shard dirs if asked."""
+
+        name = f"{file_id}{ext}"
+        if not self.SHARD_DEPTH:
+            return os.path.join(self.UPLOAD_DIR, name)
+
+        hex_id = file_id.hex
+        shard_dir = os.path.join(self.UPLOAD_DIR, *(hex_id[2 * i:2 * i + 2] for i in range(self.SHARD_DEPTH)))
+        if create_dirs:
+            os.makedirs(shard_dir, exist_ok=True)
+        return os.path.join(shard_dir, name)
+
+    def _parse_file_id(self, name: str) -> UUID | None:
+        """Return the file_id a stored file name starts with, or None for other files."""
+
+        try:
+            file_id = UUID(name[:36])
+        except ValueError:
+            return None
+        return file_id if str(file_id) == name[:36] else None
+
+    def _move_batch(self, batch: list, grace_seconds: float) -> int:
+        """Link a batch of flat files into their shards, wait, then unlink the flat names."""
+
+        linked = []
+        moved = 0
+        for flat_path, shard_path in batch:
+            os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+            try:
+                os.link(flat_path, shard_path)
+            except FileExistsError:
+                # Left behind by an interrupted migration
+                pass
+            except FileNotFoundError:
+                continue
+            except OSError:
+                # No hard links on this filesystem: fall back to a plain rename
+                os.replace(flat_path, shard_path)
+                moved += 1
+                continue
+            linked.append(flat_path)
+            moved += 1
+
+        if linked and grace_seconds:
+            time.sleep(grace_seconds)
+        for flat_path in linked:
+            try:
+                os.remove(flat_path)
+            except FileNotFoundError:
+                pass
+        return moved
+
+    def _link_to_blob(self, temp_path: str, blob_path: str, path: str) -> bool:
+        """
+        Make path a hard link to blob_path, creating the blob from
+        temp_path if it does not exist yet. Linking (rather than renaming)
+        the temp file into place fails if another upload created the blob
+        first, so concurrent duplicates always end up sharing one blob.
+        Returns False if the blob kept disappearing under a concurrent cleanup.
+        """
+
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        for _ in range(3):
+            try:
+                os.link(temp_path, blob_path)
+            except FileExistsError:
+                pass
+            try:
+                os.link(blob_path, path)
+                return True
+            except FileNotFoundError:
+                continue
+        return False
+
     @typechecked
     def file_exists(self, path: str) -> bool:
         """
@@ -32,14 +389,57 @@ class FileRepository:
         return os.path.exists(path)
     
     @typechecked
-    def get_file_path(self, file_id: UUID, filename: str) -> str:
+    def get_file_path(self, file_id: UUID, filename: str, content_encoding: str | None = None) -> str:
         """
         Get the full file path for a given file ID and original filename.
+        With sharding enabled, files not yet migrated out of the flat
+        layout are still found.
         Returns the path where the file is stored.
         """
         
         _, ext = os.path.splitext(filename)
-        return os.path.join(self.UPLOAD_DIR, f"{file_id}{ext}")
+        ext += self._encoding_suffix(content_encoding)
+        path = self._storage_path(file_id, ext, create_dirs=False)
+        if self.SHARD_DEPTH and not os.path.exists(path):
+            flat_path = os.path.join(self.UPLOAD_DIR, f"{file_id}{ext}")
+            if os.path.exists(flat_path):
+                return flat_path
+        return path
+
+    @typechecked
+    def get_relative_path(self, path: str) -> str:
+        """
+        Get a stored file's path relative to the upload directory.
+        Returns the path with "/" separators.
+        """
+
+        return os.path.relpath(path, self.UPLOAD_DIR).replace(os.sep, "/")
+
+    @typechecked
+    def migrate_to_shards(self, batch_size: int = 1000, grace_seconds: float = 5.0) -> Iterator[int]:
+        """
+        Move uploads from the flat layout into the sharded layout, in batches.
+        Each file is first hard-linked into its shard, so new lookups find it
+        there, and the flat name is only removed after grace_seconds so that
+        downloads that already resolved it can still open it.
+        Yields the number of files moved by each batch.
+        """
+
+        if not self.SHARD_DEPTH:
+            raise ValueError("Sharding is disabled (SHARD_DEPTH is 0)")
+
+        batch = []
+        with os.scandir(self.UPLOAD_DIR) as entries:
+            for entry in entries:
+                file_id = self._parse_file_id(entry.name)
+                if file_id is None or not entry.is_file(follow_symlinks=False):
+                    continue
+                batch.append((entry.path, self._storage_path(file_id, entry.name[36:])))
+                if len(batch) == batch_size:
+                    yield self._move_batch(batch, grace_seconds)
+                    batch = []
+        if batch:
+            yield self._move_batch(batch, grace_seconds)
     
     @typechecked
     def get_file_extension(self, filename: str) -> str:
@@ -49,4 +449,4 @@ class FileRepository:
         """
         
         _, ext = os.path.splitext(filename)
-        return ext
\ No newline at end of file
+        return ext
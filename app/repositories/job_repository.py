@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import threading
+from typing import Callable
+from app.exceptions import handle_file_errors
+from app.repositories.sqlite_repository import SqliteRepository
+from app.typecheck import typechecked
+
+class JobRepository(SqliteRepository):
+    """
+    Persistent queue of background jobs in a SQLite database, shared by
+    every worker process. A job is claimed by one process at a time and
+    stays in the database after it finishes, with its outcome.
+    """
+
+    DATABASE_FILE: str = "jobs.db"
+
+    # Job states, in the order a job goes through them
+    PENDING: str = "pending"
+    RUNNING: str = "running"
+    DONE: str = "done"
+    FAILED: str = "failed"
+
+    # Events set whenever this process enqueues a job, keyed by database file
+    _wakeups: dict = {}
+
+    def __init__(self, database_file: str = None):
+        if database_file:
+            self.DATABASE_FILE = str(database_file)
+
+        # Ensure the schema exists
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    claimed_by INTEGER,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, job_id)")
+
+        with self._connections_lock:
+            self._wakeup = self._wakeups.setdefault(os.path.abspath(self.DATABASE_FILE), threading.Event())
+
+    @handle_file_errors
+    @typechecked
+    def enqueue(self, kind: str, payload: dict) -> int:
+        """
+        Add a pending job.
+        Returns the job_id.
+        """
+
+        now = time.time()
+        with self._transaction() as conn:
+            job_id = conn.execute(
+                "INSERT INTO jobs (kind, payload, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload), self.PENDING, now, now)
+            ).lastrowid
+        self._wakeup.set()
+        return job_id
+
+    @typechecked
+    def claim(self, limit: int) -> list[dict]:
+        """
+        Mark up to limit of the oldest pending jobs as running in this process.
+        Returns the claimed jobs.
+        """
+
+        if limit <= 0:
+            return []
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT job_id, kind, payload FROM jobs WHERE status = ? ORDER BY job_id LIMIT ?",
+                (self.PENDING, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = ?, claimed_by = ?, updated_at = ? WHERE job_id = ?",
+                [(self.RUNNING, os.getpid(), time.time(), row[0]) for row in rows]
+            )
+        return [{"job_id": job_id, "kind": kind, "payload": json.loads(payload)} for job_id, kind, payload in rows]
+
+    @typechecked
+    def complete(self, job_id: int):
+        """Mark a job as done."""
+
+        self._finish(job_id, self.DONE, None)
+
+    @typechecked
+    def fail(self, job_id: int, error: str):
+        """Mark a job as failed, keeping the error message."""
+
+        self._finish(job_id, self.FAILED, error)
+
+    @typechecked
+    def get_job(self, job_id: int) -> dict:
+        """
+        Retrieve a job by job_id.
+        Returns the job as a dict, or raises ValueError if it does not exist.
+        """
+
+        conn, lock = self._connection_entry()
+        with lock:
+            row = conn.execute(
+                "SELECT job_id, kind, payload, status, error FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            raise ValueError(f"No job found for job_id: {job_id}")
+
+        job_id, kind, payload, status, error = row
+        return {"job_id": job_id, "kind": kind, "payload": json.loads(payload), "status": status, "error": error}
+
+    @typechecked
+    def active_file_ids(self, kind: str) -> set:
+        """
+        Collect the files that have a job of the given kind still pending
+        or running.
+        Returns the set of payload file_ids.
+        """
+
+        conn, lock = self._connection_entry()
+        with lock:
+            rows = conn.execute(
+                "SELECT payload FROM jobs WHERE kind = ? AND status IN (?, ?)", (kind, self.PENDING, self.RUNNING)
+            ).fetchall()
+        return {json.loads(payload).get("file_id") for payload, in rows}
+
+    @typechecked
+    def requeue_abandoned(self, is_alive: Callable[[int], bool]) -> int:
+        """
+        Put running jobs back in the queue when the process that claimed
+        them is gone (is_alive(pid) is False) or is this one, which has
+        only just started and cannot be running any.
+        Returns the number of jobs requeued.
+        """
+
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT job_id, claimed_by FROM jobs WHERE status = ?", (self.RUNNING,)).fetchall()
+            abandoned = [job_id for job_id, pid in rows if pid == os.getpid() or not is_alive(pid)]
+            conn.executemany(
+                "UPDATE jobs SET status = ?, claimed_by = NULL, updated_at = ? WHERE job_id = ?",
+                [(self.PENDING, time.time(), job_id) for job_id in abandoned]
+            )
+        return len(abandoned)
+
+    def wakeup_event(self) -> threading.Event:
+        """
+        Return the event set when this process enqueues a job; jobs enqueued
+        by other processes are only seen by polling.
+        """
+
+        return self._wakeup
+
+    def _finish(self, job_id: int, status: str, error: str | None):
+        """Record the outcome of a job."""
+
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                (status, error, time.time(), job_id)
+            )
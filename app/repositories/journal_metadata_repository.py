@@ -0,0 +1,250 @@
+import os
+import json
+import uuid
+import threading
+from app.exceptions import handle_file_errors
+from app.repositories.metadata_repository import MetadataRepository, build_metadata_entry
+from app.typecheck import typechecked
+
+class JournalMetadataRepository(MetadataRepository):
+    """
+    Metadata repository that appends new entries to a JSON-lines journal
+    next to metadata.json, and periodically folds the journal back into
+    the metadata.json snapshot.
+    """
+
+    JOURNAL_SUFFIX: str = ".journal"
+    COMPACT_MAX_ENTRIES: int = 1000
+    COMPACT_MAX_BYTES: int = 1024 * 1024
+
+    # Journals with a background compaction currently running in this process
+    _compacting: set = set()
+    _compacting_lock = threading.Lock()
+
+    def __init__(
+        self,
+        metadata_file: str = None,
+        compact_max_entries: int = None,
+        compact_max_bytes: int = None,
+        lock_timeout: float = None,
+        lock_poll_interval: float = None,
+        lock_max_poll_interval: float = None,
+    ):
+        super().__init__(
+            metadata_file,
+            lock_timeout=lock_timeout,
+            lock_poll_interval=lock_poll_interval,
+            lock_max_poll_interval=lock_max_poll_interval,
+        )
+        if compact_max_entries is not None:
+            self.COMPACT_MAX_ENTRIES = compact_max_entries
+        if compact_max_bytes is not None:
+            self.COMPACT_MAX_BYTES = compact_max_bytes
+
+        self.JOURNAL_FILE = f"{self.METADATA_FILE}{self.JOURNAL_SUFFIX}"
+
+    @handle_file_errors
+    @typechecked
+    def write_metadata(self, metadata: list):
+        """Replace the snapshot with the given metadata and clear the journal."""
+
+        with self._lock():
+            self._cache.invalidate()
+            self._write_snapshot(metadata)
+
+    @handle_file_errors
+    @typechecked
+    def add_metadata(
+        self,
+        filename: str,
+        file_size: int,
+        sha256: str | None = None,
+        content_encoding: str | None = None,
+        stored_size: int | None = None,
+        jobs: dict | None = None,
+        file_id: uuid.UUID | None = None,
+    ) -> uuid.UUID:
+        """
+        Append a new entry to the journal.
+        Returns the file_id, generated unless one was given.
+        """
+        file_id, new_entry = build_metadata_entry(filename, file_size, sha256, content_encoding, stored_size, jobs, file_id)
+        self._append_to_journal(json.dumps(new_entry).encode() + b"\n")
+
+        return file_id
+
+    @handle_file_errors
+    @typechecked
+    def add_metadata_batch(self, files: list) -> list:
+        """
+        Append one entry per file to the journal in a single write.
+        Returns the generated file_ids, in the order of files.
+        """
+        built = [build_metadata_entry(**file) for file in files]
+        if built:
+            self._append_to_journal(b"".join(json.dumps(entry).encode() + b"\n" for _, entry in built))
+
+        return [file_id for file_id, _ in built]
+
+    @typechecked
+    def update_metadata(self, file_id: uuid.UUID, changes: dict) -> dict:
+        """
+        Append an update record for file_id to the journal; it is merged into
+        the entry when the metadata is read, and folded in by compaction.
+        Raises ValueError if there is no such entry.
+        Returns the updated entry.
+        """
+
+        entry = dict(self.get_metadata_by_id(file_id))
+        entry.update(changes)
+        self._append_to_journal(json.dumps({"file_id": str(file_id), "update": changes}).encode() + b"\n")
+
+        return entry
+
+    @handle_file_errors
+    @typechecked
+    def compact(self) -> int:
+        """
+        Fold the journal into a new snapshot and truncate it.
+        Returns the number of journal entries that were folded in.
+        """
+
+        with self._lock():
+            journal = self._read_journal()
+            if not journal:
+                return 0
+            self._write_snapshot(self._read_file())
+            return len(journal)
+
+    def close(self):
+        """Wait for a background compaction of this journal to finish."""
+
+        for thread in threading.enumerate():
+            if thread.name == f"metadata-compaction:{os.path.abspath(self.JOURNAL_FILE)}":
+                thread.join()
+
+    def _read_file(self) -> list:
+        """
+        Load the snapshot, replay journal entries not already in it and
+        apply update records to their entries. A journal entry can also be in the snapshot if a compaction was
+        interrupted after writing the snapshot but before truncating.
+        Safe without the metadata lock: the snapshot is replaced atomically,
+        a half-written journal line is skipped, and a compaction between
+        reading the snapshot and the journal bumps the version, so the
+        caller retries.
+        """
+
+        with open(self.METADATA_FILE, "r") as f:
+            metadata = json.load(f)
+
+        journal = self._read_journal()
+        if journal:
+            index = {entry["file_id"]: entry for entry in metadata}
+            for record in journal:
+                if "update" in record:
+                    # Update records are idempotent, so replaying one already folded in is harmless
+                    if record["file_id"] in index:
+                        index[record["file_id"]].update(record["update"])
+                elif record["file_id"] not in index:
+                    metadata.append(record)
+                    index[record["file_id"]] = record
+        return metadata
+
+    def _read_journal(self) -> list:
+        """
+        Parse every complete line of the journal.
+        A trailing line without a newline is an interrupted append and is ignored.
+        """
+
+        try:
+            with open(self.JOURNAL_FILE, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+
+        lines = data.split(b"\n")
+        return [json.loads(line) for line in lines[:-1] if line]
+
+    def _write_snapshot(self, metadata: list):
+        """
+        Atomically replace the snapshot, then truncate the journal and bump
+        the version. The snapshot is fsynced first so that entries are never
+        only in memory.
+        Must be called with the metadata lock held.
+        """
+
+        temp_file = f"{self.METADATA_FILE}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump(metadata, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.METADATA_FILE)
+
+        with open(self.JOURNAL_FILE, "wb"):
+            pass
+        self._version.bump()
+
+    def _append_to_journal(self, lines: bytes):
+        """Append complete journal lines under the metadata lock, bump the version, and compact if due."""
+
+        with self._lock():
+            with open(self.JOURNAL_FILE, "a+b") as f:
+                self._repair_torn_tail(f)
+                f.write(lines)
+            self._version.bump()
+
+        if self._needs_compaction():
+            self._compact_in_background()
+
+    def _repair_torn_tail(self, f):
+        """Truncate a partially written last line left behind by a crashed append."""
+
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+
+        f.seek(max(0, size - 64 * 1024))
+        tail = f.read()
+        f.truncate(size - len(tail) + tail.rfind(b"\n") + 1)
+
+    def _needs_compaction(self) -> bool:
+        """
+        Check the journal against the size and entry thresholds.
+        The journal is bounded by COMPACT_MAX_BYTES, so this never depends
+        on the size of the whole catalogue.
+        """
+
+        try:
+            size = os.path.getsize(self.JOURNAL_FILE)
+        except FileNotFoundError:
+            return False
+        if size >= self.COMPACT_MAX_BYTES:
+            return True
+
+        with open(self.JOURNAL_FILE, "rb") as f:
+            return f.read().count(b"\n") >= self.COMPACT_MAX_ENTRIES
+
+    def _compact_in_background(self):
+        """Start a compaction thread unless one is already running for this journal."""
+
+        key = os.path.abspath(self.JOURNAL_FILE)
+        with self._compacting_lock:
+            if key in self._compacting:
+                return
+            self._compacting.add(key)
+
+        def run():
+            try:
+                self.compact()
+            except Exception:
+                # The journal stays intact; the next append will retry
+                pass
+            finally:
+                with self._compacting_lock:
+                    self._compacting.discard(key)
+
+        threading.Thread(target=run, name=f"metadata-compaction:{key}", daemon=True).start()
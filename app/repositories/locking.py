@@ -0,0 +1,137 @@
+import os
+import math
+import time
+import threading
+from filelock import FileLock, Timeout
+from app.metrics import get_registry
+
+class LockTimeout(Timeout):
+    """Timeout raised by InstrumentedLock, carrying a suggested Retry-After in seconds."""
+
+    def __init__(self, lock_file: str, retry_after: int):
+        super().__init__(lock_file)
+        self.retry_after = retry_after
+
+
+class LockStats:
+    """Wait / hold statistics of one lock file, shared by every InstrumentedLock on it in this process."""
+
+    # Weight of the latest hold time in the moving average
+    SMOOTHING: float = 0.2
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = 0
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.average_hold = 0.0
+        self.max_wait = 0.0
+
+    def retry_after(self) -> int:
+        """
+        Estimate how long a client should wait before retrying: everyone
+        already queued has to hold the lock once.
+        Returns whole seconds, between 1 and 60.
+        """
+
+        return max(1, min(60, math.ceil(self.average_hold * (self.waiters + 1))))
+
+    def snapshot(self) -> dict:
+        """Return the counters as a dict."""
+
+        with self.lock:
+            return {
+                "waiters": self.waiters,
+                "acquisitions": self.acquisitions,
+                "timeouts": self.timeouts,
+                "average_hold_seconds": self.average_hold,
+                "max_wait_seconds": self.max_wait,
+            }
+
+
+class InstrumentedLock:
+    """
+    FileLock wrapper that acquires with exponential backoff and records how
+    long callers waited, how long they held the lock and how many were
+    waiting. The timings also go to the metrics registry.
+    Like FileLock, an instance is meant to be created per critical section.
+    """
+
+    _stats: dict = {}
+    _stats_lock = threading.Lock()
+
+    def __init__(self, lock_file: str, name: str, timeout: float = 5.0, poll_interval: float = 0.005, max_poll_interval: float = 0.1):
+        self.file_lock = FileLock(lock_file)
+        self.labels = (("lock", name),)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.acquired_at = None
+        with self._stats_lock:
+            self.stats = self._stats.setdefault(os.path.abspath(lock_file), LockStats())
+
+    def acquire(self):
+        """
+        Acquire the lock, polling with exponential backoff from poll_interval
+        up to max_poll_interval. Raises LockTimeout once timeout seconds have passed.
+        """
+
+        registry = get_registry()
+        stats = self.stats
+        with stats.lock:
+            stats.waiters += 1
+        registry.inc("classdrop_lock_waiters", self.labels)
+
+        started = time.monotonic()
+        delay = self.poll_interval
+        try:
+            while True:
+                try:
+                    self.file_lock.acquire(timeout=0)
+                    break
+                except Timeout:
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        with stats.lock:
+                            stats.timeouts += 1
+                        registry.inc("classdrop_lock_timeouts_total", self.labels)
+                        raise LockTimeout(self.file_lock.lock_file, stats.retry_after())
+                    time.sleep(min(delay, remaining))
+                    delay = min(delay * 2, self.max_poll_interval)
+        finally:
+            waited = time.monotonic() - started
+            with stats.lock:
+                stats.waiters -= 1
+                stats.max_wait = max(stats.max_wait, waited)
+            registry.inc("classdrop_lock_waiters", self.labels, -1)
+            registry.observe("classdrop_lock_wait_seconds", self.labels, waited)
+
+        self.acquired_at = time.monotonic()
+
+    def release(self):
+        """Release the lock and record how long it was held."""
+
+        held = time.monotonic() - self.acquired_at
+        self.file_lock.release()
+        stats = self.stats
+        with stats.lock:
+            stats.acquisitions += 1
+            stats.average_hold += (held - stats.average_hold) * stats.SMOOTHING
+        get_registry().observe("classdrop_lock_hold_seconds", self.labels, held)
+
+    def __enter__(self) -> "InstrumentedLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def lock_stats(lock_file: str) -> dict:
+    """
+    Return the statistics of a lock file in this process.
+    Returns an empty dict if it was never locked.
+    """
+
+    stats = InstrumentedLock._stats.get(os.path.abspath(lock_file))
+    return stats.snapshot() if stats is not None else {}
@@ -1,65 +1,324 @@
 import os
 import json
+import time
 import uuid
+import tempfile
+import threading
+from bisect import bisect_left, bisect_right
 from datetime import datetime
-from filelock import FileLock
-from app.exceptions import handle_file_errors
-from typeguard import typechecked
+from app.exceptions import GroupCommitFailedException, handle_file_errors
+from app.repositories.locking import InstrumentedLock
+from app.repositories.search_index import FilenameIndex
+from app.repositories.version_counter import SharedVersionCounter
+from app.repositories.pagination import SORT_FIELDS, decode_cursor, encode_cursor, matches_filters
+from app.typecheck import typechecked
+
+def build_metadata_entry(
+    filename: str,
+    file_size: int,
+    sha256: str | None = None,
+    content_encoding: str | None = None,
+    stored_size: int | None = None,
+    jobs: dict | None = None,
+    file_id: uuid.UUID | None = None,
+) -> tuple[uuid.UUID, dict]:
+    """
+    Build a new metadata entry, with a fresh file_id unless one is given
+    (the service picks it when the file is moved into place first).
+    The sha256 key is only present when the content hash is known, and
+    content_encoding / stored_size only when the file is stored compressed;
+    size_in_bytes is always the uncompressed size. jobs maps the kind of
+    each background job queued for the file to its status.
+    Returns a tuple of (file_id, entry).
+    """
+
+    if file_id is None:
+        file_id = uuid.uuid4()
+    entry = {
+        "file_id": str(file_id),
+        "filename": filename,
+        "upload_timestamp": datetime.now().isoformat(),
+        "size_in_bytes": file_size
+    }
+    if sha256 is not None:
+        entry["sha256"] = sha256
+    if content_encoding is not None:
+        entry["content_encoding"] = content_encoding
+        entry["stored_size"] = stored_size
+    if jobs:
+        entry["jobs"] = jobs
+    return file_id, entry
+
+
+class MetadataCache:
+    """
+    Process-local copy of the parsed metadata plus a file_id index,
+    tagged with the metadata version it was read at.
+    """
+
+    def __init__(self):
+        # (version, entries, index, views) is swapped as a single tuple so readers never see a mix
+        self.snapshot = (None, [], {}, {})
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, version: tuple) -> tuple | None:
+        """
+        Return (entries, index, views) if the cache was filled at the given version.
+        Returns None on a miss.
+        """
+
+        cached_version, entries, index, views = self.snapshot
+        hit = cached_version is not None and cached_version == version
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return (entries, index, views) if hit else None
+
+    def store(self, version: tuple | None, entries: list) -> tuple:
+        """
+        Replace the cached data. A version of None stores the data without
+        making it valid for later lookups.
+        Returns (entries, index, views).
+        """
+
+        index = {entry["file_id"]: entry for entry in entries}
+        views = {}
+        self.snapshot = (version, entries, index, views)
+        return entries, index, views
+
+    def invalidate(self):
+        """Drop the cached data so the next lookup is a miss."""
+
+        self.snapshot = (None, [], {}, {})
+
+    def stats(self) -> dict:
+        """Return the hit/miss counters and the number of cached entries."""
+
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.snapshot[1])}
+
+
+class PendingWrite:
+    """One caller's entries waiting in a GroupCommitQueue, and the outcome of their batch."""
+
+    def __init__(self, entries: list):
+        self.entries = entries
+        self.done = False
+        self.error = None
+
+
+class GroupCommitQueue:
+    """
+    Collects concurrent metadata appends so that one caller, the leader,
+    writes all of them in a single locked read-modify-write. Callers that
+    arrive while a batch is being written queue up for the next one.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.leader_active = False
+        self.condition = threading.Condition()
+
+    def submit(self, entries: list, commit, window_seconds: float = 0.0):
+        """
+        Queue entries and block until a batch containing them has been
+        committed by commit(entries). The leader re-raises the batch's
+        error as it is; every other caller in the batch gets its own
+        GroupCommitFailedException caused by it.
+        """
+
+        request = PendingWrite(entries)
+        with self.condition:
+            self.pending.append(request)
+            while self.leader_active and not request.done:
+                self.condition.wait()
+            if not request.done:
+                self.leader_active = True
+
+        if not request.done:
+            self._lead(request, commit, window_seconds)
+        elif request.error is not None:
+            raise GroupCommitFailedException(f"The metadata write batched with this one failed: {request.error!r}") from request.error
+
+    def _lead(self, request: PendingWrite, commit, window_seconds: float):
+        """Wait for more writers to join, then commit everything pending as one batch."""
+
+        batch = []
+        try:
+            if window_seconds:
+                time.sleep(window_seconds)
+
+            with self.condition:
+                batch, self.pending = self.pending, []
+            commit([entry for pending in batch for entry in pending.entries])
+        except BaseException as e:
+            # Interrupts included: a follower must never take a failed batch for a committed one
+            for pending in batch:
+                pending.error = e
+            raise
+        finally:
+            with self.condition:
+                if not batch:
+                    # Interrupted before taking the batch: leave the others for the next leader
+                    self.pending.remove(request)
+                for pending in batch:
+                    pending.done = True
+                self.leader_active = False
+                self.condition.notify_all()
+
 
 class MetadataRepository:
     """Repository for managing file metadata in the database."""
     
     METADATA_FILE: str = "metadata.json"
+
+    # Memory-mapped version counter next to the metadata file, bumped by every write
+    VERSION_SUFFIX: str = ".version"
+
+    # Seconds a batch leader waits for more concurrent add_metadata calls to join
+    GROUP_COMMIT_WINDOW: float = 0.002
+
+    # Seconds to wait for the metadata lock before answering 503, and the
+    # initial / largest pause between attempts while it is held elsewhere
+    LOCK_TIMEOUT: float = 5.0
+    LOCK_POLL_INTERVAL: float = 0.005
+    LOCK_MAX_POLL_INTERVAL: float = 0.1
+
+    # Lock-free reads retried because a writer replaced the file mid-read,
+    # before falling back to reading under the lock
+    OPTIMISTIC_READ_ATTEMPTS: int = 3
+
+    # Read caches shared by every repository instance in this process, keyed by metadata file
+    _caches: dict = {}
+    _caches_lock = threading.Lock()
+
+    # Group-commit queues shared the same way, so all writers in a process batch together
+    _commit_queues: dict = {}
+
+    # Filename search indexes, shared the same way and kept up to date incrementally
+    _search_indexes: dict = {}
+
+    # Version counters, mapped once per process and metadata file
+    _version_counters: dict = {}
     
-    def __init__(self, metadata_file: str = None):
+    def __init__(
+        self,
+        metadata_file: str = None,
+        group_commit_window: float = None,
+        lock_timeout: float = None,
+        lock_poll_interval: float = None,
+        lock_max_poll_interval: float = None,
+    ):
         if metadata_file:
             self.METADATA_FILE = metadata_file
+        if group_commit_window is not None:
+            self.GROUP_COMMIT_WINDOW = group_commit_window
+        if lock_timeout is not None:
+            self.LOCK_TIMEOUT = lock_timeout
+        if lock_poll_interval is not None:
+            self.LOCK_POLL_INTERVAL = lock_poll_interval
+        if lock_max_poll_interval is not None:
+            self.LOCK_MAX_POLL_INTERVAL = lock_max_poll_interval
 
         # Ensure metadata file exists
         if not os.path.exists(self.METADATA_FILE):
             with open(self.METADATA_FILE, "w") as f:
                 json.dump([], f)
+
+        key = os.path.abspath(self.METADATA_FILE)
+        with self._caches_lock:
+            self._cache = self._caches.setdefault(key, MetadataCache())
+            self._commit_queue = self._commit_queues.setdefault(key, GroupCommitQueue())
+            self._search_index = self._search_indexes.setdefault(key, FilenameIndex())
+            self._version = self._version_counters.get(key)
+            if self._version is None:
+                # Under the metadata lock, so concurrent workers do not both initialise a new counter file
+                with self._lock():
+                    self._version = SharedVersionCounter(f"{self.METADATA_FILE}{self.VERSION_SUFFIX}")
+                self._version_counters[key] = self._version
     
     @handle_file_errors
     @typechecked
     def read_metadata(self) -> list:
         """
-        Read metadata from the JSON file with file locking.
+        Read metadata from the JSON file.
+        Served from the process cache while the file is unchanged.
         Returns a list of metadata entries.
         """
 
-        with FileLock(f"{self.METADATA_FILE}.lock", timeout=5):
-            with open(self.METADATA_FILE, "r") as f:
-                return json.load(f)
+        entries, _, _ = self._load()
+        return list(entries)
 
     @handle_file_errors
     @typechecked
     def write_metadata(self, metadata: list):
-        """Write metadata to the JSON file with file locking."""
+        """Atomically replace the JSON file with file locking."""
 
-        with FileLock(f"{self.METADATA_FILE}.lock", timeout=5):
-            with open(self.METADATA_FILE, "w") as f:
-                json.dump(metadata, f, indent=4)
+        with self._lock():
+            self._cache.invalidate()
+            self._write_file(metadata)
 
+    @handle_file_errors
     @typechecked
-    def add_metadata(self, filename: str, file_size: int) -> uuid.UUID:
+    def add_metadata(
+        self,
+        filename: str,
+        file_size: int,
+        sha256: str | None = None,
+        content_encoding: str | None = None,
+        stored_size: int | None = None,
+        jobs: dict | None = None,
+        file_id: uuid.UUID | None = None,
+    ) -> uuid.UUID:
         """
         Add a new entry to the metadata file.
-        Returns the generated file_id.
+        Concurrent calls are group-committed: they are appended together
+        in one locked read-modify-write, and each caller gets its own
+        file_id, or the error that made its batch fail.
+        Returns the file_id, generated unless one was given.
         """
-        file_id = uuid.uuid4()
-        new_entry = {
-            "file_id": str(file_id),
-            "filename": filename,
-            "upload_timestamp": datetime.now().isoformat(),
-            "size_in_bytes": file_size
-        }
-        metadata = self.read_metadata()
-        metadata.append(new_entry)
-        self.write_metadata(metadata)
+        file_id, new_entry = build_metadata_entry(filename, file_size, sha256, content_encoding, stored_size, jobs, file_id)
+        self._commit_queue.submit([new_entry], self._append_entries, self.GROUP_COMMIT_WINDOW)
 
         return file_id
 
+    @handle_file_errors
+    @typechecked
+    def add_metadata_batch(self, files: list) -> list:
+        """
+        Add one entry per file in a single metadata write. files holds a dict
+        of add_metadata keyword arguments (filename, file_size and optionally
+        sha256, content_encoding, stored_size, jobs) per file.
+        Returns the generated file_ids, in the order of files.
+        """
+        built = [build_metadata_entry(**file) for file in files]
+        if built:
+            self._commit_queue.submit([entry for _, entry in built], self._append_entries, self.GROUP_COMMIT_WINDOW)
+
+        return [file_id for file_id, _ in built]
+
+    @typechecked
+    def update_metadata(self, file_id: uuid.UUID, changes: dict) -> dict:
+        """
+        Merge changes into the entry of file_id in one locked read-modify-write.
+        Raises ValueError if there is no such entry.
+        Returns the updated entry.
+        """
+
+        with self._lock():
+            metadata = self._read_file()
+            entry = next((entry for entry in metadata if entry["file_id"] == str(file_id)), None)
+            if entry is None:
+                raise ValueError(f"No metadata found for file_id: {file_id}")
+            entry.update(changes)
+            self._cache.invalidate()
+            self._write_file(metadata)
+
+        return entry
+
     @typechecked
     def get_metadata_by_id(self, file_id: uuid.UUID) -> dict:
         """
@@ -67,9 +326,226 @@ class MetadataRepository:
         Returns the metadata dictionary if found, else None.
         """
 
-        metadata = self.read_metadata()
-        for entry in metadata:
-            if entry["file_id"] == str(file_id):
-                return entry
-        
-        raise ValueError(f"No metadata found for file_id: {file_id}")
\ No newline at end of file
+        entry = self._read_index().get(str(file_id))
+        if entry is None:
+            raise ValueError(f"No metadata found for file_id: {file_id}")
+
+        return entry
+
+    @typechecked
+    def list_metadata(
+        self,
+        limit: int | None = None,
+        cursor: str | None = None,
+        sort: str = "upload_timestamp",
+        descending: bool = False,
+        filename_prefix: str | None = None,
+        uploaded_after: str | None = None,
+        uploaded_before: str | None = None,
+    ) -> tuple[list, str | None]:
+        """
+        List one page of metadata entries in (sort, file_id) order.
+        Pages are walked on a cached sorted view, so only the returned
+        entries are copied.
+        Returns a tuple of (entries, next_cursor); next_cursor is None on the last page.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+        position = decode_cursor(cursor, sort, descending) if cursor else None
+
+        keys, ordered = self._read_view(sort)
+        if descending:
+            stop = bisect_left(keys, position) if position else len(keys)
+            candidates = (ordered[i] for i in range(stop - 1, -1, -1))
+        else:
+            start = bisect_right(keys, position) if position else 0
+            candidates = (ordered[i] for i in range(start, len(ordered)))
+
+        page = []
+        for entry in candidates:
+            if not matches_filters(entry, filename_prefix, uploaded_after, uploaded_before):
+                continue
+            if limit is not None and len(page) == limit:
+                return page, encode_cursor(sort, descending, page[-1])
+            page.append(entry)
+
+        return page, None
+
+    @handle_file_errors
+    @typechecked
+    def search_metadata(self, query: str, limit: int = 20) -> list:
+        """
+        Search filenames with the in-memory index, which only has to take in
+        the entries added since the previous search.
+        Returns up to limit matching entries, best match first.
+        """
+
+        entries, index, _ = self._load()
+        with self._search_index.lock:
+            self._sync_search_index(entries)
+            file_ids = self._search_index.search(query, limit)
+        # The index can be ahead of entries; files added since they were loaded are left out
+        return [index[file_id] for file_id in file_ids if file_id in index]
+
+    @handle_file_errors
+    @typechecked
+    def count_metadata(self) -> int:
+        """
+        Count the metadata entries without copying them.
+        Returns the number of entries.
+        """
+
+        entries, _, _ = self._load()
+        return len(entries)
+
+    @typechecked
+    def metadata_version(self) -> str:
+        """
+        Return an opaque token that changes whenever the metadata changes,
+        in this or any other worker process. Reading it costs one memory
+        read of the shared version counter.
+        Returns the version token.
+        """
+
+        return self._version.token()
+
+    @typechecked
+    def cache_stats(self) -> dict:
+        """
+        Return the process-wide read cache counters for this metadata file.
+        Returns a dict with hits, misses and the number of cached entries.
+        """
+
+        return self._cache.stats()
+
+    def close(self):
+        """Release resources held by the repository; the JSON file needs none."""
+
+    @handle_file_errors
+    def _read_index(self) -> dict:
+        """Return the file_id -> entry index, loading metadata if needed."""
+
+        _, index, _ = self._load()
+        return index
+
+    @handle_file_errors
+    def _read_view(self, sort: str) -> tuple:
+        """
+        Return (keys, entries) sorted by (sort, file_id), built once per
+        cached version of the metadata.
+        """
+
+        entries, _, views = self._load()
+        view = views.get(sort)
+        if view is None:
+            ordered = sorted(entries, key=lambda entry: (entry[sort], entry["file_id"]))
+            view = ([(entry[sort], entry["file_id"]) for entry in ordered], ordered)
+            views[sort] = view
+        return view
+
+    def _load(self) -> tuple:
+        """
+        Return (entries, index, views), re-reading the file only when the
+        shared version counter has moved since the cache was filled.
+        Writers only ever rename complete files into place and bump the
+        version afterwards, so the file is read without the lock, and the
+        read is kept if the version did not change meanwhile. Readers
+        therefore never wait for each other, and only fall back to the
+        lock if writers keep replacing the file.
+        """
+
+        version = self._version.read()
+        cached = self._cache.lookup(version)
+        if cached is not None:
+            return cached
+
+        for _ in range(self.OPTIMISTIC_READ_ATTEMPTS):
+            entries = self._read_file()
+            current = self._version.read()
+            if current == version:
+                break
+            version = current
+        else:
+            with self._lock():
+                version = self._version.read()
+                entries = self._read_file()
+
+        return self._cache.store(version, entries)
+
+    def _read_file(self) -> list:
+        """
+        Parse the metadata file. Safe without the metadata lock, as writes
+        are atomic renames; callers compare versions around the read.
+        """
+
+        with open(self.METADATA_FILE, "r") as f:
+            return json.load(f)
+
+    def _append_entries(self, entries: list):
+        """Append a batch of entries in a single locked read-modify-write."""
+
+        with self._lock():
+            metadata = self._read_file()
+            metadata.extend(entries)
+            self._cache.invalidate()
+            self._write_file(metadata)
+
+        # Index the new entries now, so that searches after the upload do not have to
+        with self._search_index.lock:
+            self._sync_search_index(metadata)
+
+    def _sync_search_index(self, entries: list):
+        """
+        Bring the search index up to date with entries, which only ever grow
+        at the end between writes: just the new tail is indexed. If entries
+        is an older copy than the index has seen (loaded before a concurrent
+        upload synced it), the index is left as it is. If earlier entries
+        changed (write_metadata), the index is rebuilt.
+        Must be called with the search index lock held.
+        """
+
+        search_index = self._search_index
+        count, last_file_id = search_index.position or (0, None)
+        if count > len(entries) and (not entries or search_index.sequence.get(entries[-1]["file_id"]) == len(entries) - 1):
+            return
+        if count > len(entries) or (count and entries[count - 1]["file_id"] != last_file_id):
+            search_index.clear()
+            count = 0
+        search_index.add_many([(entry["file_id"], entry["filename"]) for entry in entries[count:]])
+        if entries:
+            search_index.position = (len(entries), entries[-1]["file_id"])
+
+    def _write_file(self, metadata: list):
+        """
+        Write the metadata to a temporary file, fsync it and rename it over
+        the metadata file, so readers never see a partial write, then bump
+        the version.
+        Must be called with the metadata lock held.
+        """
+
+        directory = os.path.dirname(os.path.abspath(self.METADATA_FILE))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".metadata-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(metadata, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.METADATA_FILE)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self._version.bump()
+
+    def _lock(self) -> InstrumentedLock:
+        """Return a new instrumented lock on the metadata lock file."""
+
+        return InstrumentedLock(
+            f"{self.METADATA_FILE}.lock",
+            name="metadata",
+            timeout=self.LOCK_TIMEOUT,
+            poll_interval=self.LOCK_POLL_INTERVAL,
+            max_poll_interval=self.LOCK_MAX_POLL_INTERVAL,
+        )
@@ -0,0 +1,51 @@
+import json
+import base64
+import binascii
+import app.exceptions as ex
+
+# Metadata fields that listings can be sorted by
+SORT_FIELDS: tuple = ("upload_timestamp", "filename", "size_in_bytes")
+
+def encode_cursor(sort: str, descending: bool, entry: dict) -> str:
+    """
+    Build an opaque cursor pointing just after the given entry.
+    Returns a URL-safe string.
+    """
+
+    payload = json.dumps([sort, descending, entry[sort], entry["file_id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, descending: bool) -> tuple:
+    """
+    Decode a cursor produced by encode_cursor for the same sort order.
+    Returns the (sort_value, file_id) position the next page starts after.
+    """
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_descending, value, file_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ex.InvalidCursorException("Cursor is malformed.")
+
+    if cursor_sort != sort or cursor_descending != descending:
+        raise ex.InvalidCursorException("Cursor does not match the requested sort order.")
+
+    expected_type = int if sort == "size_in_bytes" else str
+    if type(value) is not expected_type or not isinstance(file_id, str):
+        raise ex.InvalidCursorException("Cursor is malformed.")
+
+    return value, file_id
+
+def matches_filters(entry: dict, filename_prefix: str | None, uploaded_after: str | None, uploaded_before: str | None) -> bool:
+    """
+    Check an entry against the listing filters.
+    The filename prefix is case-insensitive; the upload range is inclusive.
+    """
+
+    if filename_prefix and not entry["filename"].casefold().startswith(filename_prefix.casefold()):
+        return False
+    if uploaded_after and entry["upload_timestamp"] < uploaded_after:
+        return False
+    if uploaded_before and entry["upload_timestamp"] > uploaded_before:
+        return False
+    return True
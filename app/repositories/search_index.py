@@ -0,0 +1,213 @@
+import re
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+# Words of a filename: runs of letters or of digits, so "Week7_Lab.pdf" has week, 7, lab and pdf
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d+")
+
+# Points a query term earns for matching a whole word, the start of a word, or anywhere in the name
+WHOLE_WORD, WORD_START, ANYWHERE = 3, 2, 1
+
+# Postings appended at once above which a word's list is re-sorted rather than inserted into
+BULK_SORT_THRESHOLD = 64
+
+class FilenameIndex:
+    """
+    In-memory search index over filenames, filled incrementally as entries
+    are added. Query terms of three characters or more match anywhere in
+    the name (candidates found by trigram); shorter terms match the start
+    of a word. Every term must match.
+    Each word keeps its postings in result order (shorter names, then newer
+    ones first), so a search walks the rarest term's postings best first
+    and stops as soon as no later posting can make the top results.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.names = {}
+        # " week 7 lab pdf ": the words of each name, so word matches are plain substring tests
+        self.words = {}
+        self.sequence = {}
+        self.trigrams = defaultdict(set)
+        self.prefixes = defaultdict(set)
+        # word -> [(len(name), -sequence, file_id)], sorted; every word, sorted; and words by trigram
+        self.postings = defaultdict(list)
+        self.vocabulary = []
+        self.word_trigrams = defaultdict(set)
+        # Where the owning repository stopped adding entries; its meaning is up to the repository
+        self.position = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, file_id: str, filename: str):
+        """Index one filename under its file_id."""
+
+        self.add_many([(file_id, filename)])
+
+    def add_many(self, items: list):
+        """Index (file_id, filename) pairs, in the order they were added to the metadata."""
+
+        new_postings = defaultdict(list)
+        for file_id, filename in items:
+            name = filename.casefold()
+            tokens = TOKEN_PATTERN.findall(name)
+            sequence = len(self.sequence)
+            self.names[file_id] = name
+            self.words[file_id] = f" {' '.join(tokens)} "
+            self.sequence[file_id] = sequence
+            for i in range(len(name) - 2):
+                self.trigrams[name[i:i + 3]].add(file_id)
+            for token in set(tokens):
+                for length in (1, 2):
+                    if len(token) >= length:
+                        self.prefixes[token[:length]].add(file_id)
+                new_postings[token].append((len(name), -sequence, file_id))
+
+        for word, added in new_postings.items():
+            postings = self.postings.get(word)
+            if postings is None:
+                insort(self.vocabulary, word)
+                for i in range(len(word) - 2):
+                    self.word_trigrams[word[i:i + 3]].add(word)
+                self.postings[word] = sorted(added)
+            elif len(added) > BULK_SORT_THRESHOLD:
+                postings.extend(added)
+                postings.sort()
+            else:
+                for posting in added:
+                    insort(postings, posting)
+
+    def clear(self):
+        """Drop every indexed filename."""
+
+        self.names.clear()
+        self.words.clear()
+        self.sequence.clear()
+        self.trigrams.clear()
+        self.prefixes.clear()
+        self.postings.clear()
+        self.vocabulary.clear()
+        self.word_trigrams.clear()
+        self.position = None
+
+    def search(self, query: str, limit: int) -> list:
+        """
+        Find the filenames matching every whitespace-separated term of query.
+        Results are ranked by how well the terms match (a whole word, then
+        the start of a word, then anywhere), then shorter names first, then
+        the most recently added.
+        Returns up to limit file_ids, best first.
+        """
+
+        terms = query.casefold().split()
+        if not terms or limit <= 0:
+            return []
+
+        driver = min(terms, key=self._estimate)
+        if self._estimate(driver) == 0:
+            return []
+        patterns = [(f" {term} ", f" {term}", term if len(term) >= 3 else None) for term in terms]
+        best_others = sum(self._best_points(term) for term in terms) - self._best_points(driver)
+
+        # (score, -len(name), sequence): the smallest item is the worst result kept
+        top = []
+        seen = set()
+        for points, length, negative_sequence, file_id in self._walk(driver):
+            if len(top) == limit:
+                worst_score, worst_negative_length, worst_sequence = top[0][:3]
+                # Nothing later in the walk can rank better than (points + best_others, length, sequence)
+                if (-(points + best_others), length, negative_sequence) > (-worst_score, -worst_negative_length, -worst_sequence):
+                    break
+            if file_id in seen:
+                continue
+            seen.add(file_id)
+            score = self._score(file_id, patterns)
+            if score is None:
+                continue
+            item = (score, -length, -negative_sequence, file_id)
+            if len(top) < limit:
+                heapq.heappush(top, item)
+            elif item > top[0]:
+                heapq.heapreplace(top, item)
+
+        return [file_id for *_, file_id in sorted(top, reverse=True)]
+
+    def _estimate(self, term: str) -> int:
+        """Return an upper bound on the number of names a term can match."""
+
+        if len(term) < 3:
+            return len(self.prefixes.get(term, ()))
+        return min(len(self.trigrams.get(term[i:i + 3], ())) for i in range(len(term) - 2))
+
+    def _best_points(self, term: str) -> int:
+        """Return the most points any indexed name can earn for a term."""
+
+        if term in self.postings:
+            return WHOLE_WORD
+        i = bisect_left(self.vocabulary, term)
+        if i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+            return WORD_START
+        return ANYWHERE
+
+    def _walk(self, term: str):
+        """
+        Yield (points, len(name), -sequence, file_id) for the names term
+        matches, best first: whole words, then word starts, then (for terms
+        of three characters or more) anywhere else. A name can be yielded
+        more than once.
+        """
+
+        if TOKEN_PATTERN.fullmatch(term):
+            for length, negative_sequence, file_id in self.postings.get(term, ()):
+                yield WHOLE_WORD, length, negative_sequence, file_id
+
+            longer = []
+            for i in range(bisect_left(self.vocabulary, term), len(self.vocabulary)):
+                word = self.vocabulary[i]
+                if not word.startswith(term):
+                    break
+                if word != term:
+                    longer.append(self.postings[word])
+            for length, negative_sequence, file_id in heapq.merge(*longer):
+                yield WORD_START, length, negative_sequence, file_id
+
+        if len(term) < 3:
+            return
+        if TOKEN_PATTERN.fullmatch(term):
+            # A run of letters (or digits) can only occur inside one word of the name
+            words = _intersect(self.word_trigrams, term)
+            inside = heapq.merge(*(self.postings[word] for word in words if term in word and not word.startswith(term)))
+        else:
+            inside = sorted(
+                (len(self.names[file_id]), -self.sequence[file_id], file_id)
+                for file_id in _intersect(self.trigrams, term)
+                if term in self.names[file_id]
+            )
+        for length, negative_sequence, file_id in inside:
+            yield ANYWHERE, length, negative_sequence, file_id
+
+    def _score(self, file_id: str, patterns: list) -> int | None:
+        """Return the points a name earns for the query terms, or None if one of them does not match."""
+
+        name = self.names[file_id]
+        words = self.words[file_id]
+        score = 0
+        for whole_word, word_start, anywhere in patterns:
+            if whole_word in words:
+                score += WHOLE_WORD
+            elif word_start in words:
+                score += WORD_START
+            elif anywhere is not None and anywhere in name:
+                score += ANYWHERE
+            else:
+                return None
+        return score
+
+def _intersect(trigrams: dict, term: str) -> set:
+    """Return the items filed under every trigram of term (three characters or more)."""
+
+    postings = sorted((trigrams.get(term[i:i + 3], set()) for i in range(len(term) - 2)), key=len)
+    return set.intersection(*postings)
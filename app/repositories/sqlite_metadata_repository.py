@@ -0,0 +1,322 @@
+import os
+import json
+import uuid
+from contextlib import contextmanager
+from app.exceptions import handle_file_errors
+from app.repositories.metadata_repository import build_metadata_entry
+from app.repositories.pagination import SORT_FIELDS, decode_cursor, encode_cursor
+from app.repositories.search_index import FilenameIndex
+from app.repositories.sqlite_repository import SqliteRepository
+from app.typecheck import typechecked
+
+class SqliteMetadataRepository(SqliteRepository):
+    """Repository for managing file metadata in a SQLite database."""
+
+    DATABASE_FILE: str = "metadata.db"
+
+    # Columns stored natively; any other entry keys go to the "extra" JSON column
+    COLUMNS: tuple = ("file_id", "filename", "upload_timestamp", "size_in_bytes")
+
+    # Filename search indexes per database file, kept up to date incrementally by rowid
+    _search_indexes: dict = {}
+
+    def __init__(self, database_file: str = None):
+        if database_file:
+            self.DATABASE_FILE = str(database_file)
+
+        # Ensure the schema exists
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS metadata (
+                    file_id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    upload_timestamp TEXT NOT NULL,
+                    size_in_bytes INTEGER NOT NULL,
+                    extra TEXT
+                )
+                """
+            )
+            for column in SORT_FIELDS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS metadata_by_{column} ON metadata ({column}, file_id)")
+
+            # Version counter bumped by every write transaction; the random epoch
+            # keeps versions distinct if the database file is ever recreated
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('epoch', ?)", (uuid.uuid4().hex,))
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('version', '0')")
+
+        with self._connections_lock:
+            self._search_index = self._search_indexes.setdefault(os.path.abspath(self.DATABASE_FILE), FilenameIndex())
+
+    @handle_file_errors
+    @typechecked
+    def read_metadata(self) -> list:
+        """
+        Read all metadata entries in insertion order.
+        Returns a list of metadata entries.
+        """
+
+        conn, lock = self._connection_entry()
+        with lock:
+            rows = conn.execute(
+                "SELECT file_id, filename, upload_timestamp, size_in_bytes, extra FROM metadata ORDER BY rowid"
+            ).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    @handle_file_errors
+    @typechecked
+    def write_metadata(self, metadata: list):
+        """Replace all metadata entries in a single transaction."""
+
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM metadata")
+            conn.executemany(
+                "INSERT INTO metadata VALUES (?, ?, ?, ?, ?)",
+                [self._entry_to_row(entry) for entry in metadata]
+            )
+
+    @handle_file_errors
+    @typechecked
+    def add_metadata(
+        self,
+        filename: str,
+        file_size: int,
+        sha256: str | None = None,
+        content_encoding: str | None = None,
+        stored_size: int | None = None,
+        jobs: dict | None = None,
+        file_id: uuid.UUID | None = None,
+    ) -> uuid.UUID:
+        """
+        Add a new entry to the metadata table.
+        Returns the file_id, generated unless one was given.
+        """
+        file_id, new_entry = build_metadata_entry(filename, file_size, sha256, content_encoding, stored_size, jobs, file_id)
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO metadata VALUES (?, ?, ?, ?, ?)", self._entry_to_row(new_entry))
+
+        return file_id
+
+    @handle_file_errors
+    @typechecked
+    def add_metadata_batch(self, files: list) -> list:
+        """
+        Add one row per file in a single transaction.
+        Returns the generated file_ids, in the order of files.
+        """
+        built = [build_metadata_entry(**file) for file in files]
+        if built:
+            with self._transaction() as conn:
+                conn.executemany("INSERT INTO metadata VALUES (?, ?, ?, ?, ?)", [self._entry_to_row(entry) for _, entry in built])
+
+        return [file_id for file_id, _ in built]
+
+    @typechecked
+    def update_metadata(self, file_id: uuid.UUID, changes: dict) -> dict:
+        """
+        Merge changes into the row of file_id in a single transaction.
+        Raises ValueError if there is no such entry.
+        Returns the updated entry.
+        """
+
+        entry = self._update_row(str(file_id), changes)
+        if entry is None:
+            raise ValueError(f"No metadata found for file_id: {file_id}")
+
+        return entry
+
+    @typechecked
+    def get_metadata_by_id(self, file_id: uuid.UUID) -> dict:
+        """
+        Retrieve metadata entry by file_id using the primary key index.
+        Returns the metadata dictionary if found, else raises ValueError.
+        """
+
+        rows = self._fetch_all(
+            "SELECT file_id, filename, upload_timestamp, size_in_bytes, extra FROM metadata WHERE file_id = ?",
+            [str(file_id)]
+        )
+        if not rows:
+            raise ValueError(f"No metadata found for file_id: {file_id}")
+
+        return self._row_to_entry(rows[0])
+
+    @typechecked
+    def list_metadata(
+        self,
+        limit: int | None = None,
+        cursor: str | None = None,
+        sort: str = "upload_timestamp",
+        descending: bool = False,
+        filename_prefix: str | None = None,
+        uploaded_after: str | None = None,
+        uploaded_before: str | None = None,
+    ) -> tuple[list, str | None]:
+        """
+        List one page of metadata entries in (sort, file_id) order using
+        keyset pagination over the sort index.
+        Returns a tuple of (entries, next_cursor); next_cursor is None on the last page.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+
+        clauses, params = [], []
+        if cursor:
+            clauses.append(f"({sort}, file_id) {'<' if descending else '>'} (?, ?)")
+            params.extend(decode_cursor(cursor, sort, descending))
+        if filename_prefix:
+            escaped = filename_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("filename LIKE ? ESCAPE '\\'")
+            params.append(f"{escaped}%")
+        if uploaded_after:
+            clauses.append("upload_timestamp >= ?")
+            params.append(uploaded_after)
+        if uploaded_before:
+            clauses.append("upload_timestamp <= ?")
+            params.append(uploaded_before)
+
+        direction = "DESC" if descending else "ASC"
+        query = "SELECT file_id, filename, upload_timestamp, size_in_bytes, extra FROM metadata"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY {sort} {direction}, file_id {direction}"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit + 1)
+
+        page = [self._row_to_entry(row) for row in self._fetch_all(query, params)]
+        if limit is not None and len(page) > limit:
+            page = page[:limit]
+            return page, encode_cursor(sort, descending, page[-1])
+
+        return page, None
+
+    @typechecked
+    def count_metadata(self) -> int:
+        """
+        Count the metadata rows.
+        Returns the number of entries.
+        """
+
+        return self._fetch_all("SELECT COUNT(*) FROM metadata", [])[0][0]
+
+    @typechecked
+    def search_metadata(self, query: str, limit: int = 20) -> list:
+        """
+        Search filenames with the in-memory index. Only rows added since the
+        previous search are read (by rowid); if the last indexed row changed,
+        as after write_metadata, the index is rebuilt.
+        Returns up to limit matching entries, best match first.
+        """
+
+        search_index = self._search_index
+        with search_index.lock:
+            rowid, last_file_id = search_index.position or (0, None)
+            if rowid and self._fetch_all("SELECT file_id FROM metadata WHERE rowid = ?", [rowid]) != [(last_file_id,)]:
+                search_index.clear()
+                rowid = 0
+            rows = self._fetch_all("SELECT rowid, file_id, filename FROM metadata WHERE rowid > ? ORDER BY rowid", [rowid])
+            search_index.add_many([(file_id, filename) for _, file_id, filename in rows])
+            if rows:
+                search_index.position = (rows[-1][0], rows[-1][1])
+            file_ids = search_index.search(query, limit)
+
+        if not file_ids:
+            return []
+        placeholders = ", ".join("?" * len(file_ids))
+        rows = self._fetch_all(
+            f"SELECT file_id, filename, upload_timestamp, size_in_bytes, extra FROM metadata WHERE file_id IN ({placeholders})",
+            file_ids
+        )
+        entries = {row[0]: self._row_to_entry(row) for row in rows}
+        return [entries[file_id] for file_id in file_ids if file_id in entries]
+
+    @typechecked
+    def metadata_version(self) -> str | None:
+        """
+        Return an opaque token that changes whenever the metadata changes.
+        Returns the database epoch and write counter.
+        """
+
+        rows = dict(self._fetch_all("SELECT key, value FROM meta WHERE key IN ('epoch', 'version')", []))
+        return f"{rows['epoch']}-{rows['version']}"
+
+    @typechecked
+    def import_json(self, metadata_file: str) -> int:
+        """
+        Import entries from an existing metadata.json file.
+        Entries whose file_id is already present are skipped.
+        Returns the number of entries imported.
+        """
+
+        with open(metadata_file, "r") as f:
+            metadata = json.load(f)
+
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO metadata VALUES (?, ?, ?, ?, ?)",
+                [self._entry_to_row(entry) for entry in metadata]
+            )
+            return conn.total_changes - before
+
+    @handle_file_errors
+    def _fetch_all(self, query: str, params: list) -> list:
+        """Run a read query on the shared connection and return all rows."""
+
+        conn, lock = self._connection_entry()
+        with lock:
+            return conn.execute(query, params).fetchall()
+
+    @handle_file_errors
+    def _update_row(self, file_id: str, changes: dict) -> dict | None:
+        """
+        Merge changes into the row of file_id in a single transaction.
+        Returns the updated entry, or None if there is no such row.
+        """
+
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT file_id, filename, upload_timestamp, size_in_bytes, extra FROM metadata WHERE file_id = ?",
+                (file_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = self._row_to_entry(row)
+            entry.update(changes)
+            # UPDATE rather than REPLACE keeps the rowid, and with it the insertion order
+            file_id_value, *values = self._entry_to_row(entry)
+            conn.execute(
+                "UPDATE metadata SET filename = ?, upload_timestamp = ?, size_in_bytes = ?, extra = ? WHERE file_id = ?",
+                (*values, file_id_value)
+            )
+        return entry
+
+    @contextmanager
+    def _transaction(self):
+        """Run the body as a single write transaction that also bumps the metadata version."""
+
+        with super()._transaction() as conn:
+            yield conn
+            conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version'")
+
+    def _entry_to_row(self, entry: dict) -> tuple:
+        """Convert a metadata entry into a table row."""
+
+        extra = {k: v for k, v in entry.items() if k not in self.COLUMNS}
+        return (
+            entry["file_id"],
+            entry["filename"],
+            entry["upload_timestamp"],
+            entry["size_in_bytes"],
+            json.dumps(extra) if extra else None,
+        )
+
+    def _row_to_entry(self, row: tuple) -> dict:
+        """Convert a table row back into a metadata entry."""
+
+        entry = dict(zip(self.COLUMNS, row[:4]))
+        if row[4]:
+            entry.update(json.loads(row[4]))
+        return entry
@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+class SqliteRepository:
+    """
+    Base for repositories kept in a SQLite database file: one connection
+    per (process, database file) in WAL mode, shared by every instance,
+    with a lock serialising its use across threads.
+    """
+
+    DATABASE_FILE: str = "database.db"
+
+    # Milliseconds a write waits for another process's transaction before failing with "database is locked"
+    BUSY_TIMEOUT_MS: int = 5000
+
+    # One connection per (process, database file), shared by every repository instance
+    _connections: dict = {}
+    _connections_lock = threading.Lock()
+
+    def close(self):
+        """Close this process's connection to the database file."""
+
+        key = (os.getpid(), os.path.abspath(self.DATABASE_FILE))
+        with self._connections_lock:
+            entry = self._connections.pop(key, None)
+        if entry is not None:
+            entry[0].close()
+
+    def _connection_entry(self) -> tuple:
+        """
+        Get or open the (connection, lock) pair for the current process.
+        Keyed by pid so that forked workers never share a connection.
+        """
+
+        key = (os.getpid(), os.path.abspath(self.DATABASE_FILE))
+        entry = self._connections.get(key)
+        if entry is not None:
+            return entry
+
+        with self._connections_lock:
+            entry = self._connections.get(key)
+            if entry is None:
+                conn = sqlite3.connect(self.DATABASE_FILE, isolation_level=None, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(f"PRAGMA busy_timeout={int(self.BUSY_TIMEOUT_MS)}")
+                entry = (conn, threading.Lock())
+                self._connections[key] = entry
+        return entry
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Run the body as a single write transaction on the shared connection.
+        A busy database raises sqlite3.OperationalError ("database is
+        locked"), which handle_file_errors answers with 503.
+        """
+
+        conn, lock = self._connection_entry()
+        with lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Iterable, Iterator
+from uuid import UUID
+from app.typecheck import typechecked
+import app.exceptions as ex
+
+class UploadSessionRepository:
+    """
+    Repository for resumable upload sessions. Each session is a directory
+    in the staging area holding session.json and one file per received chunk.
+    """
+
+    STAGING_DIR_NAME: str = ".staging"
+    STAGING_DIR: str = os.path.join("uploads", STAGING_DIR_NAME)
+    SESSION_FILE: str = "session.json"
+    CHUNK_SUFFIX: str = ".chunk"
+    CLAIMED_SUFFIX: str = ".completing"
+
+    # Size of every chunk except the last one
+    CHUNK_SIZE: int = 8 * 1024 * 1024
+
+    # Sessions with no activity for this long are garbage-collected
+    SESSION_TTL_SECONDS: float = 24 * 3600
+
+    def __init__(self, staging_dir: str = None, chunk_size: int = None, session_ttl_seconds: float = None):
+        if staging_dir:
+            self.STAGING_DIR = staging_dir
+        if chunk_size is not None:
+            self.CHUNK_SIZE = chunk_size
+        if session_ttl_seconds is not None:
+            self.SESSION_TTL_SECONDS = session_ttl_seconds
+
+    @typechecked
+    def create_session(self, filename: str, size: int) -> dict:
+        """
+        Start a new upload session for a file of the given size.
+        Returns the session record.
+        """
+
+        session_id = uuid.uuid4()
+        session = {
+            "session_id": str(session_id),
+            "filename": filename,
+            "size": size,
+            "chunk_size": self.CHUNK_SIZE,
+            "created_at": datetime.now().isoformat(),
+        }
+
+        session_dir = self._session_dir(session_id)
+        os.makedirs(session_dir)  # Creates the staging area on first use
+        with open(os.path.join(session_dir, self.SESSION_FILE), "w") as f:
+            json.dump(session, f)
+        return session
+
+    @typechecked
+    def get_session(self, session_id: UUID) -> dict:
+        """
+        Load a session record.
+        Raises UploadSessionNotFoundException if the session does not exist.
+        Returns the session record.
+        """
+
+        try:
+            with open(os.path.join(self._session_dir(session_id), self.SESSION_FILE), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ex.UploadSessionNotFoundException(f"Upload session {session_id} not found.")
+
+    @typechecked
+    def get_chunk_count(self, session: dict) -> int:
+        """
+        Get the number of chunks a session's file is split into.
+        Returns at least 1, so that empty files still take one (empty) chunk.
+        """
+
+        return max(1, -(-session["size"] // session["chunk_size"]))
+
+    @typechecked
+    def get_chunk_length(self, session: dict, index: int) -> int:
+        """
+        Get the exact length the chunk at index must have.
+        Raises InvalidUploadChunkException if index is out of range.
+        Returns the length in bytes.
+        """
+
+        count = self.get_chunk_count(session)
+        if not 0 <= index < count:
+            raise ex.InvalidUploadChunkException(f"Chunk index must be between 0 and {count - 1}.")
+        if index < count - 1:
+            return session["chunk_size"]
+        return session["size"] - session["chunk_size"] * (count - 1)
+
+    @typechecked
+    def write_chunk(self, session_id: UUID, index: int, chunks: Iterable[bytes]) -> int:
+        """
+        Store one numbered chunk. The bytes go to a temporary file that is
+        renamed into place only once the length is right, so a chunk is either
+        fully received or absent, and re-sending a chunk simply replaces it.
+        Raises InvalidUploadChunkException if the length is wrong, and
+        UploadSessionNotFoundException if the session is completed or
+        removed while the chunk arrives.
+        Returns the number of bytes stored.
+        """
+
+        session = self.get_session(session_id)
+        expected = self.get_chunk_length(session, index)
+
+        session_dir = self._session_dir(session_id)
+        gone = ex.UploadSessionNotFoundException(f"Upload session {session_id} not found or already completed.")
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=session_dir, suffix=".part")
+        except FileNotFoundError:
+            raise gone
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > expected:
+                        break
+                    f.write(chunk)
+            if size != expected:
+                raise ex.InvalidUploadChunkException(f"Chunk {index} must be exactly {expected} bytes.")
+            try:
+                os.replace(temp_path, os.path.join(session_dir, f"{index}{self.CHUNK_SUFFIX}"))
+            except FileNotFoundError:
+                # claim_session renamed the directory away while the chunk was arriving
+                raise gone
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        return size
+
+    @typechecked
+    def get_received_chunks(self, session_id: UUID) -> list:
+        """
+        List the chunks received so far.
+        Returns the sorted chunk indexes.
+        """
+
+        self.get_session(session_id)
+        received = []
+        for name in os.listdir(self._session_dir(session_id)):
+            if name.endswith(self.CHUNK_SUFFIX):
+                received.append(int(name[:-len(self.CHUNK_SUFFIX)]))
+        return sorted(received)
+
+    @typechecked
+    def get_expires_at(self, session_id: UUID) -> datetime:
+        """
+        Get when a session will be garbage-collected if nothing more arrives.
+        Returns a naive local datetime.
+        """
+
+        last_activity = os.stat(self._session_dir(session_id)).st_mtime
+        return datetime.fromtimestamp(last_activity + self.SESSION_TTL_SECONDS)
+
+    @typechecked
+    def claim_session(self, session_id: UUID) -> dict:
+        """
+        Take exclusive ownership of a session for assembly by renaming its
+        directory, so concurrent completions cannot commit it twice. The
+        claim counts as activity, so collect_expired leaves the session
+        alone for a full TTL while it is assembled.
+        Raises UploadSessionNotFoundException if it is gone or already claimed.
+        Returns the session record.
+        """
+
+        session = self.get_session(session_id)
+        try:
+            os.rename(self._session_dir(session_id), self._claimed_dir(session_id))
+        except FileNotFoundError:
+            raise ex.UploadSessionNotFoundException(f"Upload session {session_id} not found.")
+        os.utime(self._claimed_dir(session_id))
+        return session
+
+    @typechecked
+    def release_session(self, session_id: UUID):
+        """Give a claimed session back, e.g. after its assembly failed."""
+
+        os.rename(self._claimed_dir(session_id), self._session_dir(session_id))
+
+    @typechecked
+    def iter_claimed_chunks(self, session_id: UUID, chunk_count: int, read_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """Yield the bytes of a claimed session's chunks in order."""
+
+        claimed_dir = self._claimed_dir(session_id)
+        for index in range(chunk_count):
+            with open(os.path.join(claimed_dir, f"{index}{self.CHUNK_SUFFIX}"), "rb") as f:
+                yield from iter(lambda: f.read(read_size), b"")
+
+    @typechecked
+    def delete_session(self, session_id: UUID):
+        """Remove a session and its chunks, whether or not it is claimed."""
+
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+        shutil.rmtree(self._claimed_dir(session_id), ignore_errors=True)
+
+    @typechecked
+    def collect_expired(self) -> int:
+        """
+        Remove sessions with no activity for SESSION_TTL_SECONDS, including
+        claimed ones left behind by an assembly that crashed.
+        Returns the number of sessions removed.
+        """
+
+        removed = 0
+        cutoff = time.time() - self.SESSION_TTL_SECONDS
+        if not os.path.isdir(self.STAGING_DIR):
+            return 0
+        with os.scandir(self.STAGING_DIR) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_dir(follow_symlinks=False) or entry.stat().st_mtime >= cutoff:
+                        continue
+                except FileNotFoundError:
+                    continue
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def _session_dir(self, session_id: UUID) -> str:
+        """Return the staging directory of an open session."""
+
+        return os.path.join(self.STAGING_DIR, str(session_id))
+
+    def _claimed_dir(self, session_id: UUID) -> str:
+        """Return the staging directory of a session being assembled."""
+
+        return os.path.join(self.STAGING_DIR, f"{session_id}{self.CLAIMED_SUFFIX}")
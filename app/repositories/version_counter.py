@@ -0,0 +1,65 @@
+import os
+import mmap
+import struct
+
+# A random epoch, then the version: two native unsigned 64-bit integers
+_LAYOUT = struct.Struct("=QQ")
+
+class SharedVersionCounter:
+    """
+    Version number kept in a small memory-mapped file, so every worker
+    process mapping the same file sees a bump as soon as it is made.
+    Reading it is one memory read: no system call, no lock.
+    The epoch is chosen when the file is created, so versions stay
+    distinct if it is ever deleted and recreated.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < _LAYOUT.size:
+                # New file: callers hold the lock guarding the counter, so no one else is initialising it
+                os.ftruncate(fd, _LAYOUT.size)
+                os.pwrite(fd, _LAYOUT.pack(int.from_bytes(os.urandom(8), "little"), 0), 0)
+            self._map = mmap.mmap(fd, _LAYOUT.size)
+        finally:
+            # The mapping keeps its own reference to the file
+            os.close(fd)
+
+    def read(self) -> tuple:
+        """
+        Return (epoch, version). The value is read until two reads agree,
+        so a read racing a bump never returns a torn value.
+        Returns a tuple of two integers.
+        """
+
+        value = _LAYOUT.unpack_from(self._map)
+        while (again := _LAYOUT.unpack_from(self._map)) != value:
+            value = again
+        return value
+
+    def bump(self) -> int:
+        """
+        Increment the version and flush it to the file, so it does not go
+        backwards after a crash. Must be called with the lock that guards
+        the data it versions held, which makes the increment atomic
+        across processes.
+        Returns the new version.
+        """
+
+        epoch, version = self.read()
+        _LAYOUT.pack_into(self._map, 0, epoch, version + 1)
+        self._map.flush()
+        return version + 1
+
+    def token(self) -> str:
+        """Return the current epoch and version as an opaque string, for ETags and cache keys."""
+
+        epoch, version = self.read()
+        return f"{epoch:016x}-{version}"
+
+    def close(self):
+        """Unmap the file."""
+
+        self._map.close()
@@ -0,0 +1,182 @@
+import gzip
+import anyio
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from secrets import token_hex
+from urllib.parse import quote
+from fastapi.responses import FileResponse, Response
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+# Response bodies smaller than this are sent uncompressed
+GZIP_MIN_SIZE = 1024
+
+def is_not_modified(request_headers: Headers, etag: str, last_modified: datetime | None = None) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since (RFC 9110 section 13.2.2).
+    If-None-Match uses weak comparison and, when present, If-Modified-Since is ignored.
+    Returns True if a 304 Not Modified should be sent instead of the body.
+    """
+
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+def accepts_encoding(request_headers: Headers, coding: str) -> bool:
+    """
+    Evaluate Accept-Encoding for one content coding (RFC 9110 section 12.5.3).
+    An explicit entry for the coding wins over "*"; a q-value of 0 refuses it.
+    Returns True if the client accepts a response encoded with coding.
+    """
+
+    accept_encoding = request_headers.get("accept-encoding")
+    if not accept_encoding:
+        return False
+
+    qualities = {}
+    for item in accept_encoding.split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+
+    quality = qualities.get(coding, qualities.get("*", 0.0))
+    return quality > 0
+
+def content_disposition(filename: str) -> str:
+    """
+    Build an attachment Content-Disposition value the way FileResponse does,
+    using the RFC 5987 form for names that need percent-encoding.
+    Returns the header value.
+    """
+
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+def negotiate_gzip(request_headers: Headers, response: Response) -> Response:
+    """
+    Compress an already rendered response body (e.g. a TemplateResponse) with
+    gzip when it is at least GZIP_MIN_SIZE bytes and the client accepts it.
+    Returns the same response, modified in place.
+    """
+
+    response.headers["Vary"] = "Accept-Encoding"
+    if len(response.body) < GZIP_MIN_SIZE or not accepts_encoding(request_headers, "gzip"):
+        return response
+
+    response.body = gzip.compress(response.body, compresslevel=6, mtime=0)
+    response.headers["Content-Encoding"] = "gzip"
+    response.headers["Content-Length"] = str(len(response.body))
+    return response
+
+class GunzipFileResponse(Response):
+    """
+    Streams a gzip-compressed file decompressed, for clients that do not
+    accept the stored encoding. The decompressed length is known from the
+    metadata, so Content-Length is still sent; byte ranges are not offered.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, size: int, filename: str, headers: dict | None = None, media_type: str | None = None):
+        super().__init__(headers=headers, media_type=media_type)
+        self.path = path
+        self.headers["content-disposition"] = content_disposition(filename)
+        self.headers["content-length"] = str(size)
+        self.headers["accept-ranges"] = "none"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        file = await anyio.to_thread.run_sync(gzip.open, self.path, "rb")
+        try:
+            while chunk := await anyio.to_thread.run_sync(file.read, self.chunk_size):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            await anyio.to_thread.run_sync(file.close)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+class ProxyFileResponse(Response):
+    """
+    Empty response that tells the reverse proxy to send a file itself:
+    X-Accel-Redirect (nginx) with an internal URI, or X-Sendfile (Apache,
+    lighttpd) with a filesystem path. The proxy handles Range and streams
+    the bytes with sendfile, so the worker is free as soon as this returns.
+    """
+
+    def __init__(self, header: str, target: str, filename: str, headers: dict | None = None, media_type: str | None = None):
+        super().__init__(headers=headers, media_type=media_type)
+        self.headers[header] = target
+        self.headers["content-disposition"] = content_disposition(filename)
+        # The proxy sends the file's own length
+        del self.headers["content-length"]
+
+class RangeFileResponse(FileResponse):
+    """
+    FileResponse whose multi-range answers are well-formed multipart/byteranges
+    bodies (RFC 9110 section 14.6). Starlette puts the multipart media type in
+    Content-Range instead of Content-Type, which download managers reject.
+    """
+
+    async def _handle_multiple_ranges(
+        self,
+        send: Send,
+        ranges: list[tuple[int, int]],
+        file_size: int,
+        send_header_only: bool,
+    ) -> None:
+        boundary = token_hex(13)
+        content_type = self.headers["content-type"]
+        # Every part after the first is preceded by the CRLF that ends the previous body
+        part_headers = [
+            (
+                f"--{boundary}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Range: bytes {start}-{end - 1}/{file_size}\r\n\r\n"
+            ).encode("latin-1")
+            for start, end in ranges
+        ]
+        part_headers[1:] = [b"\r\n" + header for header in part_headers[1:]]
+        closing = f"\r\n--{boundary}--\r\n".encode("latin-1")
+
+        content_length = sum(len(header) + end - start for header, (start, end) in zip(part_headers, ranges)) + len(closing)
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(content_length)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            for header, (start, end) in zip(part_headers, ranges):
+                await send({"type": "http.response.body", "body": header, "more_body": True})
+                await file.seek(start)
+                while start < end:
+                    chunk = await file.read(min(self.chunk_size, end - start))
+                    start += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": closing, "more_body": False})
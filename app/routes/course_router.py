@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from app.responses import negotiate_gzip
 
 router = APIRouter(prefix="/course", tags=["Course"])
 templates = Jinja2Templates(directory="app/templates")
@@ -9,7 +10,8 @@ templates = Jinja2Templates(directory="app/templates")
 async def course_page(request: Request):
     """Render the course page."""
     
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "course_page.html",
         {"request": request}
     )
+    return negotiate_gzip(request.headers, response)
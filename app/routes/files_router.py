@@ -1,35 +1,223 @@
-from fastapi import APIRouter, UploadFile, HTTPException, status, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, HTTPException, status, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from app.responses import GZIP_MIN_SIZE, GunzipFileResponse, ProxyFileResponse, RangeFileResponse, accepts_encoding, content_disposition, is_not_modified
 from app.services.file_service import FileService
+from app.services.archive import stream_zip
 from app.dependencies import get_file_service
+from app.concurrency import run_io
+from app import config
+from urllib.parse import quote
+import os
+from datetime import datetime
+from email.utils import format_datetime
+from typing import Literal
 from uuid import UUID
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
+# Size of the chunks read from an upload and written to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # Upload a file
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def upload_file(file: UploadFile, fs: FileService = Depends(get_file_service)):
     """Upload a file with metadata handling and file locking."""
 
-    content = await file.read()
-    file_id = fs.save_uploaded_file(filename=file.filename, content=content)
+    chunks = iter(lambda: file.file.read(UPLOAD_CHUNK_SIZE), b"")
+    file_id = await run_io(fs.save_uploaded_stream, filename=file.filename, chunks=chunks)
     
     return {"file_id": str(file_id), "message": "File uploaded successfully!"}
 
 
-# List all files
+# Upload many files in one request
+@router.post("/batch", status_code=status.HTTP_201_CREATED)
+async def upload_files(files: list[UploadFile], response: Response, fs: FileService = Depends(get_file_service)):
+    """
+    Upload several files with a single metadata write.
+    Each file is validated on its own and gets its own result; the request
+    answers 400 only if every file was rejected.
+    """
+
+    results = await run_io(
+        fs.save_uploaded_batch,
+        [(file.filename, iter(lambda file=file: file.file.read(UPLOAD_CHUNK_SIZE), b"")) for file in files],
+    )
+
+    body = []
+    for result in results:
+        if "file_id" in result:
+            body.append({"filename": result["filename"], "file_id": str(result["file_id"]), "status": "uploaded"})
+        else:
+            body.append({"filename": result["filename"], "status": "rejected", "detail": result["error"]})
+    uploaded = sum(item["status"] == "uploaded" for item in body)
+    if not uploaded:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+
+    return {"uploaded": uploaded, "rejected": len(body) - uploaded, "files": body}
+
+
+# List files, one page at a time
 @router.get("/")
-async def list_files(fs: FileService = Depends(get_file_service)):
-    """List all uploaded files with metadata."""
+async def list_files(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = None,
+    sort: Literal["upload_timestamp", "filename", "size_in_bytes"] = "upload_timestamp",
+    order: Literal["asc", "desc"] = "asc",
+    filename_prefix: str | None = None,
+    uploaded_after: datetime | None = None,
+    uploaded_before: datetime | None = None,
+    fs: FileService = Depends(get_file_service),
+):
+    """
+    List uploaded files with metadata.
+    Without a limit every matching file is returned; otherwise pass
+    next_cursor back as cursor to fetch the following page.
+    Answers If-None-Match with 304 while the metadata is unchanged.
+    Serialised bodies are cached per metadata version and query, and large
+    ones are sent gzip-compressed to clients that accept it.
+    """
+
+    # Taken before listing: if metadata changes meanwhile, the ETag is already stale
+    etag = await run_io(fs.get_listing_etag, str(request.query_params))
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag is not None:
+        # The gzip representation has different bytes, so it gets its own ETag
+        gzip_etag = etag.removesuffix('"') + '-gzip"'
+        for candidate in (etag, gzip_etag):
+            if is_not_modified(request.headers, candidate):
+                headers["ETag"] = candidate
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    listing = await run_io(
+        fs.render_listing,
+        etag,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        descending=order == "desc",
+        filename_prefix=filename_prefix,
+        uploaded_after=uploaded_after,
+        uploaded_before=uploaded_before,
+    )
+    if accepts_encoding(request.headers, "gzip") and len(listing.body) >= GZIP_MIN_SIZE:
+        if etag is not None:
+            headers["ETag"] = gzip_etag
+        headers["Content-Encoding"] = "gzip"
+        return Response(await run_io(listing.gzipped), media_type="application/json", headers=headers)
+
+    if etag is not None:
+        headers["ETag"] = etag
+    return Response(listing.body, media_type="application/json", headers=headers)
+
+# Search files by filename
+@router.get("/search")
+async def search_files(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    fs: FileService = Depends(get_file_service),
+):
+    """
+    Search uploaded files by filename. Every word of q must appear in the
+    name: words of three or more characters anywhere, shorter ones at the
+    start of a word. Best matches come first.
+    """
+
+    files = await run_io(fs.search_files, q, limit)
+    return {"query": q, "files": files}
+
+
+# Download several files, or all of them, as one ZIP archive
+@router.get("/archive")
+async def download_archive(
+    ids: str = Query("all", description='Comma-separated file_ids, or "all".'),
+    fs: FileService = Depends(get_file_service),
+):
+    """
+    Stream a ZIP archive of the requested files, built while it is sent,
+    with each file under its original filename.
+    """
+
+    if ids == "all":
+        file_ids = None
+    else:
+        try:
+            file_ids = [UUID(value.strip()) for value in ids.split(",") if value.strip()]
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be file_ids separated by commas, or \"all\".")
+        if not file_ids:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No file_ids given.")
+
+    members = await run_io(fs.get_archive_members, file_ids)
+
+    async def archive_chunks():
+        chunks = stream_zip(members)
+        try:
+            while (chunk := await run_io(next, chunks, None)) is not None:
+                yield chunk
+        finally:
+            # Closes the file being read if the client disconnects mid-archive
+            chunks.close()
+
+    return StreamingResponse(
+        archive_chunks(),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition("classdrop-files.zip")},
+    )
 
-    return {"files": fs.get_all_files_metadata()}
 
 # Download a file by file_id
-@router.get("/{file_id}")
-async def download_file(file_id: UUID, fs: FileService = Depends(get_file_service)):
-    """Download a file by its unique file_id."""
+@router.api_route("/{file_id}", methods=["GET", "HEAD"])
+async def download_file(file_id: UUID, request: Request, fs: FileService = Depends(get_file_service)):
+    """
+    Download a file by its unique file_id.
+    Supports Range / If-Range requests (single and multiple ranges), so
+    interrupted downloads can be resumed from where they stopped, and
+    answers If-None-Match / If-Modified-Since with 304.
+    Files stored compressed are sent as-is with Content-Encoding when the
+    client accepts it, and decompressed on the fly otherwise.
+    In the x-accel-redirect / x-sendfile download modes the reverse proxy
+    sends the file; decompression stays in the worker, and so do, behind
+    nginx, gzip-encoded responses and If-Range resumes.
+    """
     
-    path, filename = fs.fetch_downloadable_file_by_id(file_id)
-    return FileResponse(path, filename=filename, media_type="application/octet-stream")
+    path, entry = await run_io(fs.fetch_downloadable_entry_by_id, file_id)
+    stored_encoding = entry.get("content_encoding")
+    send_encoded = stored_encoding is not None and accepts_encoding(request.headers, stored_encoding)
 
-    
+    headers = {"ETag": fs.get_etag(entry, stored_encoding if send_encoded else None)}
+    last_modified = fs.get_last_modified(entry)
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    if stored_encoding is not None:
+        headers["Vary"] = "Accept-Encoding"
+
+    if is_not_modified(request.headers, headers["ETag"], last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if stored_encoding is not None and not send_encoded:
+        return GunzipFileResponse(
+            path,
+            size=entry["size_in_bytes"],
+            filename=entry["filename"],
+            media_type="application/octet-stream",
+            headers=headers,
+        )
+
+    if send_encoded:
+        headers["Content-Encoding"] = stored_encoding
+
+    # nginx drops Content-Encoding on X-Accel-Redirect and checks If-Range
+    # against its own validators, so encoded files and resumes are sent from here
+    if config.DOWNLOAD_MODE == "x-accel-redirect" and not send_encoded and "if-range" not in request.headers:
+        target = config.DOWNLOAD_INTERNAL_PREFIX + quote(fs.file_repo.get_relative_path(path))
+        return ProxyFileResponse("X-Accel-Redirect", target, entry["filename"], headers=headers, media_type="application/octet-stream")
+    if config.DOWNLOAD_MODE == "x-sendfile":
+        return ProxyFileResponse("X-Sendfile", os.path.abspath(path), entry["filename"], headers=headers, media_type="application/octet-stream")
+
+    return RangeFileResponse(
+        path,
+        filename=entry["filename"],
+        media_type="application/octet-stream",
+        headers=headers,
+    )
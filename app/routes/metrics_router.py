@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.services.file_service import FileService
+from app.dependencies import get_file_service
+from app.concurrency import run_io
+from app.metrics import get_registry
+
+router = APIRouter(tags=["Metrics"])
+
+# Expose metrics for Prometheus
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(fs: FileService = Depends(get_file_service)):
+    """Return the metrics of every worker process in the Prometheus text exposition format."""
+
+    registry = get_registry()
+    await run_io(registry.flush, force=True)
+    entries = await run_io(fs.count_files)
+    text = await run_io(registry.render, {("classdrop_metadata_entries", ()): entries})
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from app.responses import negotiate_gzip
 from app.services.file_service import FileService
 from app.dependencies import get_file_service
 
@@ -12,10 +13,11 @@ templates = Jinja2Templates(directory="app/templates")
 async def professor_page(request: Request, fs: FileService = Depends(get_file_service)):
     """Render the professor upload page with max file size info."""
     
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "professor_page.html",
         {
             "request": request,
             "max_file_size_mb": fs.max_size // (1024*1024)
         }
     )
+    return negotiate_gzip(request.headers, response)
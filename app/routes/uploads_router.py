@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, Request, Response, status
+from pydantic import BaseModel, Field
+from app.services.file_service import FileService
+from app.dependencies import get_file_service
+from app.concurrency import iterate_from_thread, run_io
+from uuid import UUID
+import asyncio
+
+router = APIRouter(prefix="/files/uploads", tags=["Resumable uploads"])
+
+class UploadSessionRequest(BaseModel):
+    """Body of a request to start a resumable upload."""
+
+    filename: str
+    size: int = Field(ge=0, description="Total size of the file in bytes.")
+
+# Start a resumable upload
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def create_upload_session(body: UploadSessionRequest, fs: FileService = Depends(get_file_service)):
+    """
+    Start a resumable upload session.
+    Returns the session status, including chunk_size and chunk_count:
+    PUT each chunk to /files/uploads/{session_id}/chunks/{index}, then
+    POST /files/uploads/{session_id}/complete.
+    """
+
+    return await run_io(fs.create_upload_session, filename=body.filename, size=body.size)
+
+# Upload one chunk
+@router.put("/{session_id}/chunks/{index}")
+async def upload_chunk(session_id: UUID, index: int, request: Request, fs: FileService = Depends(get_file_service)):
+    """
+    Upload chunk number index as the raw request body. Chunks may be sent
+    in any order and in parallel; re-sending a chunk replaces it. The body
+    is streamed to disk, and rejected as soon as it outgrows the length
+    the session expects for this chunk.
+    """
+
+    chunks = iterate_from_thread(request.stream(), asyncio.get_running_loop())
+    size = await run_io(fs.save_upload_chunk, session_id, index, chunks)
+    return {"session_id": str(session_id), "index": index, "size": size}
+
+# Check which chunks have arrived
+@router.get("/{session_id}")
+async def get_upload_session(session_id: UUID, fs: FileService = Depends(get_file_service)):
+    """Return the session status, including the received and missing chunks."""
+
+    return await run_io(fs.get_upload_session_status, session_id)
+
+# Assemble the file
+@router.post("/{session_id}/complete", status_code=status.HTTP_201_CREATED)
+async def complete_upload_session(session_id: UUID, fs: FileService = Depends(get_file_service)):
+    """Assemble the received chunks into a stored file once all of them have arrived."""
+
+    file_id = await run_io(fs.complete_upload_session, session_id)
+    return {"file_id": str(file_id), "message": "File uploaded successfully!"}
+
+# Abandon an upload
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_upload_session(session_id: UUID, fs: FileService = Depends(get_file_service)):
+    """Abandon an upload session and discard its chunks."""
+
+    await run_io(fs.cancel_upload_session, session_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
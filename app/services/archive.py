@@ -0,0 +1,138 @@
+import io
+import os
+import gzip
+import zipfile
+from datetime import datetime
+from typing import Callable, Iterable, Iterator
+
+# Bytes read from a stored file per write into the archive
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+class ArchiveMember:
+    """
+    One file to put into a streamed ZIP archive. compress is either fixed
+    or a function deciding it from the file's first bytes, called just
+    before the member is written. resolve, if given, returns the file's
+    current (path, content_encoding), for when the stored file was replaced
+    (e.g. by its compressed copy) after the member was made. A missing_ok
+    member whose file is gone is left out of the archive.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        name: str,
+        size: int,
+        timestamp: str,
+        compress: bool | Callable[[bytes], bool],
+        content_encoding: str | None = None,
+        resolve: Callable[[], tuple] | None = None,
+        missing_ok: bool = False,
+    ):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.timestamp = timestamp
+        self.compress = compress
+        self.content_encoding = content_encoding
+        self.resolve = resolve
+        self.missing_ok = missing_ok
+
+    def open(self):
+        """Open the member's uncompressed content for reading, re-resolving its path if the file moved."""
+
+        try:
+            return self._open()
+        except FileNotFoundError:
+            if self.resolve is None:
+                raise
+        self.path, self.content_encoding = self.resolve()
+        return self._open()
+
+    def _open(self):
+        if self.content_encoding == "gzip":
+            return gzip.open(self.path, "rb")
+        return open(self.path, "rb")
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Unseekable file object that keeps what zipfile writes until it is
+    drained. zipfile then writes data descriptors instead of seeking back.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_zip(members: Iterable[ArchiveMember], chunk_size: int = ARCHIVE_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Build a ZIP archive on the fly, yielding it piece by piece as the
+    members are read, so at most about one chunk is held in memory and no
+    temporary file is written. Each member is opened only when its turn
+    comes, and deflated if it is to be compressed; the others
+    (already-compressed formats) are stored as they are. Names that
+    repeat get a " (2)", " (3)", ... suffix.
+    Returns an iterator of archive bytes.
+    """
+
+    sink = _ChunkSink()
+    used_names = set()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+        for member in members:
+            try:
+                source = member.open()
+            except FileNotFoundError:
+                if member.missing_ok:
+                    continue
+                raise
+            with source:
+                chunk = source.read(chunk_size)
+                compress = member.compress(chunk[:16]) if callable(member.compress) else member.compress
+                info = zipfile.ZipInfo(_unique_name(member.name, used_names), _zip_date_time(member.timestamp))
+                info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+                # Known up front, so zipfile can decide whether the entry needs ZIP64
+                info.file_size = member.size
+                with archive.open(info, mode="w") as target:
+                    while chunk:
+                        target.write(chunk)
+                        if data := sink.drain():
+                            yield data
+                        chunk = source.read(chunk_size)
+            if data := sink.drain():
+                yield data
+    # The central directory is written when the archive is closed
+    yield sink.drain()
+
+def _unique_name(name: str, used_names: set) -> str:
+    """Return name, or name with a numbered suffix if it is already in the archive."""
+
+    candidate = name
+    stem, ext = os.path.splitext(name)
+    counter = 2
+    while candidate.lower() in used_names:
+        candidate = f"{stem} ({counter}){ext}"
+        counter += 1
+    used_names.add(candidate.lower())
+    return candidate
+
+def _zip_date_time(timestamp: str) -> tuple:
+    """Convert an upload_timestamp to a ZIP date_time tuple; ZIP cannot store dates before 1980."""
+
+    try:
+        value = datetime.fromisoformat(timestamp)
+    except ValueError:
+        value = datetime.now()
+    return max(value, datetime(1980, 1, 1)).timetuple()[:6]
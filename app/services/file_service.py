@@ -1,17 +1,42 @@
 from app.repositories.metadata_repository import MetadataRepository
-from app.repositories.file_repository import FileRepository
+from app.repositories.file_repository import FileRepository, StagedFile
+from app.repositories.upload_session_repository import UploadSessionRepository
+from app.repositories.job_repository import JobRepository
+from app.services.listing_cache import ListingCache, SerializedListing
+from app.services.archive import ArchiveMember
 import app.exceptions as ex
 from pathvalidate import is_valid_filename
-from uuid import UUID
-from typeguard import typechecked
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+from functools import partial
+from uuid import UUID, uuid4
+from app.typecheck import typechecked
 
 class FileService:
     """Service for handling file operations and metadata management."""
 
-    def __init__(self, file_repo: FileRepository, metadata_repo: MetadataRepository, max_size_mb: float = 20):
+    def __init__(
+        self,
+        file_repo: FileRepository,
+        metadata_repo: MetadataRepository,
+        max_size_mb: float = 20,
+        upload_session_repo: UploadSessionRepository = None,
+        max_session_size_mb: float = 2048,
+        job_repo: JobRepository = None,
+    ):
         self.max_size = max_size_mb * 1024 * 1024  # Convert MB to bytes
+        self.max_session_size = max_session_size_mb * 1024 * 1024
         self.file_repo = file_repo
         self.metadata_repo = metadata_repo
+        self.upload_session_repo = upload_session_repo or UploadSessionRepository(
+            staging_dir=os.path.join(file_repo.UPLOAD_DIR, UploadSessionRepository.STAGING_DIR_NAME)
+        )
+        self.listing_cache = ListingCache()
+        # With a job queue, CPU-heavy work on new uploads is deferred to background jobs
+        self.job_repo = job_repo
 
     @typechecked
     def save_uploaded_file(self, filename: str, content: bytes) -> UUID:
@@ -36,6 +61,279 @@ class FileService:
 
         return file_id
 
+    @typechecked
+    def save_uploaded_stream(self, filename: str, chunks: Iterable[bytes]) -> UUID:
+        """
+        Save an uploaded file from an iterable of byte chunks and update metadata.
+        The size limit is enforced while the chunks arrive, so at most one chunk
+        is held in memory at a time.
+        Returns the file_id as a UUID.
+        """
+        ext = self._validate_filename(filename)
+        return self._store_stream(filename, ext, self._limit_size(chunks))
+
+    @typechecked
+    def save_uploaded_batch(self, files: list[tuple[str, Iterable[bytes]]]) -> list[dict]:
+        """
+        Validate and stage each (filename, chunks) pair on its own, then move
+        the accepted files into place and add their metadata in a single
+        write. A file that breaks an upload rule is rejected without
+        affecting the others; a storage failure aborts the batch.
+        Returns one dict per file, in order, with the filename and either
+        its file_id or the error that rejected it.
+        """
+
+        results = []
+        accepted = []
+        committed = []
+        try:
+            for filename, chunks in files:
+                try:
+                    ext = self._validate_filename(filename)
+                    staged, jobs = self._stage(self._limit_size(chunks))
+                except (
+                    ex.InvalidFilenameException,
+                    ex.DangerousFileExtensionException,
+                    ex.FileSizeExceededException,
+                ) as e:
+                    results.append({"filename": filename, "error": e.message})
+                    continue
+                result = {"filename": filename}
+                results.append(result)
+                accepted.append((result, ext, staged, jobs))
+
+            # Every file is moved into place (and made durable) before the metadata names it
+            for result, ext, staged, jobs in accepted:
+                file_id = uuid4()
+                self.file_repo.commit_temp_file(
+                    staged.path, file_id, ext, sha256=staged.sha256, content_encoding=staged.content_encoding
+                )
+                committed.append((file_id, result, staged, jobs))
+            self.metadata_repo.add_metadata_batch([
+                {
+                    "filename": result["filename"],
+                    "file_size": staged.size,
+                    "sha256": staged.sha256,
+                    "content_encoding": staged.content_encoding,
+                    "stored_size": staged.stored_size,
+                    "jobs": jobs,
+                    "file_id": file_id,
+                }
+                for file_id, result, staged, jobs in committed
+            ])
+        except BaseException:
+            for file_id, result, staged, _ in committed:
+                self.file_repo.delete_file(file_id, result["filename"], staged.sha256, staged.content_encoding)
+            for _, _, staged, _ in accepted[len(committed):]:
+                self.file_repo.discard_temp_file(staged.path)
+            raise
+
+        for file_id, result, _, jobs in committed:
+            result["file_id"] = file_id
+            self._enqueue_jobs(file_id, result["filename"], jobs)
+
+        return results
+
+    @typechecked
+    def create_upload_session(self, filename: str, size: int) -> dict:
+        """
+        Start a resumable upload for a file too large to send in one request.
+        The filename rules are checked up front so a rejected file is not
+        uploaded first. Sessions may be larger than the single-request limit.
+        Abandoned sessions are garbage-collected as new ones are created.
+        Returns the session status.
+        """
+        self._validate_filename(filename)
+        if size < 0 or size > self.max_session_size:
+            raise ex.FileSizeExceededException(f"File exceeds {self.max_session_size // (1024 * 1024)} MB limit.")
+
+        self.upload_session_repo.collect_expired()
+        session = self.upload_session_repo.create_session(filename, size)
+        return self.get_upload_session_status(UUID(session["session_id"]))
+
+    @typechecked
+    def save_upload_chunk(self, session_id: UUID, index: int, chunks: Iterable[bytes]) -> int:
+        """
+        Store chunk number index of an upload session. Chunks may arrive in
+        any order and in parallel, and may be re-sent.
+        Returns the number of bytes stored.
+        """
+
+        return self.upload_session_repo.write_chunk(session_id, index, chunks)
+
+    @typechecked
+    def get_upload_session_status(self, session_id: UUID) -> dict:
+        """
+        Describe an upload session and which chunks it has received.
+        Chunk i covers bytes [i * chunk_size, (i + 1) * chunk_size).
+        Returns a dict with the session fields plus chunk_count,
+        received_chunks, missing_chunks, received_bytes and expires_at.
+        """
+
+        repo = self.upload_session_repo
+        session = repo.get_session(session_id)
+        chunk_count = repo.get_chunk_count(session)
+        received = repo.get_received_chunks(session_id)
+        received_set = set(received)
+        return {
+            "session_id": session["session_id"],
+            "filename": session["filename"],
+            "size": session["size"],
+            "chunk_size": session["chunk_size"],
+            "chunk_count": chunk_count,
+            "received_chunks": received,
+            "missing_chunks": [i for i in range(chunk_count) if i not in received_set],
+            "received_bytes": sum(repo.get_chunk_length(session, i) for i in received),
+            "expires_at": repo.get_expires_at(session_id).isoformat(),
+        }
+
+    @typechecked
+    def complete_upload_session(self, session_id: UUID) -> UUID:
+        """
+        Assemble a session's chunks into a stored file and add its metadata,
+        applying the same filename rules as a single-request upload.
+        Raises IncompleteUploadException while chunks are missing.
+        Returns the file_id as a UUID.
+        """
+        repo = self.upload_session_repo
+        status = self.get_upload_session_status(session_id)
+        if status["missing_chunks"]:
+            raise ex.IncompleteUploadException(f"Upload is missing chunks: {status['missing_chunks']}.")
+        ext = self._validate_filename(status["filename"])
+
+        repo.claim_session(session_id)
+        try:
+            file_id = self._store_stream(status["filename"], ext, repo.iter_claimed_chunks(session_id, status["chunk_count"]))
+        except BaseException:
+            repo.release_session(session_id)
+            raise
+
+        repo.delete_session(session_id)
+        return file_id
+
+    @typechecked
+    def cancel_upload_session(self, session_id: UUID):
+        """Abandon an upload session and discard its chunks."""
+
+        self.upload_session_repo.get_session(session_id)
+        self.upload_session_repo.delete_session(session_id)
+
+    @typechecked
+    def start_job(self, job: dict) -> tuple | None:
+        """
+        Prepare the CPU-heavy part of a background job, to be run in a
+        worker process. Raises ValueError for an unknown kind of job.
+        Returns (callable, args), where the callable and its arguments are
+        picklable, or None if there is nothing left to do: the file was
+        deleted, or a duplicate of the job already finished.
+        """
+
+        payload = job["payload"]
+        try:
+            entry = self.metadata_repo.get_metadata_by_id(UUID(payload["file_id"]))
+        except ValueError:
+            return None
+        if (entry.get("jobs") or {}).get(job["kind"]) == JobRepository.DONE:
+            return None
+
+        if job["kind"] == "compress":
+            path = self.file_repo.get_file_path(UUID(payload["file_id"]), payload["filename"])
+            return self.file_repo.compress_to_temp_file, (path,)
+
+        raise ValueError(f"Unknown job kind: {job['kind']}")
+
+    @typechecked
+    def finish_job(self, job: dict, result):
+        """
+        Apply the result of a background job and mark it done on the file's
+        metadata entry. A compressed copy is moved into place before the
+        metadata points to it; the uncompressed file is left for
+        remove_replaced_original, since readers may have resolved its path
+        just before the switch and not opened it yet.
+        """
+
+        file_id = UUID(job["payload"]["file_id"])
+        filename = job["payload"]["filename"]
+        changes = {}
+        if job["kind"] == "compress" and result is not None:
+            temp_path, stored_size = result
+            try:
+                self.file_repo.commit_temp_file(
+                    temp_path, file_id, self.file_repo.get_file_extension(filename), content_encoding="gzip"
+                )
+            except BaseException:
+                self.file_repo.discard_temp_file(temp_path)
+                raise
+            changes = {"content_encoding": "gzip", "stored_size": stored_size}
+
+        self._set_job_status(file_id, job["kind"], JobRepository.DONE, changes)
+
+    @typechecked
+    def remove_replaced_original(self, file_id: UUID, filename: str) -> bool:
+        """
+        Delete the uncompressed copy of a file once its metadata entry points
+        to the compressed one. Readers that already opened it keep reading.
+        Returns True if a file was removed.
+        """
+
+        try:
+            entry = self.metadata_repo.get_metadata_by_id(file_id)
+        except ValueError:
+            entry = None
+        if entry is not None and entry.get("content_encoding") is None:
+            return False
+        try:
+            self.file_repo.delete_file(file_id, filename)
+        except FileNotFoundError:
+            return False
+        return True
+
+    @typechecked
+    def remove_replaced_originals(self) -> int:
+        """
+        Delete the uncompressed copies left behind by compression jobs whose
+        process exited before removing them.
+        Returns the number of files removed.
+        """
+
+        removed = 0
+        for entry in self.metadata_repo.read_metadata():
+            if entry.get("content_encoding") is not None and (entry.get("jobs") or {}).get("compress") == JobRepository.DONE:
+                removed += self.remove_replaced_original(UUID(entry["file_id"]), entry["filename"])
+        return removed
+
+    @typechecked
+    def fail_job(self, job: dict):
+        """Mark a background job as failed on the file's metadata entry, unless a duplicate of it already succeeded."""
+
+        file_id = UUID(job["payload"]["file_id"])
+        if (self.metadata_repo.get_metadata_by_id(file_id).get("jobs") or {}).get(job["kind"]) != JobRepository.DONE:
+            self._set_job_status(file_id, job["kind"], JobRepository.FAILED)
+
+    @typechecked
+    def requeue_missing_jobs(self) -> int:
+        """
+        Queue the jobs that metadata entries record as pending but that have
+        no pending or running row in the job queue: the process that added
+        the entry exited before enqueueing them. A job that ends up queued
+        twice finds the first one done and does nothing.
+        Returns the number of jobs queued.
+        """
+
+        pending = [
+            (kind, entry)
+            for entry in self.metadata_repo.read_metadata()
+            for kind, status in (entry.get("jobs") or {}).items()
+            if status == JobRepository.PENDING
+        ]
+        active = {kind: self.job_repo.active_file_ids(kind) for kind in {kind for kind, _ in pending}}
+        queued = 0
+        for kind, entry in pending:
+            if entry["file_id"] not in active[kind]:
+                self.job_repo.enqueue(kind, {"file_id": entry["file_id"], "filename": entry["filename"]})
+                queued += 1
+        return queued
+
     @typechecked
     def get_all_files_metadata(self) -> list:
         """
@@ -45,6 +343,76 @@ class FileService:
 
         return self.metadata_repo.read_metadata()
 
+    @typechecked
+    def count_files(self) -> int:
+        """
+        Count the stored files.
+        Returns the number of metadata entries.
+        """
+
+        return self.metadata_repo.count_metadata()
+
+    @typechecked
+    def list_files_metadata(
+        self,
+        limit: int | None = None,
+        cursor: str | None = None,
+        sort: str = "upload_timestamp",
+        descending: bool = False,
+        filename_prefix: str | None = None,
+        uploaded_after: datetime | None = None,
+        uploaded_before: datetime | None = None,
+    ) -> tuple[list, str | None]:
+        """
+        Retrieve one page of file metadata entries.
+        Returns a tuple of (entries, next_cursor); next_cursor is None on the last page.
+        """
+
+        return self.metadata_repo.list_metadata(
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
+            descending=descending,
+            filename_prefix=filename_prefix,
+            uploaded_after=self._to_timestamp(uploaded_after),
+            uploaded_before=self._to_timestamp(uploaded_before),
+        )
+
+    @typechecked
+    def search_files(self, query: str, limit: int = 20) -> list:
+        """
+        Search uploaded files by filename; see FilenameIndex for how terms match.
+        Returns up to limit metadata entries, best match first.
+        """
+
+        return self.metadata_repo.search_metadata(query, limit)
+
+    @typechecked
+    def render_listing(self, etag: str | None, **query) -> SerializedListing:
+        """
+        Serialise one page of file metadata as the JSON body of GET /files/.
+        Bodies are cached under the listing ETag, so repeating a listing
+        while the metadata is unchanged skips both the lookup and json.dumps.
+        Returns the serialised listing.
+        """
+
+        if etag is not None:
+            listing = self.listing_cache.get(etag)
+            if listing is not None:
+                return listing
+
+        files, next_cursor = self.list_files_metadata(**query)
+        body = json.dumps(
+            {"files": files, "next_cursor": next_cursor},
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        listing = SerializedListing(body)
+        if etag is not None:
+            self.listing_cache.put(etag, listing)
+        return listing
+
     @typechecked
     def fetch_downloadable_file_by_id(self, file_id: UUID) -> tuple[str, str]:
         """
@@ -52,6 +420,16 @@ class FileService:
         Returns a tuple of (file_path, filename).
         """
 
+        path, entry = self.fetch_downloadable_entry_by_id(file_id)
+        return path, entry["filename"]
+
+    @typechecked
+    def fetch_downloadable_entry_by_id(self, file_id: UUID) -> tuple[str, dict]:
+        """
+        Fetch downloadable file by file_id, raises FileNotFoundError if not found.
+        Returns a tuple of (file_path, metadata entry).
+        """
+
         # Check if file_id exists in metadata
         try:
             entry = self.metadata_repo.get_metadata_by_id(file_id)
@@ -59,11 +437,217 @@ class FileService:
             raise FileNotFoundError("File not found in metadata")
         
         # Check if file exists on disk
-        path = self.file_repo.get_file_path(file_id, entry["filename"])
+        path = self.file_repo.get_file_path(file_id, entry["filename"], entry.get("content_encoding"))
         if not self.file_repo.file_exists(path):
             raise FileNotFoundError("File not found on disk")
         
-        return path, entry["filename"]
+        return path, entry
+
+    @typechecked
+    def get_archive_members(self, file_ids: list[UUID] | None = None) -> list[ArchiveMember]:
+        """
+        Resolve the files to put into a ZIP archive, in the given order, or
+        every stored file in upload order when file_ids is None. Explicitly
+        requested files must exist (FileNotFoundError otherwise); with
+        file_ids None, entries whose file is missing on disk are skipped
+        when the archive reaches them. No file is opened here: whether an
+        uncompressed file is stored as is (already-compressed formats) is
+        sniffed just before it is written.
+        Returns a list of ArchiveMember.
+        """
+
+        if file_ids is None:
+            resolved = [
+                (self.file_repo.get_file_path(UUID(entry["file_id"]), entry["filename"], entry.get("content_encoding")), entry)
+                for entry in self.metadata_repo.read_metadata()
+            ]
+        else:
+            resolved = [self.fetch_downloadable_entry_by_id(file_id) for file_id in file_ids]
+
+        return [
+            ArchiveMember(
+                path,
+                name=entry["filename"],
+                size=entry["size_in_bytes"],
+                timestamp=entry["upload_timestamp"],
+                # Files compressed at rest were compressible; sniff the others
+                compress=True if entry.get("content_encoding") else self.file_repo.is_compressible,
+                content_encoding=entry.get("content_encoding"),
+                resolve=partial(self._resolve_stored_file, UUID(entry["file_id"])),
+                missing_ok=file_ids is None,
+            )
+            for path, entry in resolved
+        ]
+
+    @typechecked
+    def get_etag(self, entry: dict, content_encoding: str | None = None) -> str:
+        """
+        Build a strong ETag for a stored file from its metadata entry.
+        Uses the stored content hash when known; otherwise the file_id and
+        size, since uploaded files are never modified in place. The encoded
+        representation of a file gets its own ETag, since its bytes differ.
+        Returns the quoted ETag value.
+        """
+
+        if entry.get("sha256"):
+            tag = entry["sha256"]
+        else:
+            tag = f'{entry["file_id"]}-{entry["size_in_bytes"]}'
+        if content_encoding is not None:
+            tag += f"-{content_encoding}"
+        return f'"{tag}"'
+
+    @typechecked
+    def get_last_modified(self, entry: dict) -> datetime | None:
+        """
+        Get the upload time of a stored file as a timezone-aware datetime.
+        Returns None if the stored upload_timestamp cannot be parsed.
+        """
+
+        try:
+            return datetime.fromisoformat(entry["upload_timestamp"]).astimezone(timezone.utc)
+        except (KeyError, ValueError):
+            return None
+
+    @typechecked
+    def get_listing_etag(self, query: str) -> str | None:
+        """
+        Build an ETag for a file listing from the metadata version and the
+        query that produced it.
+        Returns None when the metadata version is not currently known.
+        """
+
+        version = self.metadata_repo.metadata_version()
+        if version is None:
+            return None
+        return f'"{hashlib.sha256(f"{version}?{query}".encode()).hexdigest()[:32]}"'
+
+    @typechecked
+    def _validate_filename(self, filename: str) -> str:
+        """
+        Check the filename and its extension against the upload rules.
+        Returns the file extension.
+        """
+        if not is_valid_filename(filename):
+            raise ex.InvalidFilenameException("Filename contains invalid characters.")
+
+        # Validate file extension
+        ext = self.file_repo.get_file_extension(filename)
+        if self._is_dangerous_extension(ext):
+            raise ex.DangerousFileExtensionException(f"File type '{ext}' is not allowed for security reasons.")
+
+        return ext
+
+    @typechecked
+    def _store_stream(self, filename: str, ext: str, chunks: Iterable[bytes]) -> UUID:
+        """
+        Stage the chunks in a temporary file, move it into place, then add the
+        metadata and queue its background jobs. The file is durable before
+        its metadata is committed, so a crash never leaves an entry pointing
+        at missing data. The file is removed if either step fails.
+        Returns the file_id as a UUID.
+        """
+
+        staged, jobs = self._stage(chunks)
+        file_id = uuid4()
+        try:
+            self.file_repo.commit_temp_file(
+                staged.path, file_id, ext, sha256=staged.sha256, content_encoding=staged.content_encoding
+            )
+        except BaseException:
+            self.file_repo.discard_temp_file(staged.path)
+            raise
+        try:
+            self.metadata_repo.add_metadata(
+                filename,
+                staged.size,
+                sha256=staged.sha256,
+                content_encoding=staged.content_encoding,
+                stored_size=staged.stored_size,
+                jobs=jobs,
+                file_id=file_id,
+            )
+        except BaseException:
+            self.file_repo.delete_file(file_id, filename, staged.sha256, staged.content_encoding)
+            raise
+
+        self._enqueue_jobs(file_id, filename, jobs)
+        return file_id
+
+    @typechecked
+    def _stage(self, chunks: Iterable[bytes]) -> tuple[StagedFile, dict | None]:
+        """
+        Write the chunks to a temporary file. Compression at rest is done
+        inline, unless a job queue is configured and the file is stored
+        under its own name (content-addressed blobs are compressed inline,
+        so that equal uploads keep sharing one blob).
+        Returns (staged file, jobs to record on its metadata entry or None).
+        """
+
+        defer = (
+            self.job_repo is not None
+            and self.file_repo.COMPRESS
+            and not self.file_repo.CONTENT_ADDRESSED
+        )
+        if not defer:
+            return self.file_repo.write_temp_file(chunks), None
+
+        staged = self.file_repo.write_temp_file(chunks, compress=False)
+        if staged.size < self.file_repo.COMPRESSION_MIN_SIZE:
+            return staged, None
+        return staged, {"compress": JobRepository.PENDING}
+
+    @typechecked
+    def _enqueue_jobs(self, file_id: UUID, filename: str, jobs: dict | None):
+        """Queue the background jobs recorded on a new file's metadata entry."""
+
+        for kind in jobs or {}:
+            self.job_repo.enqueue(kind, {"file_id": str(file_id), "filename": filename})
+
+    @typechecked
+    def _resolve_stored_file(self, file_id: UUID) -> tuple[str, str | None]:
+        """
+        Look a file up again, e.g. after a background job replaced it.
+        Returns (path, content_encoding).
+        """
+
+        path, entry = self.fetch_downloadable_entry_by_id(file_id)
+        return path, entry.get("content_encoding")
+
+    @typechecked
+    def _set_job_status(self, file_id: UUID, kind: str, status: str, changes: dict | None = None):
+        """Record the status of a background job, and any other changes, on a metadata entry."""
+
+        jobs = dict(self.metadata_repo.get_metadata_by_id(file_id).get("jobs") or {})
+        jobs[kind] = status
+        self.metadata_repo.update_metadata(file_id, {**(changes or {}), "jobs": jobs})
+
+    @typechecked
+    def _limit_size(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Pass chunks through, raising FileSizeExceededException as soon as
+        the running total exceeds the maximum allowed size.
+        """
+
+        total = 0
+        for chunk in chunks:
+            total += len(chunk)
+            if self._is_file_size_above_max(total):
+                raise ex.FileSizeExceededException(f"File exceeds {self.max_size // (1024 * 1024)} MB limit.")
+            yield chunk
+
+    @typechecked
+    def _to_timestamp(self, value: datetime | None) -> str | None:
+        """
+        Convert a datetime to the format stored in upload_timestamp.
+        Timezone-aware values are converted to naive local time first.
+        """
+
+        if value is None:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone().replace(tzinfo=None)
+        return value.isoformat()
 
     @typechecked
     def _is_file_size_above_max(self, size: int) -> bool:
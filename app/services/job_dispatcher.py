@@ -0,0 +1,162 @@
+import time
+import queue
+import threading
+import multiprocessing
+import traceback
+from uuid import UUID
+from concurrent.futures import Future, ProcessPoolExecutor
+from app.metrics import is_process_alive
+from app.repositories.job_repository import JobRepository
+from app.services.file_service import FileService
+
+class JobDispatcher:
+    """
+    Drains the job queue into a pool of worker processes. A thread in the
+    web process claims at most max_workers jobs at a time, hands their
+    CPU-heavy part to the pool, and applies each result (file moves,
+    metadata updates) itself once the worker returns it.
+    """
+
+    # Seconds between checks for jobs enqueued by other worker processes
+    POLL_INTERVAL: float = 1.0
+
+    # Seconds an uncompressed original is kept after its compressed copy
+    # replaced it, for readers that resolved its path just before
+    ORIGINAL_GRACE_SECONDS: float = 30.0
+
+    def __init__(
+        self,
+        job_repo: JobRepository,
+        file_service: FileService,
+        max_workers: int = 2,
+        poll_interval: float = None,
+        original_grace_seconds: float = None,
+    ):
+        self.job_repo = job_repo
+        self.file_service = file_service
+        self.max_workers = max_workers
+        if poll_interval is not None:
+            self.POLL_INTERVAL = poll_interval
+        if original_grace_seconds is not None:
+            self.ORIGINAL_GRACE_SECONDS = original_grace_seconds
+
+        self.wakeup = job_repo.wakeup_event()
+        self.completed = queue.SimpleQueue()
+        # (due, file_id, filename) of originals to remove, oldest first; only used by the dispatcher thread
+        self.removals = []
+        self.stopping = False
+        self.pool = None
+        self.thread = None
+
+    def start(self):
+        """
+        Requeue jobs abandoned by processes that exited, queue the ones
+        they recorded on metadata entries but never enqueued, and remove
+        originals they left behind, then start dispatching.
+        """
+
+        self.job_repo.requeue_abandoned(is_process_alive)
+        self.file_service.requeue_missing_jobs()
+        self.file_service.remove_replaced_originals()
+        # Spawned rather than forked, since the web process is multi-threaded
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        self.thread = threading.Thread(target=self._run, name="job-dispatcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop claiming jobs, wait for the running ones to finish, and shut the pool down."""
+
+        if self.thread is None:
+            return
+        self.stopping = True
+        self.wakeup.set()
+        self.thread.join()
+        self.pool.shutdown(wait=True)
+        self.thread = None
+
+    def _run(self):
+        """
+        Claim, submit and finish jobs until stopped with none left running,
+        then remove the originals still waiting out their grace period.
+        """
+
+        in_flight = 0
+        while not (self.stopping and in_flight == 0):
+            try:
+                while True:
+                    try:
+                        job, future = self.completed.get_nowait()
+                    except queue.Empty:
+                        break
+                    in_flight -= 1
+                    self._finish(job, future)
+
+                claimed = [] if self.stopping else self.job_repo.claim(self.max_workers - in_flight)
+                for job in claimed:
+                    try:
+                        prepared = self.file_service.start_job(job)
+                        if prepared is None:
+                            self.job_repo.complete(job["job_id"])
+                            continue
+                        func, args = prepared
+                        future = self.pool.submit(func, *args)
+                    except Exception as e:
+                        self._fail(job, e)
+                        continue
+                    in_flight += 1
+                    future.add_done_callback(lambda future, job=job: self._on_done(job, future))
+                self._remove_originals(time.monotonic())
+            except Exception as e:
+                # Keep dispatching; the jobs involved stay claimed until the process restarts
+                traceback.print_exception(e)
+                claimed = []
+
+            if not claimed:
+                timeout = self.POLL_INTERVAL
+                if self.removals:
+                    timeout = max(0.0, min(timeout, self.removals[0][0] - time.monotonic()))
+                self.wakeup.wait(timeout)
+                self.wakeup.clear()
+
+        # Readers are done by now: the server has stopped serving requests
+        self._remove_originals(float("inf"))
+
+    def _on_done(self, job: dict, future: Future):
+        """Hand a finished job back to the dispatcher thread."""
+
+        self.completed.put((job, future))
+        self.wakeup.set()
+
+    def _finish(self, job: dict, future: Future):
+        """Apply a job's result and mark it done, or failed if it raised."""
+
+        try:
+            result = future.result()
+            self.file_service.finish_job(job, result)
+        except Exception as e:
+            self._fail(job, e)
+            return
+        self.job_repo.complete(job["job_id"])
+        if job["kind"] == "compress" and result is not None:
+            payload = job["payload"]
+            self.removals.append((time.monotonic() + self.ORIGINAL_GRACE_SECONDS, UUID(payload["file_id"]), payload["filename"]))
+
+    def _remove_originals(self, now: float):
+        """Remove the uncompressed originals whose grace period ended by now."""
+
+        while self.removals and self.removals[0][0] <= now:
+            _, file_id, filename = self.removals.pop(0)
+            try:
+                self.file_service.remove_replaced_original(file_id, filename)
+            except Exception as e:
+                # Left for remove_replaced_originals at the next start
+                traceback.print_exception(e)
+
+    def _fail(self, job: dict, error: Exception):
+        """Mark a job as failed in the queue and on its metadata entry."""
+
+        self.job_repo.fail(job["job_id"], f"{type(error).__name__}: {error}")
+        try:
+            self.file_service.fail_job(job)
+        except Exception as e:
+            traceback.print_exception(e)
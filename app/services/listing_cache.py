@@ -0,0 +1,62 @@
+import gzip
+import threading
+from collections import OrderedDict
+
+class SerializedListing:
+    """A serialised listing body, with its gzip encoding computed on first use."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._gzipped = None
+
+    def gzipped(self) -> bytes:
+        """Return the body gzip-compressed, compressing it only once."""
+
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzipped
+
+
+class ListingCache:
+    """
+    Least-recently-used cache of serialised listing bodies, keyed on the
+    listing ETag. The ETag covers the metadata version and the query, so an
+    entry is never stale: a metadata change simply produces new keys.
+    """
+
+    MAX_ENTRIES: int = 256
+    MAX_BYTES: int = 64 * 1024 * 1024
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None):
+        if max_entries is not None:
+            self.MAX_ENTRIES = max_entries
+        if max_bytes is not None:
+            self.MAX_BYTES = max_bytes
+
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> SerializedListing | None:
+        """Return the cached listing for key, or None on a miss."""
+
+        with self.lock:
+            listing = self.entries.get(key)
+            if listing is not None:
+                self.entries.move_to_end(key)
+            return listing
+
+    def put(self, key: str, listing: SerializedListing):
+        """Store a listing, evicting the least recently used ones beyond the limits."""
+
+        if len(listing.body) > self.MAX_BYTES:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous.body)
+            self.entries[key] = listing
+            self.size += len(listing.body)
+            while len(self.entries) > self.MAX_ENTRIES or self.size > self.MAX_BYTES:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
@@ -0,0 +1,93 @@
+import os
+import gzip
+import mimetypes
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+from app.responses import accepts_encoding
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it only .gz siblings are produced
+    brotli = None
+
+# Text formats worth precompressing; images and fonts are already compressed
+PRECOMPRESS_EXTENSIONS = {".css", ".js", ".html", ".svg", ".json", ".txt", ".map"}
+
+# Precompressed siblings in order of preference: content coding -> file suffix
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+def precompress_directory(directory: str) -> int:
+    """
+    Write .gz (and, with the brotli package installed, .br) siblings next to
+    every text asset under directory, skipping those already up to date.
+    Returns the number of siblings written.
+    """
+
+    written = 0
+    for dirpath, _, filenames in os.walk(directory):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.splitext(name)[1] not in PRECOMPRESS_EXTENSIONS:
+                continue
+
+            source_mtime = os.stat(path).st_mtime_ns
+            for coding, suffix in ENCODING_SUFFIXES.items():
+                if coding == "br" and brotli is None:
+                    continue
+                target = path + suffix
+                if os.path.exists(target) and os.stat(target).st_mtime_ns >= source_mtime:
+                    continue
+
+                with open(path, "rb") as f:
+                    data = f.read()
+                if coding == "br":
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+
+                temp_path = f"{target}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(compressed)
+                os.replace(temp_path, target)
+                written += 1
+    return written
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves a precompressed .br or .gz sibling of the
+    requested file, with Content-Encoding, to clients that accept it.
+    Siblings older than the file itself are ignored.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+
+        for coding, suffix in ENCODING_SUFFIXES.items():
+            if not accepts_encoding(request_headers, coding):
+                continue
+            try:
+                sibling_stat = os.stat(f"{full_path}{suffix}")
+            except FileNotFoundError:
+                continue
+            if sibling_stat.st_mtime_ns < stat_result.st_mtime_ns:
+                continue
+
+            response = FileResponse(
+                f"{full_path}{suffix}",
+                status_code=status_code,
+                stat_result=sibling_stat,
+                media_type=media_type,
+                headers={"Content-Encoding": coding, "Vary": "Accept-Encoding"},
+            )
+            break
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+            if os.path.splitext(str(full_path))[1] in PRECOMPRESS_EXTENSIONS:
+                response.headers["Vary"] = "Accept-Encoding"
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,14 @@
+from typeguard import typechecked as _typechecked
+from app import config
+
+def typechecked(func):
+    """
+    typeguard's @typechecked when CLASSDROP_TYPECHECK is on (the default),
+    otherwise the function itself, so production runs without the checks.
+    Decided once, when the decorated module is imported.
+    Returns the decorated function.
+    """
+
+    if config.TYPECHECK:
+        return _typechecked(func)
+    return func
@@ -0,0 +1,242 @@
+"""
+Endpoint benchmark suite.
+
+Measures p50/p99 latency and throughput of POST /files/, GET /files/ and
+GET /files/{id} for every combination of catalogue size (number of metadata
+entries already stored) and concurrency (requests in flight). Each scenario
+runs against the ASGI app in-process, against a uvicorn server started on a
+local port, or both, and the results are printed (or written) as JSON so that
+runs can be compared between commits.
+
+    python -m benchmarks.bench_endpoints --sizes 100,1000,10000 --concurrency 1,16,64
+    python -m benchmarks.bench_endpoints --sizes 100,1000000 --concurrency 1,256 --target uvicorn --output before.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+import httpx
+from app.main import app
+from app.dependencies import get_file_service
+from app.container import build_metadata_repository
+from app.repositories.file_repository import FileRepository
+from app.services.file_service import FileService
+from app import config
+
+OPERATIONS = ("upload", "list", "download")
+
+# Files that really exist on disk for the download scenario; the rest of the catalogue is metadata only
+DOWNLOADABLE_FILES = 64
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Return the value at the given fraction (0-1) of an ascending list."""
+
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def seed(tmp: str, backend: str, size: int, file_size: int) -> list:
+    """
+    Fill a fresh upload directory and metadata store with size entries, of
+    which DOWNLOADABLE_FILES have content on disk.
+    Returns the file_ids that can be downloaded.
+    """
+
+    config.UPLOAD_DIR = f"{tmp}/uploads"
+    config.METADATA_FILE = f"{tmp}/metadata.json"
+    config.METADATA_DATABASE_FILE = f"{tmp}/metadata.db"
+    config.METADATA_BACKEND = backend
+    metadata_repo = build_metadata_repository()
+    file_repo = FileRepository(upload_dir=config.UPLOAD_DIR)
+
+    start = datetime(2025, 1, 1)
+    entries = [
+        {
+            "file_id": f"{i:08x}-0000-4000-8000-{random.getrandbits(48):012x}",
+            "filename": f"lecture_{i}.pdf",
+            "upload_timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "size_in_bytes": file_size,
+        }
+        for i in range(max(0, size - DOWNLOADABLE_FILES))
+    ]
+    metadata_repo.write_metadata(entries)
+
+    service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+    content = os.urandom(file_size)
+    downloadable = [
+        str(service.save_uploaded_stream(f"notes_{i}.pdf", [content]))
+        for i in range(min(size, DOWNLOADABLE_FILES))
+    ]
+    metadata_repo.close()
+    return downloadable
+
+async def run_operation(client: httpx.AsyncClient, operation: str, concurrency: int, requests: int, file_ids: list, file_size: int) -> dict:
+    """Send requests copies of one operation, concurrency at a time, and summarise them."""
+
+    content = os.urandom(file_size)
+    latencies = []
+    errors = 0
+    queue = iter(range(requests))
+
+    async def send(i: int) -> httpx.Response:
+        if operation == "upload":
+            return await client.post("/files/", files={"file": (f"bench_{i}.pdf", content, "application/pdf")})
+        if operation == "list":
+            return await client.get("/files/", params={"limit": 50})
+        return await client.get(f"/files/{file_ids[i % len(file_ids)]}")
+
+    async def worker():
+        nonlocal errors
+        for i in queue:
+            started = time.perf_counter()
+            try:
+                response = await send(i)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "operation": operation,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "throughput_rps": round(requests / elapsed, 1),
+    }
+
+async def run_scenarios(base_url: str, transport: httpx.AsyncBaseTransport | None, args: argparse.Namespace, file_ids: list) -> list:
+    """Run every operation at every concurrency level against one server."""
+
+    results = []
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=120) as client:
+        for operation in args.operations:
+            for concurrency in args.concurrency:
+                results.append(await run_operation(client, operation, concurrency, args.requests, file_ids, args.file_size))
+    return results
+
+def free_port() -> int:
+    """Return a TCP port that is free on localhost."""
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_uvicorn(tmp: str, backend: str) -> tuple:
+    """
+    Start uvicorn on the seeded data and wait until it answers.
+    Returns (process, base_url).
+    """
+
+    port = free_port()
+    env = dict(
+        os.environ,
+        CLASSDROP_UPLOAD_DIR=f"{tmp}/uploads",
+        CLASSDROP_METADATA_FILE=f"{tmp}/metadata.json",
+        CLASSDROP_METADATA_DATABASE_FILE=f"{tmp}/metadata.db",
+        CLASSDROP_METADATA_BACKEND=backend,
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/files/", params={"limit": 1}, timeout=1)
+            return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start within 30 seconds")
+
+def run_size(size: int, args: argparse.Namespace) -> list:
+    """Seed a catalogue of the given size and benchmark it on every requested target."""
+
+    results = []
+    for target in args.targets:
+        # Uploads change the catalogue, so every target starts from a fresh copy
+        with tempfile.TemporaryDirectory() as tmp:
+            file_ids = seed(tmp, args.backend, size, args.file_size)
+            if target == "inprocess":
+                service = FileService(
+                    file_repo=FileRepository(upload_dir=config.UPLOAD_DIR),
+                    metadata_repo=build_metadata_repository(),
+                )
+                app.dependency_overrides[get_file_service] = lambda: service
+                try:
+                    transport = httpx.ASGITransport(app=app)
+                    scenario_results = asyncio.run(run_scenarios("http://bench", transport, args, file_ids))
+                finally:
+                    app.dependency_overrides.clear()
+                    service.metadata_repo.close()
+            else:
+                process, base_url = start_uvicorn(tmp, args.backend)
+                try:
+                    scenario_results = asyncio.run(run_scenarios(base_url, None, args, file_ids))
+                finally:
+                    process.terminate()
+                    process.wait()
+
+        for result in scenario_results:
+            results.append({"target": target, "backend": args.backend, "catalogue_size": size, **result})
+    return results
+
+def git_commit() -> str | None:
+    """Return the current git commit, if the benchmark runs inside a checkout."""
+
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def int_list(value: str) -> list:
+    """Parse a comma-separated list of integers."""
+
+    return [int(part) for part in value.split(",") if part]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int_list, default=[100, 1000, 10000], help="Catalogue sizes, e.g. 100,1000,1000000.")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 16, 64], help="Concurrency levels, e.g. 1,16,256.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per operation and concurrency level.")
+    parser.add_argument("--operations", type=lambda v: v.split(","), default=list(OPERATIONS), help="Subset of upload,list,download.")
+    parser.add_argument("--target", choices=["inprocess", "uvicorn", "both"], default="inprocess", help="Where the app runs.")
+    parser.add_argument("--backend", choices=["json", "journal", "sqlite"], default="json", help="Metadata backend.")
+    parser.add_argument("--file-size", type=int, default=64 * 1024, help="Bytes per uploaded / downloaded file.")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+    args = parser.parse_args()
+    args.targets = ["inprocess", "uvicorn"] if args.target == "both" else [args.target]
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started_at": datetime.now().isoformat(),
+        "results": [result for size in args.sizes for result in run_size(size, args)],
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Event-loop blocking benchmark.
+
+Simulates another worker holding the metadata lock while uploads queue on it,
+and measures the latency of concurrent GET /files/ requests (served from the
+metadata cache) on the same worker. With blocking handlers the listings wait
+for the uploads; with the I/O thread pool they do not.
+
+    python -m benchmarks.bench_event_loop --uploads 16 --listings 64 --lock-hold 1.0
+"""
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+import httpx
+from filelock import FileLock
+from app.main import app
+from app.dependencies import get_file_service
+from app.repositories.file_repository import FileRepository
+from app.repositories.metadata_repository import MetadataRepository
+from app.services.file_service import FileService
+import app.routes.files_router as files_router
+
+async def run_inline(func, *args, **kwargs):
+    """Stand-in for run_io that calls the function on the event loop, as before."""
+
+    return func(*args, **kwargs)
+
+async def measure(mode: str, uploads: int, listings: int, lock_hold: float) -> dict:
+    """Run one scenario and return listing latency percentiles in milliseconds."""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        metadata_repo = MetadataRepository(metadata_file=f"{tmp}/metadata.json")
+        service = FileService(file_repo=FileRepository(upload_dir=f"{tmp}/uploads"), metadata_repo=metadata_repo)
+        app.dependency_overrides[get_file_service] = lambda: service
+        original_run_io = files_router.run_io
+        if mode == "inline":
+            files_router.run_io = run_inline
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.get("/files/")  # Warm the metadata cache
+
+            # Another worker holds the metadata lock for lock_hold seconds
+            held = threading.Event()
+            def hold_lock():
+                with FileLock(f"{tmp}/metadata.json.lock"):
+                    held.set()
+                    time.sleep(lock_hold)
+            holder = threading.Thread(target=hold_lock)
+            holder.start()
+            held.wait()
+
+            # Latency is measured from when the listings are issued, so time
+            # spent waiting for a blocked event loop is included
+            start = time.perf_counter()
+
+            async def timed_listing() -> float:
+                response = await client.get("/files/")
+                response.raise_for_status()
+                return (time.perf_counter() - start) * 1000
+
+            upload_tasks = [
+                asyncio.create_task(client.post("/files/", files={"file": (f"f{i}.txt", b"x" * 1024)}))
+                for i in range(uploads)
+            ]
+            await asyncio.sleep(0.05)  # Let the uploads reach the lock
+            latencies = await asyncio.gather(*(timed_listing() for _ in range(listings)))
+            await asyncio.gather(*upload_tasks)
+            holder.join()
+
+        files_router.run_io = original_run_io
+        app.dependency_overrides.clear()
+
+    latencies = sorted(latencies)
+    return {
+        "mode": mode,
+        "uploads": uploads,
+        "listings": listings,
+        "lock_hold_s": lock_hold,
+        "listing_p50_ms": round(statistics.median(latencies), 2),
+        "listing_p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2),
+        "listing_max_ms": round(latencies[-1], 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=16, help="Uploads queued on the held lock.")
+    parser.add_argument("--listings", type=int, default=64, help="Concurrent GET /files/ requests to time.")
+    parser.add_argument("--lock-hold", type=float, default=0.5, help="Seconds the metadata lock is held.")
+    args = parser.parse_args()
+
+    results = [asyncio.run(measure(mode, args.uploads, args.listings, args.lock_hold)) for mode in ("inline", "offload")]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Metadata group-commit benchmark.
+
+Runs concurrent add_metadata calls against a metadata.json that already
+holds --existing entries, and reports throughput with every call doing its
+own locked read-modify-write (unbatched) versus group commit. Calls that
+give up on the 5 second metadata lock are counted as timeouts.
+
+    python -m benchmarks.bench_group_commit --writers 64 --adds 2000 --existing 5000
+"""
+import json
+import time
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from filelock import Timeout
+from app.repositories.metadata_repository import MetadataRepository, build_metadata_entry
+
+def measure(mode: str, writers: int, adds: int, existing: int, window_ms: float) -> dict:
+    """Run one scenario and return adds per second and the number of file writes."""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = MetadataRepository(metadata_file=f"{tmp}/metadata.json", group_commit_window=window_ms / 1000)
+        repo.write_metadata([build_metadata_entry(f"seed{i}.txt", i)[1] for i in range(existing)])
+
+        writes = 0
+        writes_lock = threading.Lock()
+        original_write_file = repo._write_file
+        def counting_write_file(metadata):
+            nonlocal writes
+            with writes_lock:
+                writes += 1
+            original_write_file(metadata)
+        repo._write_file = counting_write_file
+
+        def add(i: int) -> bool:
+            try:
+                if mode == "unbatched":
+                    repo._append_entries([build_metadata_entry(f"f{i}.txt", i)[1]])
+                else:
+                    repo.add_metadata(f"f{i}.txt", i)
+            except (Timeout, HTTPException):
+                return False
+            return True
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            succeeded = sum(pool.map(add, range(adds)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "writers": writers,
+        "adds": adds,
+        "existing_entries": existing,
+        "window_ms": window_ms if mode == "group" else None,
+        "adds_per_s": round(succeeded / elapsed, 1),
+        "timeouts": adds - succeeded,
+        "file_writes": writes,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=64, help="Concurrent writer threads.")
+    parser.add_argument("--adds", type=int, default=2000, help="Total add_metadata calls.")
+    parser.add_argument("--existing", type=int, default=5000, help="Entries already in metadata.json.")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="Group-commit window.")
+    args = parser.parse_args()
+
+    results = [measure(mode, args.writers, args.adds, args.existing, args.window_ms) for mode in ("unbatched", "group")]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
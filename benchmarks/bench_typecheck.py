@@ -0,0 +1,119 @@
+"""
+Runtime type-check overhead benchmark.
+
+Times the service calls on the upload path (save_uploaded_stream fed a
+chunk iterator, as POST /files/ calls it, plus the add_metadata it makes)
+and the download path (fetch_downloadable_entry_by_id plus get_etag) with
+CLASSDROP_TYPECHECK=1 and CLASSDROP_TYPECHECK=0. The
+metadata is kept in memory, so the timings are not swamped by the fsync'd
+rewrite of a growing metadata.json. The switch is read when the modules are
+imported, so every run is a fresh interpreter; runs of the two modes are
+interleaved, and the medians and their per-call difference are printed as
+JSON.
+
+    python -m benchmarks.bench_typecheck --calls 2000 --file-size 1024 --existing 1000 --repeats 7
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import tempfile
+import subprocess
+
+def measure(calls: int, file_size: int, existing: int) -> dict:
+    """Time the upload and download paths in this interpreter, in microseconds per call."""
+
+    from app.repositories.file_repository import FileRepository
+    from app.routes.files_router import UPLOAD_CHUNK_SIZE
+    from app.repositories.metadata_repository import MetadataRepository, build_metadata_entry
+    from app.services.file_service import FileService
+
+    class InMemoryMetadataRepository(MetadataRepository):
+        """MetadataRepository whose entries stay in memory; the typechecked methods are the real ones."""
+
+        def __init__(self, metadata_file: str, entries: list):
+            super().__init__(metadata_file=metadata_file, group_commit_window=0)
+            self.entries = entries
+
+        def _read_file(self) -> list:
+            return self.entries
+
+        def _append_entries(self, entries: list):
+            self.entries.extend(entries)
+            self._version.bump()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seed = [build_metadata_entry(f"seed{i}.pdf", i)[1] for i in range(existing)]
+        metadata_repo = InMemoryMetadataRepository(f"{tmp}/metadata.json", seed)
+        service = FileService(file_repo=FileRepository(upload_dir=f"{tmp}/uploads"), metadata_repo=metadata_repo)
+        content = os.urandom(file_size)
+
+        started = time.perf_counter()
+        file_ids = []
+        for i in range(calls):
+            upload_file = io.BytesIO(content)
+            chunks = iter(lambda: upload_file.read(UPLOAD_CHUNK_SIZE), b"")
+            file_ids.append(service.save_uploaded_stream(f"notes_{i}.pdf", chunks))
+        upload = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for file_id in file_ids:
+            _, entry = service.fetch_downloadable_entry_by_id(file_id)
+            service.get_etag(entry)
+        download = time.perf_counter() - started
+
+    return {
+        "upload_us_per_call": upload / calls * 1e6,
+        "download_us_per_call": download / calls * 1e6,
+    }
+
+def run_mode(typecheck: bool, args: argparse.Namespace) -> dict:
+    """Run measure() in a fresh interpreter with the given CLASSDROP_TYPECHECK setting."""
+
+    env = dict(os.environ, CLASSDROP_TYPECHECK="1" if typecheck else "0")
+    command = [
+        sys.executable, "-m", "benchmarks.bench_typecheck", "--child",
+        "--calls", str(args.calls), "--file-size", str(args.file_size), "--existing", str(args.existing),
+    ]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+def medians(runs: list) -> dict:
+    """Return the median of each timing over the runs of one mode."""
+
+    return {key: round(statistics.median(run[key] for run in runs), 2) for key in runs[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000, help="Uploads (and then downloads) per run.")
+    parser.add_argument("--file-size", type=int, default=1024, help="Bytes per uploaded file.")
+    parser.add_argument("--existing", type=int, default=1000, help="Metadata entries stored before each run.")
+    parser.add_argument("--repeats", type=int, default=7, help="Runs per mode, interleaved.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.calls, args.file_size, args.existing)))
+        return
+
+    runs = {True: [], False: []}
+    for _ in range(args.repeats):
+        for typecheck in (True, False):
+            runs[typecheck].append(run_mode(typecheck, args))
+    checked = medians(runs[True])
+    unchecked = medians(runs[False])
+    print(json.dumps({
+        "calls": args.calls,
+        "file_size": args.file_size,
+        "existing_entries": args.existing,
+        "repeats": args.repeats,
+        "typecheck_on": checked,
+        "typecheck_off": unchecked,
+        "overhead_us_per_call": {key: round(checked[key] - unchecked[key], 2) for key in checked},
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import io
+import os
+import zipfile
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.file_service import FileService
+from app.services.archive import stream_zip
+from app.repositories.file_repository import FileRepository
+from app.repositories.metadata_repository import MetadataRepository
+from app.dependencies import get_file_service
+
+client = TestClient(app)
+
+def make_service(tmp_path, compress: bool = False) -> FileService:
+    """Build an isolated FileService on a temporary upload directory and metadata file."""
+
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    return FileService(
+        file_repo=FileRepository(upload_dir=str(upload_dir), compress=compress),
+        metadata_repo=MetadataRepository(metadata_file=str(tmp_path / "metadata.json")),
+    )
+
+@pytest.mark.e2e
+def test_download_all_streams_zip_with_original_filenames(tmp_path):
+    """E2E test: verifies ids=all returns every file under its filename, storing compressed formats as is."""
+
+    # Arrange
+    test_service = make_service(tmp_path, compress=True)
+    notes = b"lecture notes " * 500
+    slides = b"PK\x03\x04" + b"\x00" * 200
+    test_service.save_uploaded_stream("notes.txt", [notes])
+    test_service.save_uploaded_stream("slides.pptx", [slides])
+    test_service.save_uploaded_stream("notes.txt", [b"second copy"])
+    app.dependency_overrides[get_file_service] = lambda: test_service
+
+    # Act
+    response = client.get("/files/archive", params={"ids": "all"})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert "attachment" in response.headers["content-disposition"]
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.namelist() == ["notes.txt", "slides.pptx", "notes (2).txt"]
+        assert archive.read("notes.txt") == notes
+        assert archive.read("slides.pptx") == slides
+        assert archive.read("notes (2).txt") == b"second copy"
+        assert archive.getinfo("notes.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.getinfo("slides.pptx").compress_type == zipfile.ZIP_STORED
+
+    # Cleanup
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_archive_members_are_opened_only_as_the_archive_reaches_them(tmp_path):
+    """E2E test: ensures no file is opened before streaming starts, and a file gone by then is skipped."""
+
+    # Arrange
+    test_service = make_service(tmp_path)
+    test_service.save_uploaded_stream("notes.txt", [b"notes"])
+    gone = test_service.save_uploaded_stream("gone.txt", [b"gone"])
+    test_service.save_uploaded_stream("photo.png", [b"\x89PNG" + b"\x00" * 100])
+    sniffed = []
+    real_is_compressible = test_service.file_repo.is_compressible
+    test_service.file_repo.is_compressible = lambda head: sniffed.append(head) or real_is_compressible(head)
+
+    # Act
+    members = test_service.get_archive_members()
+    sniffed_before_streaming = list(sniffed)
+    os.remove(test_service.file_repo.get_file_path(gone, "gone.txt"))
+    content = b"".join(stream_zip(members))
+
+    # Assert
+    assert sniffed_before_streaming == []
+    assert len(sniffed) == 2
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        assert archive.namelist() == ["notes.txt", "photo.png"]
+        assert archive.getinfo("notes.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.getinfo("photo.png").compress_type == zipfile.ZIP_STORED
+
+@pytest.mark.e2e
+def test_download_archive_of_selected_files(tmp_path):
+    """E2E test: ensures only the requested file_ids are archived, and unknown ones answer 404."""
+
+    # Arrange
+    test_service = make_service(tmp_path)
+    first = test_service.save_uploaded_stream("a.txt", [b"a"])
+    test_service.save_uploaded_stream("b.txt", [b"b"])
+    app.dependency_overrides[get_file_service] = lambda: test_service
+
+    # Act
+    response = client.get("/files/archive", params={"ids": str(first)})
+    missing = client.get("/files/archive", params={"ids": "00000000-0000-4000-8000-000000000000"})
+    invalid = client.get("/files/archive", params={"ids": "not-a-uuid"})
+
+    # Assert
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.namelist() == ["a.txt"]
+    assert missing.status_code == 404
+    assert invalid.status_code == 400
+
+    # Cleanup
+    app.dependency_overrides.clear()
@@ -1,10 +1,12 @@
 from fastapi.testclient import TestClient
 from app.main import app
+from app import config
 from app.services.file_service import FileService
 from app.repositories.file_repository import FileRepository
 from app.repositories.metadata_repository import MetadataRepository
 from app.dependencies import get_file_service  # the one used in Depends()
 import uuid
+import hashlib
 import pytest
 
 client = TestClient(app)
@@ -138,4 +140,238 @@ def test_download_file_with_no_file_on_disk(tmp_path):
     assert data["detail"] == "File not found on disk"
 
     # Cleanup
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_download_file_supports_ranges(tmp_path):
+    """E2E test: verifies Range, multi-range and If-Range handling with a strong ETag."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    metadata_file = tmp_path / "metadata.json"
+    metadata_file.write_text("[]")
+
+    file_repo = FileRepository(upload_dir=str(upload_dir))
+    metadata_repo = MetadataRepository(metadata_file=str(metadata_file))
+    test_service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+
+    file_id = str(uuid.uuid4())
+    content = b"0123456789abcdefghij"
+    (upload_dir / f"{file_id}.txt").write_bytes(content)
+    metadata_repo.write_metadata([
+        {
+            "file_id": file_id,
+            "filename": "lecture.txt",
+            "upload_timestamp": "2025-10-05T10:00:00",
+            "size_in_bytes": len(content),
+        }
+    ])
+
+    # Act
+    full = client.get(f"/files/{file_id}")
+    etag = full.headers["etag"]
+    head = client.head(f"/files/{file_id}")
+    resumed = client.get(f"/files/{file_id}", headers={"Range": "bytes=10-", "If-Range": etag})
+    stale = client.get(f"/files/{file_id}", headers={"Range": "bytes=10-", "If-Range": '"stale"'})
+    multi = client.get(f"/files/{file_id}", headers={"Range": "bytes=0-1,5-6"})
+
+    # Assert
+    assert full.headers["accept-ranges"] == "bytes"
+    assert etag == f'"{file_id}-{len(content)}"'
+    assert head.status_code == 200
+    assert head.headers["content-length"] == str(len(content))
+    assert resumed.status_code == 206
+    assert resumed.content == content[10:]
+    assert resumed.headers["content-range"] == f"bytes 10-19/{len(content)}"
+    assert stale.status_code == 200
+    assert stale.content == content
+    assert multi.status_code == 206
+    assert multi.headers["content-type"].startswith("multipart/byteranges")
+    boundary = multi.headers["content-type"].split("boundary=")[1]
+    assert int(multi.headers["content-length"]) == len(multi.content)
+    assert multi.content.startswith(f"--{boundary}\r\n".encode())
+    assert multi.content.endswith(f"\r\n--{boundary}--\r\n".encode())
+    assert b"Content-Range: bytes 0-1/20\r\n\r\n01\r\n" in multi.content
+    assert b"Content-Range: bytes 5-6/20\r\n\r\n56\r\n" in multi.content
+
+    # Cleanup
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_download_file_conditional_get(tmp_path):
+    """E2E test: verifies content-hash ETags and 304 answers for downloads."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    metadata_file = tmp_path / "metadata.json"
+    metadata_file.write_text("[]")
+
+    file_repo = FileRepository(upload_dir=str(upload_dir))
+    metadata_repo = MetadataRepository(metadata_file=str(metadata_file))
+    test_service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+
+    content = b"Lecture 1 slides"
+    file_id = client.post("/files/", files={"file": ("slides.pdf", content, "application/pdf")}).json()["file_id"]
+
+    # Act
+    full = client.get(f"/files/{file_id}")
+    by_etag = client.get(f"/files/{file_id}", headers={"If-None-Match": full.headers["etag"]})
+    by_date = client.get(f"/files/{file_id}", headers={"If-Modified-Since": full.headers["last-modified"]})
+    old_date = client.get(f"/files/{file_id}", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+    etag_wins = client.get(f"/files/{file_id}", headers={"If-None-Match": '"other"', "If-Modified-Since": full.headers["last-modified"]})
+
+    # Assert
+    assert full.headers["etag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+    assert by_etag.status_code == 304
+    assert by_etag.content == b""
+    assert by_date.status_code == 304
+    assert old_date.status_code == 200
+    assert old_date.content == content
+    assert etag_wins.status_code == 200
+
+    # Cleanup
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_download_compressed_file_negotiates_encoding(tmp_path):
+    """E2E test: verifies files stored compressed are sent gzip-encoded or decompressed depending on Accept-Encoding."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    file_repo = FileRepository(upload_dir=str(upload_dir), compress=True)
+    metadata_repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    test_service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+
+    content = b"week,topic\n" + b"1,Sorting algorithms\n" * 500
+    file_id = client.post("/files/", files={"file": ("syllabus.csv", content, "text/csv")}).json()["file_id"]
+    entry = metadata_repo.get_metadata_by_id(uuid.UUID(file_id))
+
+    # Act
+    encoded = client.get(f"/files/{file_id}", headers={"Accept-Encoding": "gzip"})
+    identity = client.get(f"/files/{file_id}", headers={"Accept-Encoding": "identity"})
+    head = client.head(f"/files/{file_id}", headers={"Accept-Encoding": "gzip;q=0"})
+    revalidated = client.get(f"/files/{file_id}", headers={"Accept-Encoding": "gzip", "If-None-Match": encoded.headers["etag"]})
+
+    # Assert
+    assert entry["size_in_bytes"] == len(content)
+    assert entry["content_encoding"] == "gzip"
+    assert entry["stored_size"] < len(content)
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.headers["vary"] == "Accept-Encoding"
+    assert encoded.content == content  # httpx decodes the gzip body
+    assert int(encoded.headers["content-length"]) == entry["stored_size"]
+    assert "content-encoding" not in identity.headers
+    assert identity.content == content
+    assert identity.headers["content-length"] == str(len(content))
+    assert identity.headers["etag"] != encoded.headers["etag"]
+    assert head.status_code == 200
+    assert head.content == b""
+    assert head.headers["content-length"] == str(len(content))
+    assert revalidated.status_code == 304
+
+    # Cleanup
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_download_file_offloads_to_proxy(tmp_path, monkeypatch):
+    """E2E test: verifies the X-Accel-Redirect and X-Sendfile download modes hand the file to the proxy."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    file_repo = FileRepository(upload_dir=str(upload_dir), shard_depth=2)
+    metadata_repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    test_service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+
+    file_id = client.post("/files/", files={"file": ("week 1.pdf", b"%PDF-1.4 slides", "application/pdf")}).json()["file_id"]
+    hex_id = uuid.UUID(file_id).hex
+    monkeypatch.setattr(config, "DOWNLOAD_INTERNAL_PREFIX", "/internal-uploads/")
+
+    # Act
+    monkeypatch.setattr(config, "DOWNLOAD_MODE", "x-accel-redirect")
+    accel = client.get(f"/files/{file_id}")
+    not_modified = client.get(f"/files/{file_id}", headers={"If-None-Match": accel.headers["etag"]})
+    monkeypatch.setattr(config, "DOWNLOAD_MODE", "x-sendfile")
+    sendfile = client.get(f"/files/{file_id}")
+
+    # Assert
+    assert accel.status_code == 200
+    assert accel.content == b""
+    assert accel.headers["x-accel-redirect"] == f"/internal-uploads/{hex_id[:2]}/{hex_id[2:4]}/{file_id}.pdf"
+    assert accel.headers["content-disposition"] == "attachment; filename*=utf-8''week%201.pdf"
+    assert accel.headers["etag"] == f'"{hashlib.sha256(b"%PDF-1.4 slides").hexdigest()}"'
+    assert "content-length" not in accel.headers
+    assert not_modified.status_code == 304
+    assert sendfile.headers["x-sendfile"] == str(upload_dir / hex_id[:2] / hex_id[2:4] / f"{file_id}.pdf")
+
+    # Cleanup
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_x_accel_redirect_keeps_encoded_files_in_the_app(tmp_path, monkeypatch):
+    """E2E test: verifies gzip-stored files are not handed to nginx, which would drop their Content-Encoding."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    file_repo = FileRepository(upload_dir=str(upload_dir), compress=True)
+    metadata_repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    test_service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+
+    content = b"week,topic\n" + b"1,Sorting algorithms\n" * 500
+    file_id = client.post("/files/", files={"file": ("syllabus.csv", content, "text/csv")}).json()["file_id"]
+    entry = metadata_repo.get_metadata_by_id(uuid.UUID(file_id))
+    monkeypatch.setattr(config, "DOWNLOAD_MODE", "x-accel-redirect")
+
+    # Act
+    encoded = client.get(f"/files/{file_id}", headers={"Accept-Encoding": "gzip"})
+    identity = client.get(f"/files/{file_id}", headers={"Accept-Encoding": "identity"})
+
+    # Assert
+    assert "x-accel-redirect" not in encoded.headers
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.headers["vary"] == "Accept-Encoding"
+    assert encoded.headers["etag"] == test_service.get_etag(entry, "gzip")
+    assert int(encoded.headers["content-length"]) == entry["stored_size"]
+    assert encoded.content == content
+    assert "x-accel-redirect" not in identity.headers
+    assert identity.content == content
+
+    # Cleanup
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_x_accel_redirect_sends_plain_files_with_the_app_etag(tmp_path, monkeypatch):
+    """E2E test: verifies uncompressed files go to nginx with the app's ETag, while If-Range resumes stay in the app."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    file_repo = FileRepository(upload_dir=str(upload_dir), compress=True)
+    metadata_repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    test_service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+
+    content = b"%PDF-1.4 slides"
+    file_id = client.post("/files/", files={"file": ("week 1.pdf", content, "application/pdf")}).json()["file_id"]
+    monkeypatch.setattr(config, "DOWNLOAD_MODE", "x-accel-redirect")
+
+    # Act
+    accel = client.get(f"/files/{file_id}", headers={"Accept-Encoding": "gzip"})
+    resumed = client.get(f"/files/{file_id}", headers={"Range": "bytes=9-", "If-Range": accel.headers["etag"]})
+
+    # Assert
+    assert accel.headers["x-accel-redirect"].endswith(f"{file_id}.pdf")
+    assert accel.headers["etag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+    assert "content-encoding" not in accel.headers
+    assert accel.content == b""
+    assert resumed.status_code == 206
+    assert "x-accel-redirect" not in resumed.headers
+    assert resumed.content == content[9:]
+
+    # Cleanup
+    app.dependency_overrides.clear()
@@ -0,0 +1,145 @@
+import io
+import time
+import uuid
+import zipfile
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.file_service import FileService
+from app.services.job_dispatcher import JobDispatcher
+from app.services.archive import stream_zip
+from app.repositories.file_repository import FileRepository
+from app.repositories.job_repository import JobRepository
+from app.repositories.metadata_repository import MetadataRepository
+from app.dependencies import get_file_service
+
+client = TestClient(app)
+
+@pytest.mark.e2e
+def test_upload_is_compressed_by_a_background_job(tmp_path):
+    """E2E test: verifies an upload returns uncompressed and a worker process compresses it afterwards."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    job_repo = JobRepository(database_file=str(tmp_path / "jobs.db"))
+    metadata_repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    test_service = FileService(
+        file_repo=FileRepository(upload_dir=str(upload_dir), compress=True),
+        metadata_repo=metadata_repo,
+        job_repo=job_repo,
+    )
+    dispatcher = JobDispatcher(job_repo, test_service, max_workers=1, poll_interval=0.05)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+    content = b"week 1 lecture notes\n" * 1000
+
+    # Act
+    response = client.post("/files/", files={"file": ("notes.txt", content, "text/plain")})
+    file_id = response.json()["file_id"]
+    entry_at_upload = metadata_repo.get_metadata_by_id(uuid.UUID(file_id))
+
+    dispatcher.start()
+    try:
+        deadline = time.monotonic() + 30
+        while metadata_repo.read_metadata()[0]["jobs"]["compress"] == JobRepository.PENDING and time.monotonic() < deadline:
+            time.sleep(0.05)
+        original_kept = (upload_dir / f"{file_id}.txt").exists()
+    finally:
+        dispatcher.stop()
+    download = client.get(f"/files/{file_id}", headers={"Accept-Encoding": "identity"})
+
+    # Assert
+    assert response.status_code == 201
+    assert entry_at_upload["jobs"] == {"compress": "pending"}
+    assert "content_encoding" not in entry_at_upload
+
+    entry = metadata_repo.read_metadata()[0]
+    assert entry["jobs"] == {"compress": "done"}
+    assert entry["content_encoding"] == "gzip"
+    assert entry["stored_size"] < len(content)
+    assert (upload_dir / f"{file_id}.txt.gz").exists()
+    # Kept through the grace period for readers that resolved it, removed at shutdown
+    assert original_kept
+    assert not (upload_dir / f"{file_id}.txt").exists()
+    assert download.content == content
+
+    # Cleanup
+    app.dependency_overrides.clear()
+    job_repo.close()
+
+@pytest.mark.e2e
+def test_archive_survives_compression_of_its_members(tmp_path):
+    """E2E test: verifies an archive whose files were compressed and their originals removed mid-stream is still complete."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    job_repo = JobRepository(database_file=str(tmp_path / "jobs.db"))
+    test_service = FileService(
+        file_repo=FileRepository(upload_dir=str(upload_dir), compress=True),
+        metadata_repo=MetadataRepository(metadata_file=str(tmp_path / "metadata.json")),
+        job_repo=job_repo,
+    )
+    content = b"week 2 lab instructions\n" * 1000
+    file_id = test_service.save_uploaded_stream("lab.txt", [content])
+    members = test_service.get_archive_members(None)
+
+    # Act: the compression job finishes, and its original is removed, before the archive is streamed
+    job = job_repo.claim(1)[0]
+    func, args = test_service.start_job(job)
+    test_service.finish_job(job, func(*args))
+    removed = test_service.remove_replaced_original(file_id, "lab.txt")
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(stream_zip(members))))
+
+    # Assert
+    assert removed is True
+    assert archive.read("lab.txt") == content
+    assert test_service.remove_replaced_originals() == 0
+
+    # Cleanup
+    job_repo.close()
+
+@pytest.mark.e2e
+def test_pending_jobs_lost_before_enqueue_are_requeued_at_start(tmp_path, monkeypatch):
+    """E2E test: verifies an entry left pending by a crash before its job was queued is compressed after a restart, once."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    job_repo = JobRepository(database_file=str(tmp_path / "jobs.db"))
+    metadata_repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    test_service = FileService(
+        file_repo=FileRepository(upload_dir=str(upload_dir), compress=True),
+        metadata_repo=metadata_repo,
+        job_repo=job_repo,
+    )
+    content = b"week 3 reading list\n" * 1000
+    # The process exits between writing the metadata and queueing the job
+    monkeypatch.setattr(test_service, "_enqueue_jobs", lambda file_id, filename, jobs: None)
+    file_id = test_service.save_uploaded_stream("reading.txt", [content])
+    monkeypatch.undo()
+    dispatcher = JobDispatcher(job_repo, test_service, max_workers=1, poll_interval=0.05, original_grace_seconds=0)
+
+    # Act
+    dispatcher.start()
+    try:
+        deadline = time.monotonic() + 30
+        while metadata_repo.read_metadata()[0]["jobs"]["compress"] == JobRepository.PENDING and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # A duplicate of the finished job does nothing
+        duplicate = job_repo.enqueue("compress", {"file_id": str(file_id), "filename": "reading.txt"})
+        while job_repo.get_job(duplicate)["status"] == JobRepository.PENDING and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        dispatcher.stop()
+
+    # Assert
+    entry = metadata_repo.read_metadata()[0]
+    assert entry["jobs"] == {"compress": "done"}
+    assert entry["content_encoding"] == "gzip"
+    assert job_repo.get_job(duplicate)["status"] == JobRepository.DONE
+    assert test_service.requeue_missing_jobs() == 0
+    assert test_service.fetch_downloadable_file_by_id(file_id)[0].endswith(".txt.gz")
+
+    # Cleanup
+    job_repo.close()
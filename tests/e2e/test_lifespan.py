@@ -0,0 +1,26 @@
+from fastapi.testclient import TestClient
+from app import config
+from app.main import app
+import pytest
+
+@pytest.mark.e2e
+def test_service_is_built_once_per_application(tmp_path, monkeypatch):
+    """E2E test: verifies that every request shares the service built by the lifespan."""
+
+    # Arrange
+    monkeypatch.setattr(config, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(config, "METADATA_FILE", str(tmp_path / "metadata.json"))
+    monkeypatch.setattr(config, "METADATA_BACKEND", "json")
+
+    # Act
+    with TestClient(app) as client:
+        service = app.state.container.file_service
+        upload = client.post("/files/", files={"file": ("notes.txt", b"Week 1", "text/plain")})
+        listing = client.get("/files/")
+        same_service = app.state.container.file_service
+
+    # Assert
+    assert upload.status_code == 201
+    assert [f["filename"] for f in listing.json()["files"]] == ["notes.txt"]
+    assert same_service is service
+    assert service.file_repo.UPLOAD_DIR == str(tmp_path / "uploads")
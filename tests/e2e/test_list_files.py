@@ -87,3 +87,117 @@ def test_list_files_with_corrupt_metadata(tmp_path):
 
     # Clean up
     app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_list_files_paginates(tmp_path):
+    """E2E test: verifies limit/cursor pagination and rejection of a bad cursor."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    metadata_file = tmp_path / "metadata.json"
+    metadata_file.write_text("[]")
+
+    file_repo = FileRepository(upload_dir=upload_dir)
+    metadata_repo = MetadataRepository(metadata_file=metadata_file)
+    test_service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+
+    client = TestClient(app)
+
+    metadata_repo.write_metadata([
+        {
+            "file_id": str(uuid.uuid4()),
+            "filename": f"week{i}.pdf",
+            "upload_timestamp": f"2025-10-0{i}T12:00:00",
+            "size_in_bytes": i,
+        }
+        for i in range(1, 4)
+    ])
+
+    # Act
+    first = client.get("/files/", params={"limit": 2, "sort": "filename", "order": "desc"}).json()
+    second = client.get("/files/", params={"limit": 2, "sort": "filename", "order": "desc", "cursor": first["next_cursor"]}).json()
+    bad_cursor = client.get("/files/", params={"limit": 2, "cursor": "garbage"})
+
+    # Assert
+    assert [f["filename"] for f in first["files"]] == ["week3.pdf", "week2.pdf"]
+    assert [f["filename"] for f in second["files"]] == ["week1.pdf"]
+    assert second["next_cursor"] is None
+    assert bad_cursor.status_code == 400
+
+    # Clean up
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_list_files_conditional_get(tmp_path):
+    """E2E test: verifies the listing ETag, 304 on If-None-Match and invalidation on upload."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    metadata_file = tmp_path / "metadata.json"
+    metadata_file.write_text("[]")
+
+    file_repo = FileRepository(upload_dir=upload_dir)
+    metadata_repo = MetadataRepository(metadata_file=metadata_file)
+    test_service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+
+    client = TestClient(app)
+    metadata_repo.add_metadata("a.txt", 1)
+
+    # Act
+    first = client.get("/files/")
+    etag = first.headers["etag"]
+    cached = client.get("/files/", headers={"If-None-Match": etag})
+    other_query = client.get("/files/", params={"limit": 1}, headers={"If-None-Match": etag})
+    metadata_repo.add_metadata("b.txt", 2)
+    after_upload = client.get("/files/", headers={"If-None-Match": etag})
+
+    # Assert
+    assert first.status_code == 200
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert other_query.status_code == 200
+    assert after_upload.status_code == 200
+    assert len(after_upload.json()["files"]) == 2
+    assert after_upload.headers["etag"] != etag
+
+    # Clean up
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_list_files_gzip_and_cached_body(tmp_path, monkeypatch):
+    """E2E test: verifies large listings are gzip-encoded with their own ETag and served from the body cache."""
+
+    # Arrange
+    file_repo = FileRepository(upload_dir=str(tmp_path / "uploads"))
+    metadata_repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    test_service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+    client = TestClient(app)
+    for i in range(50):
+        metadata_repo.add_metadata(f"lecture_{i:02}.pdf", 1000 + i)
+
+    # Act
+    encoded = client.get("/files/", headers={"Accept-Encoding": "gzip"})
+    list_calls = []
+    monkeypatch.setattr(metadata_repo, "list_metadata", lambda **kwargs: list_calls.append(kwargs))
+    identity = client.get("/files/", headers={"Accept-Encoding": "identity"})
+    revalidated = client.get("/files/", headers={"Accept-Encoding": "gzip", "If-None-Match": encoded.headers["etag"]})
+
+    # Assert
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.headers["vary"] == "Accept-Encoding"
+    assert len(encoded.json()["files"]) == 50
+    assert int(encoded.headers["content-length"]) < len(identity.content)
+    assert "content-encoding" not in identity.headers
+    assert identity.json() == encoded.json()
+    assert identity.headers["etag"] != encoded.headers["etag"]
+    assert list_calls == []
+    assert revalidated.status_code == 304
+
+    # Clean up
+    app.dependency_overrides.clear()
@@ -0,0 +1,51 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.file_service import FileService
+from app.repositories.file_repository import FileRepository
+from app.repositories.metadata_repository import MetadataRepository
+from app.dependencies import get_file_service
+
+def sample(text: str, line_prefix: str) -> float:
+    """Return the value of the first sample line starting with line_prefix, or 0 if absent."""
+
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+@pytest.mark.e2e
+def test_metrics_endpoint_reports_requests_bytes_and_errors(tmp_path):
+    """E2E test: verifies /metrics exposes route latency, byte counters, error counts and the entry count."""
+
+    # Arrange
+    file_repo = FileRepository(upload_dir=str(tmp_path / "uploads"))
+    metadata_repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    test_service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+    client = TestClient(app)
+    before = client.get("/metrics").text
+
+    # Act
+    file_id = client.post("/files/", files={"file": ("notes.txt", b"x" * 1000, "text/plain")}).json()["file_id"]
+    client.get(f"/files/{file_id}")
+    client.post("/files/", files={"file": ("virus.exe", b"MZ", "application/octet-stream")})
+    response = client.get("/metrics")
+    text = response.text
+
+    # Assert
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE classdrop_http_request_duration_seconds histogram" in text
+    download = 'classdrop_http_requests_total{method="GET",route="/files/{file_id}",status="200"}'
+    assert sample(text, download) == sample(before, download) + 1
+    uploaded = 'classdrop_http_request_body_bytes_total{method="POST",route="/files/"}'
+    assert sample(text, uploaded) >= sample(before, uploaded) + 1000
+    downloaded = 'classdrop_http_response_body_bytes_total{method="GET",route="/files/{file_id}"}'
+    assert sample(text, downloaded) == sample(before, downloaded) + 1000
+    dangerous = 'classdrop_errors_total{exception="DangerousFileExtensionException"}'
+    assert sample(text, dangerous) == sample(before, dangerous) + 1
+    assert 'classdrop_http_requests_in_flight{method="GET",route="/metrics"} 1' in text
+    assert "classdrop_metadata_entries 1" in text
+
+    # Cleanup
+    app.dependency_overrides.clear()
@@ -0,0 +1,106 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.file_service import FileService
+from app.repositories.file_repository import FileRepository
+from app.repositories.metadata_repository import MetadataRepository
+from app.repositories.upload_session_repository import UploadSessionRepository
+from app.dependencies import get_file_service
+
+def build_service(tmp_path, max_size_mb: float = 20) -> FileService:
+    """Build an isolated FileService with a small chunk size for resumable uploads."""
+
+    file_repo = FileRepository(upload_dir=str(tmp_path / "uploads"))
+    metadata_repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    session_repo = UploadSessionRepository(staging_dir=str(tmp_path / "uploads" / ".staging"), chunk_size=1024)
+    return FileService(file_repo=file_repo, metadata_repo=metadata_repo, max_size_mb=max_size_mb, upload_session_repo=session_repo)
+
+@pytest.mark.e2e
+def test_resumable_upload_out_of_order(tmp_path):
+    """E2E test: verifies that a file above the single-request limit can be uploaded in chunks."""
+
+    # Arrange
+    test_service = build_service(tmp_path, max_size_mb=0.001)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+    client = TestClient(app)
+    content = bytes(range(256)) * 10  # 2560 bytes, over the 0.001 MB single-request limit
+
+    # Act
+    created = client.post("/files/uploads/", json={"filename": "lecture.mp4", "size": len(content)})
+    session_id = created.json()["session_id"]
+    client.put(f"/files/uploads/{session_id}/chunks/2", content=content[2048:])
+    client.put(f"/files/uploads/{session_id}/chunks/0", content=content[:1024])
+    partial = client.get(f"/files/uploads/{session_id}")
+    early = client.post(f"/files/uploads/{session_id}/complete")
+    client.put(f"/files/uploads/{session_id}/chunks/1", content=content[1024:2048])
+    completed = client.post(f"/files/uploads/{session_id}/complete")
+    download = client.get(f"/files/{completed.json()['file_id']}")
+    gone = client.get(f"/files/uploads/{session_id}")
+
+    # Assert
+    assert created.status_code == 201
+    assert created.json()["chunk_count"] == 3
+    assert partial.json()["received_chunks"] == [0, 2]
+    assert partial.json()["missing_chunks"] == [1]
+    assert early.status_code == 409
+    assert completed.status_code == 201
+    assert download.content == content
+    assert gone.status_code == 404
+    assert list((tmp_path / "uploads" / ".staging").iterdir()) == []
+
+    # Cleanup
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_resumable_upload_rejects_invalid_requests(tmp_path):
+    """E2E test: verifies dangerous extensions, oversized chunks and unknown sessions are rejected."""
+
+    # Arrange
+    test_service = build_service(tmp_path)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+    client = TestClient(app)
+
+    # Act
+    dangerous = client.post("/files/uploads/", json={"filename": "setup.exe", "size": 10})
+    session_id = client.post("/files/uploads/", json={"filename": "notes.txt", "size": 10}).json()["session_id"]
+    oversized = client.put(f"/files/uploads/{session_id}/chunks/0", content=b"x" * 2048)
+    short = client.put(f"/files/uploads/{session_id}/chunks/0", content=b"x" * 5)
+    cancelled = client.delete(f"/files/uploads/{session_id}")
+    after_cancel = client.put(f"/files/uploads/{session_id}/chunks/0", content=b"x" * 10)
+
+    # Assert
+    assert dangerous.status_code == 400
+    assert oversized.status_code == 400
+    assert short.status_code == 400
+    assert cancelled.status_code == 204
+    assert after_cancel.status_code == 404
+
+    # Cleanup
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_resumable_upload_keeps_the_chunk_size_of_the_session(tmp_path):
+    """E2E test: verifies chunks are checked against their session's chunk size, not the current setting."""
+
+    # Arrange
+    test_service = build_service(tmp_path)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+    client = TestClient(app)
+    content = b"y" * 1500
+    session_id = client.post("/files/uploads/", json={"filename": "slides.txt", "size": len(content)}).json()["session_id"]
+    # The configured chunk size shrinks while the session is open
+    test_service.upload_session_repo.CHUNK_SIZE = 256
+
+    # Act
+    first = client.put(f"/files/uploads/{session_id}/chunks/0", content=content[:1024])
+    second = client.put(f"/files/uploads/{session_id}/chunks/1", content=content[1024:])
+    completed = client.post(f"/files/uploads/{session_id}/complete")
+
+    # Assert
+    assert first.status_code == 200
+    assert first.json()["size"] == 1024
+    assert second.status_code == 200
+    assert completed.status_code == 201
+
+    # Cleanup
+    app.dependency_overrides.clear()
@@ -0,0 +1,39 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.file_service import FileService
+from app.repositories.file_repository import FileRepository
+from app.repositories.metadata_repository import MetadataRepository
+from app.dependencies import get_file_service
+
+@pytest.mark.e2e
+def test_search_files_returns_ranked_matches(tmp_path):
+    """E2E test: verifies /files/search returns matching entries, best match first."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    metadata_repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    test_service = FileService(file_repo=FileRepository(upload_dir=str(upload_dir)), metadata_repo=metadata_repo)
+    metadata_repo.write_metadata([
+        {"file_id": "1", "filename": "week7_lab.pdf", "upload_timestamp": "2025-10-01T10:00:00", "size_in_bytes": 1},
+        {"file_id": "2", "filename": "week 7 slides.pptx", "upload_timestamp": "2025-10-02T10:00:00", "size_in_bytes": 2},
+        {"file_id": "3", "filename": "week 8 slides.pptx", "upload_timestamp": "2025-10-03T10:00:00", "size_in_bytes": 3},
+    ])
+    app.dependency_overrides[get_file_service] = lambda: test_service
+    client = TestClient(app)
+
+    # Act
+    response = client.get("/files/search", params={"q": "week 7"})
+    limited = client.get("/files/search", params={"q": "slides", "limit": 1})
+    empty_query = client.get("/files/search", params={"q": ""})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["query"] == "week 7"
+    assert [entry["file_id"] for entry in response.json()["files"]] == ["1", "2"]
+    assert len(limited.json()["files"]) == 1
+    assert empty_query.status_code == 422
+
+    # Cleanup
+    app.dependency_overrides.clear()
@@ -0,0 +1,37 @@
+import gzip
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.static_files import PrecompressedStaticFiles, precompress_directory
+
+@pytest.mark.e2e
+def test_static_files_serve_precompressed_siblings(tmp_path):
+    """E2E test: verifies .gz siblings are generated and served to clients that accept gzip."""
+
+    # Arrange
+    css = b"body { font-family: sans-serif; }\n" * 100
+    (tmp_path / "styles.css").write_bytes(css)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    static_app = FastAPI()
+    static_app.mount("/static", PrecompressedStaticFiles(directory=str(tmp_path)), name="static")
+    client = TestClient(static_app)
+
+    # Act
+    written = precompress_directory(str(tmp_path))
+    rewritten = precompress_directory(str(tmp_path))
+    encoded = client.get("/static/styles.css", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/static/styles.css", headers={"Accept-Encoding": "identity"})
+    revalidated = client.get("/static/styles.css", headers={"Accept-Encoding": "gzip", "If-None-Match": encoded.headers["etag"]})
+
+    # Assert
+    assert written >= 1
+    assert rewritten == 0
+    assert not (tmp_path / "logo.png.gz").exists()
+    assert gzip.decompress((tmp_path / "styles.css.gz").read_bytes()) == css
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.headers["content-type"].startswith("text/css")
+    assert int(encoded.headers["content-length"]) < len(css)
+    assert encoded.content == css
+    assert "content-encoding" not in identity.headers
+    assert identity.content == css
+    assert revalidated.status_code == 304
@@ -4,8 +4,9 @@ from app.main import app
 from app.services.file_service import FileService
 from app.repositories.file_repository import FileRepository
 from app.repositories.metadata_repository import MetadataRepository
+from app.repositories.sqlite_metadata_repository import SqliteMetadataRepository
 from app.dependencies import get_file_service
-import uuid, json
+import uuid, json, sqlite3
 
 @pytest.mark.e2e
 def test_upload_file_succeeds(tmp_path):
@@ -141,6 +142,7 @@ def test_upload_file_too_large(tmp_path):
     assert response.status_code == 413
     data = response.json()
     assert data["detail"] == "File exceeds 1 MB limit."
+    assert list(upload_dir.iterdir()) == []  # No partial upload left behind
 
     # Clean up
     app.dependency_overrides.clear()
@@ -186,3 +188,109 @@ def test_upload_file_with_bad_filename(tmp_path):
     # Clean up
     app.dependency_overrides.clear()
 
+
+@pytest.mark.e2e
+def test_batch_upload_commits_accepted_files_in_one_write(tmp_path):
+    """E2E test: verifies a batch upload stores valid files in one metadata write and rejects the rest."""
+
+    # Setup
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    metadata_file = tmp_path / "metadata.json"
+    metadata_file.write_text("[]")
+
+    file_repo = FileRepository(upload_dir=upload_dir)
+    metadata_repo = MetadataRepository(metadata_file=metadata_file)
+    test_service = FileService(file_repo=file_repo, metadata_repo=metadata_repo)
+
+    writes = []
+    original_write_file = metadata_repo._write_file
+    metadata_repo._write_file = lambda metadata: (writes.append(len(metadata)), original_write_file(metadata))
+
+    app.dependency_overrides[get_file_service] = lambda: test_service
+    client = TestClient(app)
+
+    # Act
+    response = client.post(
+        "/files/batch",
+        files=[
+            ("files", ("week1.pdf", b"slides", "application/pdf")),
+            ("files", ("run.sh", b"echo hi", "text/plain")),
+            ("files", ("data.csv", b"a,b\n1,2\n", "text/csv")),
+        ],
+    )
+
+    # Assert
+    assert response.status_code == 201
+    data = response.json()
+    assert data["uploaded"] == 2
+    assert data["rejected"] == 1
+    assert [item["status"] for item in data["files"]] == ["uploaded", "rejected", "uploaded"]
+    assert writes == [2]
+
+    saved_metadata = json.loads(metadata_file.read_text())
+    assert [entry["filename"] for entry in saved_metadata] == ["week1.pdf", "data.csv"]
+    assert (upload_dir / f"{data['files'][0]['file_id']}.pdf").read_bytes() == b"slides"
+    assert not any(upload_dir.glob("*.tmp"))
+
+    # Cleanup
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_batch_upload_with_only_rejected_files_returns_400(tmp_path):
+    """E2E test: ensures a batch in which every file is rejected answers 400 with per-file details."""
+
+    # Setup
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    metadata_file = tmp_path / "metadata.json"
+    metadata_file.write_text("[]")
+
+    test_service = FileService(
+        file_repo=FileRepository(upload_dir=upload_dir),
+        metadata_repo=MetadataRepository(metadata_file=metadata_file),
+    )
+    app.dependency_overrides[get_file_service] = lambda: test_service
+    client = TestClient(app)
+
+    # Act
+    response = client.post("/files/batch", files=[("files", ("setup.exe", b"MZ", "application/octet-stream"))])
+
+    # Assert
+    assert response.status_code == 400
+    assert response.json()["files"][0]["status"] == "rejected"
+    assert json.loads(metadata_file.read_text()) == []
+
+    # Cleanup
+    app.dependency_overrides.clear()
+
+@pytest.mark.e2e
+def test_upload_while_sqlite_metadata_is_locked_returns_503(tmp_path):
+    """E2E test: ensures an upload that cannot get the SQLite write lock answers 503 with Retry-After, while reads still work."""
+
+    # Setup
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    metadata_repo = SqliteMetadataRepository(database_file=tmp_path / "metadata.db")
+    conn, _ = metadata_repo._connection_entry()
+    conn.execute("PRAGMA busy_timeout=50")
+    test_service = FileService(file_repo=FileRepository(upload_dir=upload_dir), metadata_repo=metadata_repo)
+    app.dependency_overrides[get_file_service] = lambda: test_service
+    client = TestClient(app)
+    other = sqlite3.connect(tmp_path / "metadata.db", isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    # Act
+    upload = client.post("/files/", files={"file": ("notes.txt", b"week 7", "text/plain")})
+    listing = client.get("/files/")
+
+    # Assert
+    assert upload.status_code == 503
+    assert upload.headers["Retry-After"] == "1"
+    assert listing.status_code == 200
+
+    # Cleanup
+    other.execute("ROLLBACK")
+    other.close()
+    metadata_repo.close()
+    app.dependency_overrides.clear()
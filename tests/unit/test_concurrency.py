@@ -0,0 +1,74 @@
+import time
+import asyncio
+import threading
+import pytest
+from app.concurrency import iterate_from_thread, run_io
+
+@pytest.mark.unit
+def test_run_io_runs_off_the_event_loop():
+    """Ensures blocking calls run on a worker thread while the loop keeps serving."""
+
+    # Arrange
+    loop_thread = threading.get_ident()
+    ticks = []
+
+    def blocking_call(delay: float) -> int:
+        time.sleep(delay)
+        return threading.get_ident()
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        return await asyncio.gather(run_io(blocking_call, delay=0.2), ticker())
+
+    # Act
+    start = time.perf_counter()
+    worker_thread, _ = asyncio.run(scenario())
+
+    # Assert
+    assert worker_thread != loop_thread
+    assert len(ticks) == 5
+    assert ticks[-1] - start < 0.15  # The ticker finished while the call was still sleeping
+
+@pytest.mark.unit
+def test_run_io_propagates_exceptions():
+    """Verifies exceptions raised on the worker thread reach the awaiting coroutine."""
+
+    # Arrange
+    def failing_call():
+        raise FileNotFoundError("missing")
+
+    # Act & Assert
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(run_io(failing_call))
+
+@pytest.mark.unit
+def test_iterate_from_thread_pulls_parts_on_demand():
+    """Ensures a blocking consumer gets an async stream's parts one at a time, as it asks for them."""
+
+    # Arrange
+    produced = []
+
+    async def stream():
+        for part in (b"ab", b"cd", b"ef"):
+            produced.append(part)
+            yield part
+
+    def consume(parts) -> list:
+        seen = []
+        for part in parts:
+            # Nothing beyond the current part has been read from the stream
+            seen.append((part, len(produced)))
+        return seen
+
+    async def scenario():
+        return await run_io(consume, iterate_from_thread(stream(), asyncio.get_running_loop()))
+
+    # Act
+    seen = asyncio.run(scenario())
+
+    # Assert
+    assert seen == [(b"ab", 1), (b"cd", 2), (b"ef", 3)]
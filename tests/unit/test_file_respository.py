@@ -1,5 +1,8 @@
+import os
 import pytest
 import uuid
+import gzip
+import hashlib
 from app.repositories.file_repository import FileRepository  # adjust this import as needed
 
 @pytest.mark.unit
@@ -97,3 +100,186 @@ def test_custom_upload_dir_is_created(tmp_path):
     # Assert
     assert custom_dir.exists()
     assert repo.UPLOAD_DIR == str(custom_dir)
+
+@pytest.mark.unit
+def test_write_temp_file_and_commit(tmp_path):
+    """Verifies that streamed chunks land in a temp file that is renamed into place."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    repo = FileRepository(upload_dir=str(upload_dir))
+    file_id = uuid.uuid4()
+
+    # Act
+    staged = repo.write_temp_file(iter([b"hello ", b"world"]))
+    repo.commit_temp_file(staged.path, file_id, ".txt")
+
+    # Assert
+    assert staged.size == 11
+    assert staged.sha256 == hashlib.sha256(b"hello world").hexdigest()
+    assert (upload_dir / f"{file_id}.txt").read_bytes() == b"hello world"
+    assert list(upload_dir.iterdir()) == [upload_dir / f"{file_id}.txt"]
+
+@pytest.mark.unit
+def test_upload_data_and_its_directory_entry_are_fsynced(tmp_path, monkeypatch):
+    """Ensures the staged data is fsynced while written, and the directory after the rename and the blob link."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    repo = FileRepository(upload_dir=str(upload_dir), content_addressed=True)
+    synced = []
+    real_fsync = os.fsync
+
+    def recording_fsync(fd):
+        synced.append(os.fstat(fd).st_ino)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", recording_fsync)
+    file_id = uuid.uuid4()
+
+    # Act
+    staged = repo.write_temp_file(iter([b"week 7 notes"]))
+    after_write = list(synced)
+    repo.commit_temp_file(staged.path, file_id, ".txt", sha256=staged.sha256)
+
+    # Assert
+    blob_path = repo.get_blob_path(staged.sha256)
+    assert after_write == [os.stat(blob_path).st_ino]
+    assert os.stat(os.path.dirname(blob_path)).st_ino in synced
+    assert synced[-1] == os.stat(upload_dir).st_ino
+
+@pytest.mark.unit
+def test_write_temp_file_removes_temp_on_error(tmp_path):
+    """Ensures the temp file is removed when the chunk iterator raises."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    repo = FileRepository(upload_dir=str(upload_dir))
+
+    def failing_chunks():
+        yield b"partial"
+        raise RuntimeError("client disconnected")
+
+    # Act & Assert
+    with pytest.raises(RuntimeError):
+        repo.write_temp_file(failing_chunks())
+    assert list(upload_dir.iterdir()) == []
+
+@pytest.mark.unit
+def test_content_addressed_commit_deduplicates(tmp_path):
+    """Verifies duplicate uploads share one refcounted blob that is reclaimed with the last reference."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    repo = FileRepository(upload_dir=str(upload_dir), content_addressed=True)
+    first_id, second_id = uuid.uuid4(), uuid.uuid4()
+
+    # Act
+    first = repo.write_temp_file(iter([b"same slides"]))
+    repo.commit_temp_file(first.path, first_id, ".pdf", sha256=first.sha256)
+    second = repo.write_temp_file(iter([b"same slides"]))
+    repo.commit_temp_file(second.path, second_id, ".pdf", sha256=second.sha256)
+    blob_path = repo.get_blob_path(first.sha256)
+
+    # Assert
+    assert first.sha256 == second.sha256
+    assert repo.get_blob_refcount(first.sha256) == 2
+    assert (upload_dir / f"{second_id}.pdf").read_bytes() == b"same slides"
+    assert (upload_dir / f"{first_id}.pdf").stat().st_ino == (upload_dir / f"{second_id}.pdf").stat().st_ino
+    assert not any(p.suffix == repo.TEMP_SUFFIX for p in upload_dir.iterdir())
+
+    repo.delete_file(first_id, "slides.pdf", sha256=first.sha256)
+    assert repo.get_blob_refcount(first.sha256) == 1
+    repo.delete_file(second_id, "slides.pdf", sha256=second.sha256)
+    assert not os.path.exists(blob_path)
+
+@pytest.mark.unit
+def test_collect_garbage_removes_orphaned_blobs(tmp_path):
+    """Ensures collect_garbage removes blobs whose uploads were removed out of band."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    repo = FileRepository(upload_dir=str(upload_dir), content_addressed=True)
+    file_id = uuid.uuid4()
+    staged = repo.write_temp_file(iter([b"orphan"]))
+    repo.commit_temp_file(staged.path, file_id, ".txt", sha256=staged.sha256)
+    (upload_dir / f"{file_id}.txt").unlink()
+
+    # Act
+    removed = repo.collect_garbage()
+
+    # Assert
+    assert removed == 1
+    assert repo.get_blob_refcount(staged.sha256) == 0
+
+@pytest.mark.unit
+def test_sharded_layout_writes_and_resolves_both_layouts(tmp_path):
+    """Checks sharded writes and that get_file_path still finds flat files."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    repo = FileRepository(upload_dir=str(upload_dir), shard_depth=2)
+    sharded_id = uuid.UUID("abcdef00-0000-4000-8000-000000000000")
+    flat_id = uuid.uuid4()
+    (upload_dir / f"{flat_id}.txt").write_text("flat")
+
+    # Act
+    repo.write_file(sharded_id, ".txt", b"sharded")
+
+    # Assert
+    assert repo.get_file_path(sharded_id, "a.txt") == str(upload_dir / "ab" / "cd" / f"{sharded_id}.txt")
+    assert repo.get_file_path(flat_id, "b.txt") == str(upload_dir / f"{flat_id}.txt")
+
+@pytest.mark.unit
+def test_migrate_to_shards_moves_files_in_batches(tmp_path):
+    """Verifies the migrator moves every flat upload and leaves other files alone."""
+
+    # Arrange
+    upload_dir = tmp_path / "uploads"
+    repo = FileRepository(upload_dir=str(upload_dir), shard_depth=2)
+    file_ids = [uuid.uuid4() for _ in range(5)]
+    for file_id in file_ids:
+        (upload_dir / f"{file_id}.pdf").write_bytes(file_id.bytes)
+    (upload_dir / "notes.txt").write_text("not an upload")
+
+    # Act
+    batches = list(repo.migrate_to_shards(batch_size=2, grace_seconds=0))
+
+    # Assert
+    assert batches == [2, 2, 1]
+    for file_id in file_ids:
+        path = repo.get_file_path(file_id, "x.pdf")
+        assert path.startswith(str(upload_dir / file_id.hex[:2] / file_id.hex[2:4]))
+        assert open(path, "rb").read() == file_id.bytes
+        assert not (upload_dir / f"{file_id}.pdf").exists()
+    assert (upload_dir / "notes.txt").exists()
+
+@pytest.mark.unit
+def test_write_temp_file_compresses_only_compressible_content(tmp_path):
+    """Ensures compressible uploads are gzipped while compressed formats and incompressible data are kept as-is."""
+
+    # Arrange
+    repo = FileRepository(upload_dir=str(tmp_path), compress=True)
+    text = b"student_id,grade\n" + b"12345,A\n" * 2000
+    png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 4096
+    noise = os.urandom(4096)
+
+    # Act
+    staged_text = repo.write_temp_file([text])
+    staged_png = repo.write_temp_file([png])
+    staged_noise = repo.write_temp_file([noise])
+    file_id = uuid.uuid4()
+    repo.commit_temp_file(staged_text.path, file_id, ".csv", content_encoding=staged_text.content_encoding)
+
+    # Assert
+    assert staged_text.content_encoding == "gzip"
+    assert staged_text.size == len(text)
+    assert staged_text.sha256 == hashlib.sha256(text).hexdigest()
+    assert staged_text.stored_size < len(text) // 10
+    stored_path = repo.get_file_path(file_id, "grades.csv", "gzip")
+    assert stored_path.endswith(f"{file_id}.csv.gz")
+    assert gzip.decompress(open(stored_path, "rb").read()) == text
+    assert staged_png.content_encoding is None
+    assert staged_noise.content_encoding is None
+    assert open(staged_noise.path, "rb").read() == noise
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(staged_png.path), os.path.basename(staged_noise.path), f"{file_id}.csv.gz"])
@@ -1,8 +1,11 @@
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, call
 from app.services.file_service import FileService
+from app.repositories.file_repository import StagedFile
 import app.exceptions as ex
 import uuid
+import json
+import gzip
 
 @pytest.mark.unit
 def test_save_uploaded_file_success(monkeypatch):
@@ -28,6 +31,75 @@ def test_save_uploaded_file_success(monkeypatch):
     metadata_repo.add_metadata.assert_called_once_with(filename, len(content))
     file_repo.write_file.assert_called_once_with(fake_file_id, ".txt", content)
 
+@pytest.mark.unit
+def test_save_uploaded_stream_success():
+    """Ensures a streamed upload is written to a temp file and committed before its metadata is added."""
+
+    # Arrange
+    file_repo = MagicMock()
+    metadata_repo = MagicMock()
+    service = FileService(file_repo, metadata_repo, max_size_mb=5)
+
+    calls = MagicMock()
+    calls.attach_mock(file_repo.commit_temp_file, "commit_temp_file")
+    calls.attach_mock(metadata_repo.add_metadata, "add_metadata")
+    file_repo.get_file_extension.return_value = ".txt"
+    file_repo.write_temp_file.side_effect = lambda chunks: StagedFile("/uploads/tmp.part", len(b"".join(chunks)), "abc")
+
+    # Act
+    result = service.save_uploaded_stream("test.txt", iter([b"hello ", b"world"]))
+
+    # Assert
+    assert calls.mock_calls == [
+        call.commit_temp_file("/uploads/tmp.part", result, ".txt", sha256="abc", content_encoding=None),
+        call.add_metadata("test.txt", 11, sha256="abc", content_encoding=None, stored_size=None, jobs=None, file_id=result),
+    ]
+
+@pytest.mark.unit
+def test_save_uploaded_stream_removes_the_file_if_the_metadata_write_fails():
+    """Ensures a file moved into place is deleted again when its metadata cannot be added."""
+
+    # Arrange
+    file_repo = MagicMock()
+    metadata_repo = MagicMock()
+    service = FileService(file_repo, metadata_repo, max_size_mb=5)
+
+    file_repo.get_file_extension.return_value = ".txt"
+    file_repo.write_temp_file.side_effect = lambda chunks: StagedFile("/uploads/tmp.part", len(b"".join(chunks)), "abc")
+    metadata_repo.add_metadata.side_effect = OSError("disk full")
+
+    # Act
+    with pytest.raises(OSError):
+        service.save_uploaded_stream("test.txt", iter([b"hello"]))
+
+    # Assert
+    file_id = file_repo.commit_temp_file.call_args.args[1]
+    file_repo.delete_file.assert_called_once_with(file_id, "test.txt", "abc", None)
+
+@pytest.mark.unit
+def test_save_uploaded_stream_too_large_stops_early():
+    """Raises FileSizeExceededException before the remaining chunks are consumed."""
+
+    # Arrange
+    file_repo = MagicMock()
+    metadata_repo = MagicMock()
+    service = FileService(file_repo, metadata_repo, max_size_mb=1)
+
+    file_repo.get_file_extension.return_value = ".txt"
+    file_repo.write_temp_file.side_effect = lambda chunks: StagedFile("/uploads/tmp.part", len(b"".join(chunks)), "abc")
+    consumed = []
+
+    def chunks():
+        for i in range(4):
+            consumed.append(i)
+            yield b"x" * (512 * 1024)
+
+    # Act & Assert
+    with pytest.raises(ex.FileSizeExceededException):
+        service.save_uploaded_stream("bigfile.txt", chunks())
+    assert consumed == [0, 1, 2]
+    metadata_repo.add_metadata.assert_not_called()
+
 @pytest.mark.unit
 def test_save_uploaded_file_invalid_filename(monkeypatch):
     """Raises InvalidFilenameException for invalid filename."""
@@ -117,7 +189,7 @@ def test_fetch_downloadable_file_by_id_success():
 
     # Assert
     assert result == (path, filename)
-    file_repo.get_file_path.assert_called_once_with(file_id, filename)
+    file_repo.get_file_path.assert_called_once_with(file_id, filename, None)
     file_repo.file_exists.assert_called_once_with(path)
 
 @pytest.mark.unit
@@ -152,4 +224,48 @@ def test_fetch_downloadable_file_by_id_not_on_disk():
 
     # Act & Assert
     with pytest.raises(FileNotFoundError, match="disk"):
-        service.fetch_downloadable_file_by_id(file_id)
\ No newline at end of file
+        service.fetch_downloadable_file_by_id(file_id)
+
+@pytest.mark.unit
+def test_fetch_downloadable_entry_by_id_and_etag():
+    """Ensures the full metadata entry is returned and yields a strong ETag."""
+
+    # Arrange
+    file_repo = MagicMock()
+    metadata_repo = MagicMock()
+    service = FileService(file_repo, metadata_repo)
+
+    file_id = uuid.uuid4()
+    entry = {"file_id": str(file_id), "filename": "file.txt", "size_in_bytes": 42}
+    metadata_repo.get_metadata_by_id.return_value = entry
+    file_repo.get_file_path.return_value = "/uploads/file.txt"
+    file_repo.file_exists.return_value = True
+
+    # Act
+    path, result = service.fetch_downloadable_entry_by_id(file_id)
+
+    # Assert
+    assert (path, result) == ("/uploads/file.txt", entry)
+    assert service.get_etag(entry) == f'"{file_id}-42"'
+
+@pytest.mark.unit
+def test_render_listing_is_cached_per_etag():
+    """Ensures a listing is serialised once per ETag and served from the cache afterwards."""
+
+    # Arrange
+    file_repo = MagicMock()
+    metadata_repo = MagicMock()
+    service = FileService(file_repo, metadata_repo)
+    metadata_repo.list_metadata.return_value = ([{"file_id": "1", "filename": "é.txt"}], None)
+
+    # Act
+    first = service.render_listing('"v1"', limit=None)
+    second = service.render_listing('"v1"', limit=None)
+    uncached = service.render_listing(None, limit=None)
+
+    # Assert
+    assert first is second
+    assert json.loads(first.body) == {"files": [{"file_id": "1", "filename": "é.txt"}], "next_cursor": None}
+    assert gzip.decompress(first.gzipped()) == first.body
+    assert uncached is not first
+    assert metadata_repo.list_metadata.call_count == 2
@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import pytest
+from fastapi import HTTPException
+from app.repositories.job_repository import JobRepository
+
+@pytest.mark.unit
+def test_claim_returns_oldest_pending_jobs_once(tmp_path):
+    """Ensures claimed jobs are marked running and are not handed out again."""
+
+    # Arrange
+    repo = JobRepository(database_file=str(tmp_path / "jobs.db"))
+    first = repo.enqueue("compress", {"file_id": "1"})
+    second = repo.enqueue("compress", {"file_id": "2"})
+
+    # Act
+    claimed = repo.claim(1)
+    claimed_again = repo.claim(5)
+
+    # Assert
+    assert [job["job_id"] for job in claimed] == [first]
+    assert claimed[0]["payload"] == {"file_id": "1"}
+    assert [job["job_id"] for job in claimed_again] == [second]
+    assert repo.claim(5) == []
+    assert repo.get_job(first)["status"] == JobRepository.RUNNING
+    repo.close()
+
+@pytest.mark.unit
+def test_complete_and_fail_record_the_outcome(tmp_path):
+    """Verifies finished jobs keep their status and error."""
+
+    # Arrange
+    repo = JobRepository(database_file=str(tmp_path / "jobs.db"))
+    done = repo.enqueue("compress", {})
+    failed = repo.enqueue("compress", {})
+    repo.claim(2)
+
+    # Act
+    repo.complete(done)
+    repo.fail(failed, "OSError: disk full")
+
+    # Assert
+    assert repo.get_job(done)["status"] == JobRepository.DONE
+    assert repo.get_job(failed)["status"] == JobRepository.FAILED
+    assert repo.get_job(failed)["error"] == "OSError: disk full"
+    repo.close()
+
+@pytest.mark.unit
+def test_requeue_abandoned_only_touches_jobs_of_dead_processes(tmp_path):
+    """Ensures running jobs go back to pending when their process is gone, and only then."""
+
+    # Arrange
+    repo = JobRepository(database_file=str(tmp_path / "jobs.db"))
+    job_id = repo.enqueue("compress", {})
+    repo.claim(1)
+    with repo._transaction() as conn:
+        # Pretend another, still running, worker claimed it
+        conn.execute("UPDATE jobs SET claimed_by = ?", (os.getppid(),))
+
+    # Act
+    kept = repo.requeue_abandoned(lambda pid: True)
+    requeued = repo.requeue_abandoned(lambda pid: False)
+
+    # Assert
+    assert kept == 0
+    assert requeued == 1
+    assert repo.get_job(job_id)["status"] == JobRepository.PENDING
+    repo.close()
+
+@pytest.mark.unit
+def test_enqueue_sets_the_wakeup_event(tmp_path):
+    """Verifies a dispatcher in the same process is woken up by new jobs."""
+
+    # Arrange
+    repo = JobRepository(database_file=str(tmp_path / "jobs.db"))
+    repo.wakeup_event().clear()
+
+    # Act
+    repo.enqueue("compress", {})
+
+    # Assert
+    assert repo.wakeup_event().is_set()
+    repo.close()
+
+@pytest.mark.unit
+def test_active_file_ids_skips_finished_jobs_and_other_kinds(tmp_path):
+    """Ensures only pending and running jobs of the given kind are reported."""
+
+    # Arrange
+    repo = JobRepository(database_file=str(tmp_path / "jobs.db"))
+    repo.enqueue("compress", {"file_id": "running"})
+    repo.claim(1)
+    repo.enqueue("compress", {"file_id": "pending"})
+    finished = repo.enqueue("compress", {"file_id": "done"})
+    repo.enqueue("thumbnail", {"file_id": "other"})
+    repo.complete(finished)
+
+    # Act
+    active = repo.active_file_ids("compress")
+
+    # Assert
+    assert active == {"running", "pending"}
+    repo.close()
+
+@pytest.mark.unit
+def test_enqueue_while_another_process_holds_the_write_lock_answers_503(tmp_path, monkeypatch):
+    """Ensures a busy jobs database surfaces as 503 with Retry-After on the upload path, and the job can be enqueued after."""
+
+    # Arrange
+    monkeypatch.setattr(JobRepository, "BUSY_TIMEOUT_MS", 50)
+    repo = JobRepository(database_file=str(tmp_path / "jobs.db"))
+    other = sqlite3.connect(tmp_path / "jobs.db", isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    # Act
+    with pytest.raises(HTTPException) as busy:
+        repo.enqueue("compress", {"file_id": "1"})
+    other.execute("ROLLBACK")
+    other.close()
+    job_id = repo.enqueue("compress", {"file_id": "1"})
+
+    # Assert
+    assert busy.value.status_code == 503
+    assert busy.value.headers["Retry-After"] == "1"
+    assert repo.get_job(job_id)["status"] == JobRepository.PENDING
+    repo.close()
@@ -0,0 +1,132 @@
+import json
+import uuid
+import pytest
+from app.repositories.journal_metadata_repository import JournalMetadataRepository
+
+@pytest.mark.unit
+def test_add_metadata_appends_to_journal_only(tmp_path):
+    """Ensures add_metadata appends a JSON line and leaves the snapshot untouched."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    repo = JournalMetadataRepository(metadata_file=str(metadata_file))
+
+    # Act
+    file_id = repo.add_metadata("test.txt", 1024)
+
+    # Assert
+    assert json.loads(metadata_file.read_text()) == []
+    lines = (tmp_path / "metadata.json.journal").read_text().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["file_id"] == str(file_id)
+    assert repo.get_metadata_by_id(file_id)["filename"] == "test.txt"
+
+@pytest.mark.unit
+def test_add_metadata_batch_appends_all_entries(tmp_path):
+    """Verifies add_metadata_batch appends one journal line per file and returns their ids in order."""
+
+    # Arrange
+    repo = JournalMetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+
+    # Act
+    file_ids = repo.add_metadata_batch([
+        {"filename": "a.pdf", "file_size": 1},
+        {"filename": "b.pdf", "file_size": 2, "sha256": "ab" * 32},
+    ])
+
+    # Assert
+    lines = (tmp_path / "metadata.json.journal").read_text().splitlines()
+    assert [json.loads(line)["file_id"] for line in lines] == [str(file_id) for file_id in file_ids]
+    assert repo.get_metadata_by_id(file_ids[1])["sha256"] == "ab" * 32
+
+@pytest.mark.unit
+def test_read_metadata_replays_snapshot_and_journal(tmp_path):
+    """Verifies that readers see snapshot entries followed by journal entries."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    repo = JournalMetadataRepository(metadata_file=str(metadata_file))
+    snapshot_entry = {"file_id": str(uuid.uuid4()), "filename": "a.txt", "upload_timestamp": "now", "size_in_bytes": 1}
+    repo.write_metadata([snapshot_entry])
+
+    # Act
+    file_id = repo.add_metadata("b.txt", 2)
+    result = repo.read_metadata()
+
+    # Assert
+    assert [entry["file_id"] for entry in result] == [snapshot_entry["file_id"], str(file_id)]
+
+@pytest.mark.unit
+def test_compact_folds_journal_into_snapshot(tmp_path):
+    """Ensures compaction writes all entries to the snapshot and empties the journal."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    repo = JournalMetadataRepository(metadata_file=str(metadata_file), compact_max_entries=100)
+    ids = [str(repo.add_metadata(f"file{i}.txt", i)) for i in range(3)]
+
+    # Act
+    folded = repo.compact()
+
+    # Assert
+    assert folded == 3
+    assert [entry["file_id"] for entry in json.loads(metadata_file.read_text())] == ids
+    assert (tmp_path / "metadata.json.journal").read_bytes() == b""
+    assert [entry["file_id"] for entry in repo.read_metadata()] == ids
+
+@pytest.mark.unit
+def test_replay_ignores_interrupted_compaction_and_torn_append(tmp_path):
+    """Verifies that duplicated entries and a torn final line do not leak into reads."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    journal_file = tmp_path / "metadata.json.journal"
+    repo = JournalMetadataRepository(metadata_file=str(metadata_file))
+    entry = {"file_id": str(uuid.uuid4()), "filename": "a.txt", "upload_timestamp": "now", "size_in_bytes": 1}
+    metadata_file.write_text(json.dumps([entry]))
+    journal_file.write_text(json.dumps(entry) + "\n" + '{"file_id": "tor')
+
+    # Act
+    before = repo.read_metadata()
+    file_id = repo.add_metadata("b.txt", 2)
+    after = repo.read_metadata()
+
+    # Assert
+    assert before == [entry]
+    assert [e["file_id"] for e in after] == [entry["file_id"], str(file_id)]
+
+@pytest.mark.unit
+def test_background_compaction_triggers_on_entry_threshold(tmp_path):
+    """Ensures reaching the entry threshold compacts the journal in the background."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    repo = JournalMetadataRepository(metadata_file=str(metadata_file), compact_max_entries=2)
+
+    # Act
+    repo.add_metadata("a.txt", 1)
+    repo.add_metadata("b.txt", 2)
+    repo.close()
+
+    # Assert
+    assert len(json.loads(metadata_file.read_text())) == 2
+    assert len(repo.read_metadata()) == 2
+
+@pytest.mark.unit
+def test_update_metadata_is_journaled_and_survives_compaction(tmp_path):
+    """Verifies update records are applied on read and folded into the snapshot by compaction."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    repo = JournalMetadataRepository(metadata_file=str(metadata_file))
+    file_id = repo.add_metadata("a.txt", 1, jobs={"compress": "pending"})
+
+    # Act
+    repo.update_metadata(file_id, {"jobs": {"compress": "done"}})
+    before_compaction = repo.get_metadata_by_id(file_id)
+    repo.compact()
+
+    # Assert
+    assert before_compaction["jobs"] == {"compress": "done"}
+    assert json.loads(metadata_file.read_text())[0]["jobs"] == {"compress": "done"}
+    assert len(repo.read_metadata()) == 1
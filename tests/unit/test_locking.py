@@ -0,0 +1,75 @@
+import pytest
+from filelock import FileLock
+from fastapi import HTTPException
+from app.repositories.locking import InstrumentedLock, LockTimeout, lock_stats
+from app.repositories.metadata_repository import MetadataRepository
+
+@pytest.mark.unit
+def test_instrumented_lock_records_acquisitions(tmp_path):
+    """Ensures hold times and acquisitions are recorded per lock file."""
+
+    # Arrange
+    lock_file = str(tmp_path / "metadata.json.lock")
+
+    # Act
+    with InstrumentedLock(lock_file, name="metadata"):
+        pass
+    with InstrumentedLock(lock_file, name="metadata"):
+        pass
+
+    # Assert
+    stats = lock_stats(lock_file)
+    assert stats["acquisitions"] == 2
+    assert stats["waiters"] == 0
+    assert stats["timeouts"] == 0
+
+@pytest.mark.unit
+def test_instrumented_lock_times_out_with_retry_after(tmp_path):
+    """Verifies a held lock makes the next caller give up with a Retry-After estimate."""
+
+    # Arrange
+    lock_file = str(tmp_path / "metadata.json.lock")
+    lock = InstrumentedLock(lock_file, name="metadata", timeout=0.05, poll_interval=0.01)
+
+    # Act
+    with FileLock(lock_file):
+        with pytest.raises(LockTimeout) as exc_info:
+            lock.acquire()
+
+    # Assert
+    assert exc_info.value.retry_after >= 1
+    assert lock_stats(lock_file)["timeouts"] == 1
+    assert lock_stats(lock_file)["waiters"] == 0
+
+@pytest.mark.unit
+def test_metadata_read_does_not_wait_for_the_lock(tmp_path):
+    """Ensures readers are served while a writer holds the metadata lock."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    repo = MetadataRepository(metadata_file=str(metadata_file), lock_timeout=0.05)
+    repo.write_metadata([{"file_id": "1", "filename": "a.txt", "upload_timestamp": "now", "size_in_bytes": 1}])
+
+    # Act
+    with FileLock(f"{metadata_file}.lock"):
+        result = repo.read_metadata()
+
+    # Assert
+    assert [entry["file_id"] for entry in result] == ["1"]
+
+@pytest.mark.unit
+def test_metadata_write_timeout_returns_503_with_retry_after(tmp_path):
+    """Verifies a write that cannot take the lock is answered with 503 and Retry-After."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    repo = MetadataRepository(metadata_file=str(metadata_file), lock_timeout=0.05, lock_poll_interval=0.01)
+
+    # Act
+    with FileLock(f"{metadata_file}.lock"):
+        with pytest.raises(HTTPException) as exc_info:
+            repo.write_metadata([])
+
+    # Assert
+    assert exc_info.value.status_code == 503
+    assert int(exc_info.value.headers["Retry-After"]) >= 1
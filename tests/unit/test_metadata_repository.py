@@ -1,8 +1,13 @@
 import json
 import uuid
+import time
+import threading
 from datetime import datetime
 import pytest
-from app.repositories.metadata_repository import MetadataRepository
+from fastapi import HTTPException
+from app.repositories.metadata_repository import GroupCommitQueue, MetadataRepository
+from app.repositories.version_counter import SharedVersionCounter
+from app.exceptions import GroupCommitFailedException, InvalidCursorException
 
 @pytest.mark.unit
 def test_initializes_metadata_file(tmp_path):
@@ -109,4 +114,297 @@ def test_get_metadata_by_id_returns_none_for_missing_id(tmp_path):
 
     # Act & Assert
     with pytest.raises(ValueError):
-        repo.get_metadata_by_id(uuid.uuid4())
\ No newline at end of file
+        repo.get_metadata_by_id(uuid.uuid4())
+
+@pytest.mark.unit
+def test_read_metadata_is_served_from_cache_when_unchanged(tmp_path, monkeypatch):
+    """Ensures unchanged metadata is served without taking the lock or parsing JSON."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    repo = MetadataRepository(metadata_file=str(metadata_file))
+    repo.write_metadata([{"file_id": "1", "filename": "a.txt", "upload_timestamp": "now", "size_in_bytes": 1}])
+    repo.read_metadata()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("metadata was re-read")
+
+    monkeypatch.setattr("app.repositories.metadata_repository.InstrumentedLock", fail)
+    monkeypatch.setattr(json, "load", fail)
+
+    # Act
+    result = repo.read_metadata()
+
+    # Assert
+    assert result[0]["file_id"] == "1"
+    assert repo.cache_stats()["hits"] == 1
+    assert repo.cache_stats()["misses"] == 1
+
+@pytest.mark.unit
+def test_cache_is_shared_and_revalidated_after_another_worker_writes(tmp_path):
+    """Verifies instances share the cache and pick up writes another worker announces on the version counter."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    first = MetadataRepository(metadata_file=str(metadata_file))
+    second = MetadataRepository(metadata_file=str(metadata_file))
+    known_id = uuid.uuid4()
+    first.read_metadata()
+    version = first.metadata_version()
+
+    # Act: simulate another worker, with its own mapping of the counter, rewriting the file
+    metadata_file.write_text(json.dumps([
+        {"file_id": str(known_id), "filename": "a.txt", "upload_timestamp": "now", "size_in_bytes": 1}
+    ]))
+    other_worker = SharedVersionCounter(f"{metadata_file}.version")
+    other_worker.bump()
+    entry = second.get_metadata_by_id(known_id)
+
+    # Assert
+    assert entry["filename"] == "a.txt"
+    assert first.cache_stats() == second.cache_stats()
+    assert second.cache_stats()["misses"] == 2
+    assert first.metadata_version() != version
+    assert first.metadata_version() == other_worker.token()
+
+@pytest.mark.unit
+def test_rewrites_in_quick_succession_are_never_served_stale(tmp_path):
+    """Ensures same-size rewrites within one filesystem timestamp tick are each seen, and cached afterwards."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    repo = MetadataRepository(metadata_file=str(metadata_file))
+    filenames = []
+
+    # Act
+    for name in ("a.txt", "b.txt", "c.txt"):
+        repo.write_metadata([{"file_id": "1", "filename": name, "upload_timestamp": "now", "size_in_bytes": 1}])
+        filenames.append(repo.read_metadata()[0]["filename"])
+    repo.read_metadata()
+
+    # Assert
+    assert filenames == ["a.txt", "b.txt", "c.txt"]
+    assert repo.cache_stats()["hits"] == 1
+
+@pytest.mark.unit
+def test_list_metadata_paginates_with_cursor(tmp_path):
+    """Verifies that cursors walk every entry exactly once in sort order."""
+
+    # Arrange
+    repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    entries = [
+        {"file_id": str(uuid.uuid4()), "filename": f"file{i}.txt", "upload_timestamp": f"2025-10-0{i}T10:00:00", "size_in_bytes": 10 - i}
+        for i in range(1, 6)
+    ]
+    repo.write_metadata(entries)
+
+    # Act
+    first, cursor = repo.list_metadata(limit=2, sort="size_in_bytes")
+    second, cursor = repo.list_metadata(limit=2, cursor=cursor, sort="size_in_bytes")
+    third, last_cursor = repo.list_metadata(limit=2, cursor=cursor, sort="size_in_bytes")
+
+    # Assert
+    assert [e["size_in_bytes"] for e in first + second + third] == [5, 6, 7, 8, 9]
+    assert last_cursor is None
+
+@pytest.mark.unit
+def test_list_metadata_descending_with_filters(tmp_path):
+    """Ensures descending order, filename prefix and date range filters combine."""
+
+    # Arrange
+    repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    repo.write_metadata([
+        {"file_id": "1", "filename": "Lab1.pdf", "upload_timestamp": "2025-10-01T10:00:00", "size_in_bytes": 1},
+        {"file_id": "2", "filename": "lab2.pdf", "upload_timestamp": "2025-10-02T10:00:00", "size_in_bytes": 2},
+        {"file_id": "3", "filename": "notes.pdf", "upload_timestamp": "2025-10-03T10:00:00", "size_in_bytes": 3},
+        {"file_id": "4", "filename": "lab3.pdf", "upload_timestamp": "2025-10-04T10:00:00", "size_in_bytes": 4},
+    ])
+
+    # Act
+    page, cursor = repo.list_metadata(
+        limit=1,
+        descending=True,
+        filename_prefix="LAB",
+        uploaded_before="2025-10-03T23:59:59",
+    )
+    rest, last_cursor = repo.list_metadata(
+        cursor=cursor,
+        descending=True,
+        filename_prefix="LAB",
+        uploaded_before="2025-10-03T23:59:59",
+    )
+
+    # Assert
+    assert [e["file_id"] for e in page] == ["2"]
+    assert [e["file_id"] for e in rest] == ["1"]
+    assert last_cursor is None
+
+@pytest.mark.unit
+def test_list_metadata_rejects_cursor_for_other_sort(tmp_path):
+    """Raises InvalidCursorException when a cursor is reused with another sort order."""
+
+    # Arrange
+    repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    repo.write_metadata([
+        {"file_id": str(i), "filename": f"{i}.txt", "upload_timestamp": "now", "size_in_bytes": i} for i in range(3)
+    ])
+    _, cursor = repo.list_metadata(limit=1, sort="filename")
+
+    # Act & Assert
+    with pytest.raises(InvalidCursorException):
+        repo.list_metadata(limit=1, cursor=cursor, sort="size_in_bytes")
+    with pytest.raises(InvalidCursorException):
+        repo.list_metadata(limit=1, cursor="not-a-cursor")
+
+@pytest.mark.unit
+def test_concurrent_add_metadata_is_group_committed(tmp_path, monkeypatch):
+    """Ensures concurrent add_metadata calls share metadata writes and each get their own file_id."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    repo = MetadataRepository(metadata_file=str(metadata_file), group_commit_window=0.05)
+    writes = []
+    original_write_file = repo._write_file
+    monkeypatch.setattr(repo, "_write_file", lambda metadata: (writes.append(len(metadata)), original_write_file(metadata)))
+    file_ids = []
+
+    # Act
+    threads = [threading.Thread(target=lambda i=i: file_ids.append(repo.add_metadata(f"f{i}.txt", i))) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    stored = json.loads(metadata_file.read_text())
+    assert len(set(file_ids)) == 20
+    assert {entry["file_id"] for entry in stored} == {str(file_id) for file_id in file_ids}
+    assert len(writes) < 20
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+
+@pytest.mark.unit
+def test_group_commit_failure_reaches_every_caller(tmp_path, monkeypatch):
+    """Ensures a failed batch write is reported to each caller and leaves the file intact."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    repo = MetadataRepository(metadata_file=str(metadata_file), group_commit_window=0.05)
+    def fail(metadata):
+        raise OSError("disk full")
+    monkeypatch.setattr(repo, "_write_file", fail)
+    errors = []
+
+    def add(i):
+        try:
+            repo.add_metadata(f"f{i}.txt", i)
+        except HTTPException as e:
+            errors.append(e.status_code)
+
+    # Act
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    assert errors == [500] * 5
+    assert json.loads(metadata_file.read_text()) == []
+
+@pytest.mark.unit
+def test_interrupted_group_commit_is_not_reported_as_success():
+    """Ensures followers of a leader interrupted mid-commit get their own error instead of returning normally."""
+
+    # Arrange
+    queue = GroupCommitQueue()
+    outcomes = {}
+
+    def commit(entries):
+        raise KeyboardInterrupt()
+
+    def submit(name):
+        try:
+            queue.submit([name], commit, window_seconds=0.2)
+            outcomes[name] = "committed"
+        except BaseException as e:
+            outcomes[name] = e
+
+    leader = threading.Thread(target=submit, args=("leader",))
+    followers = [threading.Thread(target=submit, args=(f"follower{i}",)) for i in range(2)]
+
+    # Act
+    leader.start()
+    while not queue.leader_active:
+        time.sleep(0.001)
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    # Assert
+    assert isinstance(outcomes["leader"], KeyboardInterrupt)
+    for name in ("follower0", "follower1"):
+        assert isinstance(outcomes[name], GroupCommitFailedException)
+        assert outcomes[name].__cause__ is outcomes["leader"]
+    assert outcomes["follower0"] is not outcomes["follower1"]
+    assert queue.pending == [] and not queue.leader_active
+
+@pytest.mark.unit
+def test_update_metadata_merges_changes(tmp_path):
+    """Ensures update_metadata changes one entry in place and keeps the others."""
+
+    # Arrange
+    repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    first = repo.add_metadata("a.txt", 1)
+    second = repo.add_metadata("b.txt", 2, jobs={"compress": "pending"})
+
+    # Act
+    updated = repo.update_metadata(second, {"jobs": {"compress": "done"}, "content_encoding": "gzip"})
+
+    # Assert
+    assert updated["content_encoding"] == "gzip"
+    assert [entry["file_id"] for entry in repo.read_metadata()] == [str(first), str(second)]
+    assert repo.get_metadata_by_id(second)["jobs"] == {"compress": "done"}
+    with pytest.raises(ValueError):
+        repo.update_metadata(uuid.uuid4(), {})
+
+@pytest.mark.unit
+def test_search_metadata_indexes_new_entries_incrementally(tmp_path):
+    """Ensures entries added after a search are found, and write_metadata rebuilds the index."""
+
+    # Arrange
+    repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    first = repo.add_metadata("week7_lab.pdf", 1)
+    repo.search_metadata("lab")
+
+    # Act
+    second = repo.add_metadata("lab_manual.pdf", 2)
+    after_add = repo.search_metadata("lab")
+    repo.write_metadata([{"file_id": "1", "filename": "syllabus.pdf", "upload_timestamp": "now", "size_in_bytes": 1}])
+    after_rewrite = repo.search_metadata("lab")
+
+    # Assert
+    assert [entry["file_id"] for entry in after_add] == [str(first), str(second)]
+    assert [entry["file_id"] for entry in after_rewrite] == ["1"]
+
+@pytest.mark.unit
+def test_search_metadata_with_entries_older_than_the_index_does_not_rebuild(tmp_path, monkeypatch):
+    """Ensures a search that loaded entries before a concurrent upload synced the index leaves the index alone."""
+
+    # Arrange
+    repo = MetadataRepository(metadata_file=str(tmp_path / "metadata.json"))
+    first = repo.add_metadata("week7_lab.pdf", 1)
+    stale = repo._load()
+    second = repo.add_metadata("lab_manual.pdf", 2)
+    position = repo._search_index.position
+    monkeypatch.setattr(repo, "_load", lambda: stale)
+
+    # Act
+    result = repo.search_metadata("lab")
+
+    # Assert
+    assert [entry["file_id"] for entry in result] == [str(first)]
+    assert repo._search_index.position == position
+    assert len(repo._search_index) == 2
+    monkeypatch.undo()
+    assert [entry["file_id"] for entry in repo.search_metadata("lab")] == [str(first), str(second)]
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from app import metrics
+from app.metrics import MetricsMiddleware, MetricsRegistry
+
+@pytest.mark.unit
+def test_render_histogram_and_counters():
+    """Ensures histograms are cumulative and samples use the text exposition format."""
+
+    # Arrange
+    registry = MetricsRegistry()
+    labels = (("method", "GET"), ("route", "/files/"))
+
+    # Act
+    registry.observe("classdrop_http_request_duration_seconds", labels, 0.003)
+    registry.observe("classdrop_http_request_duration_seconds", labels, 0.2)
+    registry.observe("classdrop_http_request_duration_seconds", labels, 30)
+    registry.inc("classdrop_errors_total", (("exception", 'Odd"Name'),))
+    text = registry.render()
+
+    # Assert
+    assert "# TYPE classdrop_http_request_duration_seconds histogram" in text
+    assert 'classdrop_http_request_duration_seconds_bucket{method="GET",route="/files/",le="0.005"} 1' in text
+    assert 'classdrop_http_request_duration_seconds_bucket{method="GET",route="/files/",le="0.25"} 2' in text
+    assert 'classdrop_http_request_duration_seconds_bucket{method="GET",route="/files/",le="10.0"} 2' in text
+    assert 'classdrop_http_request_duration_seconds_bucket{method="GET",route="/files/",le="+Inf"} 3' in text
+    assert 'classdrop_http_request_duration_seconds_count{method="GET",route="/files/"} 3' in text
+    assert 'classdrop_errors_total{exception="Odd\\"Name"} 1' in text
+
+@pytest.mark.unit
+def test_collect_sums_workers_and_drops_gauges_of_dead_workers(tmp_path):
+    """Ensures counters from every worker file are summed, while dead workers' gauges are ignored."""
+
+    # Arrange
+    registry = MetricsRegistry(directory=str(tmp_path))
+    labels = (("method", "POST"), ("route", "/files/"))
+    registry.inc("classdrop_http_request_body_bytes_total", labels, 100)
+    registry.inc("classdrop_http_requests_in_flight", labels, 1)
+    other = MetricsRegistry(directory=str(tmp_path))
+    other.file_name = "other.json"
+    other.inc("classdrop_http_request_body_bytes_total", labels, 50)
+    other.inc("classdrop_http_requests_in_flight", labels, 2)
+    other.flush(force=True)
+    dead = json.loads((tmp_path / "other.json").read_text())
+    dead["pid"] = 2 ** 22 + 1  # Above the default pid_max, so never a live process
+    (tmp_path / "dead.json").write_text(json.dumps(dead))
+
+    # Act
+    values, _ = registry.collect()
+
+    # Assert
+    assert values[("classdrop_http_request_body_bytes_total", labels)] == 200
+    assert values[("classdrop_http_requests_in_flight", labels)] == 3
+    assert sorted(os.listdir(tmp_path)) == ["dead.json", "other.json"]
+
+@pytest.mark.unit
+def test_middleware_flushes_off_the_event_loop(tmp_path, monkeypatch):
+    """Ensures the periodic write of the worker's metrics file runs on the I/O pool, not the event loop."""
+
+    # Arrange
+    registry = MetricsRegistry(directory=str(tmp_path))
+    monkeypatch.setattr(metrics, "_registry", registry)
+    flush_threads = []
+    original_flush = registry.flush
+
+    def recording_flush(force: bool = False):
+        flush_threads.append(threading.get_ident())
+        original_flush(force)
+
+    monkeypatch.setattr(registry, "flush", recording_flush)
+    routes = [Route("/ping", lambda request: PlainTextResponse("pong"))]
+    app = MetricsMiddleware(Starlette(routes=routes), routes)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/ping")
+            await client.get("/ping")
+        return threading.get_ident()
+
+    # Act
+    loop_thread = asyncio.run(scenario())
+
+    # Assert
+    assert len(flush_threads) == 1  # The second request came within FLUSH_INTERVAL
+    assert flush_threads[0] != loop_thread
+    assert os.listdir(tmp_path) == [registry.file_name]
+
+@pytest.mark.unit
+def test_flusher_keeps_an_idle_workers_file_current(tmp_path):
+    """Ensures the background flusher writes increments made after the last request without any further traffic."""
+
+    # Arrange
+    registry = MetricsRegistry(directory=str(tmp_path))
+    registry.FLUSH_INTERVAL = 0.01
+    labels = (("method", "GET"), ("route", "/files/"))
+    settled = ["classdrop_http_requests_in_flight", [list(pair) for pair in labels], 0]
+    registry.start_flusher()
+
+    # Act
+    registry.inc("classdrop_http_requests_in_flight", labels, 1)
+    registry.inc("classdrop_http_requests_in_flight", labels, -1)
+    deadline = time.monotonic() + 5
+    written = {}
+    while time.monotonic() < deadline:
+        try:
+            written = json.loads((tmp_path / registry.file_name).read_text())
+        except (OSError, ValueError):
+            pass
+        if settled in written.get("values", []):
+            break
+        time.sleep(0.01)
+    registry.stop_flusher()
+
+    # Assert
+    assert settled in written["values"]
+    assert registry.flusher is None
+
+@pytest.mark.unit
+def test_collect_ignores_gauges_of_an_older_worker_with_a_reused_pid(tmp_path):
+    """Ensures a file left by a dead worker whose pid now belongs to a running one contributes counters but no gauges."""
+
+    # Arrange
+    registry = MetricsRegistry(directory=str(tmp_path))
+    labels = (("method", "GET"), ("route", "/files/"))
+    stale = MetricsRegistry(directory=str(tmp_path))
+    stale.inc("classdrop_http_requests_in_flight", labels, 4)
+    stale.inc("classdrop_http_requests_total", labels, 10)
+    snapshot = stale.snapshot()
+    snapshot["started"] = registry.started - 1
+    (tmp_path / "old.json").write_text(json.dumps(snapshot))
+    registry.inc("classdrop_http_requests_in_flight", labels, 1)
+
+    # Act
+    values, _ = registry.collect()
+
+    # Assert
+    assert values[("classdrop_http_requests_in_flight", labels)] == 1
+    assert values[("classdrop_http_requests_total", labels)] == 10
@@ -0,0 +1,97 @@
+import random
+import pytest
+from app.repositories.search_index import TOKEN_PATTERN, FilenameIndex
+
+@pytest.fixture
+def index():
+    index = FilenameIndex()
+    for file_id, filename in [
+        ("1", "Week7_Lab.pdf"),
+        ("2", "week 7 slides.pptx"),
+        ("3", "Lab manual.pdf"),
+        ("4", "syllabus.pdf"),
+        ("5", "week12_collaboration.pdf"),
+    ]:
+        index.add(file_id, filename)
+    return index
+
+@pytest.mark.unit
+def test_search_matches_every_term_case_insensitively(index):
+    """Ensures all terms must match, regardless of case."""
+
+    # Act
+    result = index.search("WEEK 7", 10)
+
+    # Assert
+    assert sorted(result) == ["1", "2"]
+
+@pytest.mark.unit
+def test_search_ranks_whole_words_before_substrings(index):
+    """Verifies a whole-word match outranks a match inside a longer word."""
+
+    # Act
+    result = index.search("lab", 10)
+
+    # Assert
+    assert result[:2] == ["1", "3"]  # both have the word "lab"; the shorter name first
+    assert result[2:] == ["4", "5"]  # syllabus, collaboration
+
+@pytest.mark.unit
+def test_short_terms_match_word_starts_only(index):
+    """Ensures one- and two-character terms match the start of a word, not any substring."""
+
+    # Act
+    result = index.search("sy", 10)
+    inside_word = index.search("yl", 10)
+
+    # Assert
+    assert result == ["4"]
+    assert inside_word == []
+
+@pytest.mark.unit
+def test_search_without_match_or_terms_is_empty(index):
+    """Verifies queries with no match, or only whitespace, return nothing."""
+
+    # Act & Assert
+    assert index.search("exam", 10) == []
+    assert index.search("   ", 10) == []
+
+@pytest.mark.unit
+def test_search_stops_early_with_the_same_results_as_ranking_everything():
+    """Ensures the early-stopping search returns exactly the top results of a full ranking."""
+
+    # Arrange
+    rng = random.Random(7)
+    words = ["week", "weekly", "lab", "labs", "syllabus", "collab", "notes", "7", "12", "lab2", "pdf", "e", "exam"]
+    names = [
+        "_".join(rng.choice(words) for _ in range(rng.randint(1, 4))) + rng.choice([".pdf", ".txt", " v2.docx"])
+        for _ in range(500)
+    ]
+    index = FilenameIndex()
+    index.add_many([(str(i), name) for i, name in enumerate(names[:300])])
+    for i, name in enumerate(names[300:], start=300):
+        index.add(str(i), name)
+
+    def ranked_by_scanning(query: str, limit: int) -> list:
+        keys = []
+        for i, name in enumerate(names):
+            name = name.casefold()
+            words_of_name = f" {' '.join(TOKEN_PATTERN.findall(name))} "
+            score = 0
+            for term in query.split():
+                if f" {term} " in words_of_name:
+                    score += 3
+                elif f" {term}" in words_of_name:
+                    score += 2
+                elif len(term) >= 3 and term in name:
+                    score += 1
+                else:
+                    break
+            else:
+                keys.append((-score, len(name), -i, str(i)))
+        return [file_id for *_, file_id in sorted(keys)[:limit]]
+
+    # Act & Assert
+    for query in ["week 7", "lab", "pdf", "e", "la", "wee 12", "ab", "notes lab 7", "llab", "exam_", "b2", "s_7", "yll"]:
+        for limit in (1, 5, 20, 100):
+            assert index.search(query, limit) == ranked_by_scanning(query, limit), (query, limit)
@@ -0,0 +1,197 @@
+import json
+import uuid
+from datetime import datetime
+import pytest
+from app.repositories.sqlite_metadata_repository import SqliteMetadataRepository
+
+@pytest.mark.unit
+def test_initializes_database_in_wal_mode(tmp_path):
+    """Ensures the database is created with an empty table in WAL mode."""
+
+    # Arrange
+    database_file = tmp_path / "metadata.db"
+
+    # Act
+    repo = SqliteMetadataRepository(database_file=str(database_file))
+
+    # Assert
+    assert database_file.exists()
+    assert repo.read_metadata() == []
+    conn, _ = repo._connection_entry()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    repo.close()
+
+@pytest.mark.unit
+def test_write_and_read_metadata_preserves_order_and_extra_keys(tmp_path):
+    """Verifies that metadata round-trips in insertion order, including unknown keys."""
+
+    # Arrange
+    repo = SqliteMetadataRepository(database_file=str(tmp_path / "metadata.db"))
+    sample_metadata = [
+        {"file_id": str(uuid.uuid4()), "filename": "b.txt", "upload_timestamp": "2025-10-05T10:00:00", "size_in_bytes": 2},
+        {"file_id": str(uuid.uuid4()), "filename": "a.txt", "upload_timestamp": "2025-10-04T10:00:00", "size_in_bytes": 1, "note": "x"},
+    ]
+
+    # Act
+    repo.write_metadata(sample_metadata)
+    result = repo.read_metadata()
+
+    # Assert
+    assert result == sample_metadata
+    repo.close()
+
+@pytest.mark.unit
+def test_add_metadata_and_get_by_id(tmp_path, monkeypatch):
+    """Ensures add_metadata inserts an entry that can be fetched by its file_id."""
+
+    # Arrange
+    repo = SqliteMetadataRepository(database_file=str(tmp_path / "metadata.db"))
+    fake_uuid = uuid.uuid4()
+    monkeypatch.setattr(uuid, "uuid4", lambda: fake_uuid)
+
+    # Act
+    file_id = repo.add_metadata("test.txt", 1024)
+    entry = repo.get_metadata_by_id(file_id)
+
+    # Assert
+    assert file_id == fake_uuid
+    assert entry["file_id"] == str(fake_uuid)
+    assert entry["filename"] == "test.txt"
+    assert entry["size_in_bytes"] == 1024
+    datetime.fromisoformat(entry["upload_timestamp"])
+    repo.close()
+
+@pytest.mark.unit
+def test_add_metadata_batch_inserts_in_one_transaction(tmp_path):
+    """Ensures add_metadata_batch inserts every entry and bumps the version once."""
+
+    # Arrange
+    repo = SqliteMetadataRepository(database_file=str(tmp_path / "metadata.db"))
+    version = repo.metadata_version()
+
+    # Act
+    file_ids = repo.add_metadata_batch([
+        {"filename": "a.pdf", "file_size": 1},
+        {"filename": "b.pdf", "file_size": 2},
+    ])
+
+    # Assert
+    assert [repo.get_metadata_by_id(file_id)["filename"] for file_id in file_ids] == ["a.pdf", "b.pdf"]
+    assert int(repo.metadata_version().rsplit("-", 1)[-1]) == int(version.rsplit("-", 1)[-1]) + 1
+    repo.close()
+
+@pytest.mark.unit
+def test_get_metadata_by_id_raises_for_missing_id(tmp_path):
+    """Ensures get_metadata_by_id raises ValueError when no match found."""
+
+    # Arrange
+    repo = SqliteMetadataRepository(database_file=str(tmp_path / "metadata.db"))
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        repo.get_metadata_by_id(uuid.uuid4())
+    repo.close()
+
+@pytest.mark.unit
+def test_import_json_is_idempotent(tmp_path):
+    """Verifies that importing metadata.json twice does not duplicate entries."""
+
+    # Arrange
+    metadata_file = tmp_path / "metadata.json"
+    entries = [
+        {"file_id": str(uuid.uuid4()), "filename": f"file{i}.txt", "upload_timestamp": "2025-10-05T10:00:00", "size_in_bytes": i}
+        for i in range(3)
+    ]
+    metadata_file.write_text(json.dumps(entries))
+    repo = SqliteMetadataRepository(database_file=str(tmp_path / "metadata.db"))
+
+    # Act
+    first = repo.import_json(str(metadata_file))
+    second = repo.import_json(str(metadata_file))
+
+    # Assert
+    assert first == 3
+    assert second == 0
+    assert repo.read_metadata() == entries
+    repo.close()
+
+@pytest.mark.unit
+def test_list_metadata_uses_keyset_pagination(tmp_path):
+    """Verifies that SQLite pages match the in-memory ordering and filters."""
+
+    # Arrange
+    repo = SqliteMetadataRepository(database_file=str(tmp_path / "metadata.db"))
+    repo.write_metadata([
+        {"file_id": "1", "filename": "Lab1.pdf", "upload_timestamp": "2025-10-01T10:00:00", "size_in_bytes": 3},
+        {"file_id": "2", "filename": "lab2.pdf", "upload_timestamp": "2025-10-02T10:00:00", "size_in_bytes": 1},
+        {"file_id": "3", "filename": "notes_1.pdf", "upload_timestamp": "2025-10-03T10:00:00", "size_in_bytes": 2},
+        {"file_id": "4", "filename": "lab3.pdf", "upload_timestamp": "2025-10-04T10:00:00", "size_in_bytes": 1},
+    ])
+
+    # Act
+    first, cursor = repo.list_metadata(limit=2, sort="size_in_bytes")
+    second, last_cursor = repo.list_metadata(limit=2, cursor=cursor, sort="size_in_bytes")
+    labs, _ = repo.list_metadata(filename_prefix="LAB", uploaded_after="2025-10-02T00:00:00", descending=True)
+    underscore, _ = repo.list_metadata(filename_prefix="notes_")
+
+    # Assert
+    assert [e["file_id"] for e in first + second] == ["2", "4", "3", "1"]
+    assert last_cursor is None
+    assert [e["file_id"] for e in labs] == ["4", "2"]
+    assert [e["file_id"] for e in underscore] == ["3"]
+    repo.close()
+
+@pytest.mark.unit
+def test_metadata_version_changes_on_every_write(tmp_path):
+    """Ensures the version token changes after each write and is stable otherwise."""
+
+    # Arrange
+    repo = SqliteMetadataRepository(database_file=str(tmp_path / "metadata.db"))
+    initial = repo.metadata_version()
+
+    # Act
+    unchanged = repo.metadata_version()
+    repo.add_metadata("a.txt", 1, sha256="abc")
+    after_add = repo.metadata_version()
+
+    # Assert
+    assert unchanged == initial
+    assert after_add != initial
+    assert repo.read_metadata()[0]["sha256"] == "abc"
+    repo.close()
+
+@pytest.mark.unit
+def test_update_metadata_keeps_insertion_order(tmp_path):
+    """Ensures update_metadata merges changes into the extra column without reordering rows."""
+
+    # Arrange
+    repo = SqliteMetadataRepository(database_file=str(tmp_path / "metadata.db"))
+    first = repo.add_metadata("a.txt", 1)
+    repo.add_metadata("b.txt", 2)
+
+    # Act
+    repo.update_metadata(first, {"content_encoding": "gzip", "stored_size": 1})
+
+    # Assert
+    entries = repo.read_metadata()
+    assert [entry["filename"] for entry in entries] == ["a.txt", "b.txt"]
+    assert entries[0]["content_encoding"] == "gzip"
+    repo.close()
+
+@pytest.mark.unit
+def test_search_metadata_reads_only_new_rows(tmp_path):
+    """Verifies searches pick up rows added since the last search and return whole entries."""
+
+    # Arrange
+    repo = SqliteMetadataRepository(database_file=str(tmp_path / "metadata.db"))
+    repo.add_metadata("week 7 slides.pptx", 1)
+    repo.search_metadata("week")
+
+    # Act
+    file_id = repo.add_metadata("week 8 slides.pptx", 2, sha256="ab" * 32)
+    result = repo.search_metadata("week 8")
+
+    # Assert
+    assert [entry["file_id"] for entry in result] == [str(file_id)]
+    assert result[0]["sha256"] == "ab" * 32
+    repo.close()
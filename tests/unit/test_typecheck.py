@@ -0,0 +1,34 @@
+import pytest
+from typeguard import TypeCheckError
+from app import config
+from app.typecheck import typechecked
+
+def double(value: int) -> int:
+    return value * 2
+
+@pytest.mark.unit
+def test_typechecked_checks_arguments_when_enabled(monkeypatch):
+    """Ensures the decorator applies typeguard's checks with CLASSDROP_TYPECHECK on."""
+
+    # Arrange
+    monkeypatch.setattr(config, "TYPECHECK", True)
+
+    # Act
+    checked = typechecked(double)
+
+    # Assert
+    with pytest.raises(TypeCheckError):
+        checked("2")
+
+@pytest.mark.unit
+def test_typechecked_returns_function_unchanged_when_disabled(monkeypatch):
+    """Verifies the decorator is a no-op with CLASSDROP_TYPECHECK off."""
+
+    # Arrange
+    monkeypatch.setattr(config, "TYPECHECK", False)
+
+    # Act
+    unchecked = typechecked(double)
+
+    # Assert
+    assert unchecked is double
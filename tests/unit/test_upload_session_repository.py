@@ -0,0 +1,127 @@
+import os
+import time
+import uuid
+import pytest
+from app.repositories.upload_session_repository import UploadSessionRepository
+import app.exceptions as ex
+
+@pytest.mark.unit
+def test_chunks_arrive_out_of_order_and_assemble_in_order(tmp_path):
+    """Ensures chunks can be written in any order and are read back in index order."""
+
+    # Arrange
+    repo = UploadSessionRepository(staging_dir=str(tmp_path / ".staging"), chunk_size=4)
+    session = repo.create_session("video.mp4", 10)
+    session_id = uuid.UUID(session["session_id"])
+
+    # Act
+    repo.write_chunk(session_id, 2, [b"89"])
+    repo.write_chunk(session_id, 0, [b"01", b"23"])
+    received_before = repo.get_received_chunks(session_id)
+    repo.write_chunk(session_id, 1, [b"4567"])
+    repo.claim_session(session_id)
+    content = b"".join(repo.iter_claimed_chunks(session_id, repo.get_chunk_count(session)))
+
+    # Assert
+    assert repo.get_chunk_count(session) == 3
+    assert received_before == [0, 2]
+    assert content == b"0123456789"
+
+@pytest.mark.unit
+def test_write_chunk_rejects_wrong_length_and_index(tmp_path):
+    """Ensures chunks with the wrong length or index are rejected and not stored."""
+
+    # Arrange
+    repo = UploadSessionRepository(staging_dir=str(tmp_path / ".staging"), chunk_size=4)
+    session_id = uuid.UUID(repo.create_session("video.mp4", 10)["session_id"])
+
+    # Act / Assert
+    with pytest.raises(ex.InvalidUploadChunkException):
+        repo.write_chunk(session_id, 0, [b"012"])
+    with pytest.raises(ex.InvalidUploadChunkException):
+        repo.write_chunk(session_id, 2, [b"890"])
+    with pytest.raises(ex.InvalidUploadChunkException):
+        repo.write_chunk(session_id, 3, [b""])
+    assert repo.get_received_chunks(session_id) == []
+    assert [name for name in os.listdir(tmp_path / ".staging" / str(session_id)) if name.endswith(".part")] == []
+
+@pytest.mark.unit
+def test_claimed_session_cannot_be_claimed_twice(tmp_path):
+    """Ensures only one completion can take ownership of a session."""
+
+    # Arrange
+    repo = UploadSessionRepository(staging_dir=str(tmp_path / ".staging"), chunk_size=4)
+    session_id = uuid.UUID(repo.create_session("notes.txt", 0)["session_id"])
+
+    # Act
+    repo.claim_session(session_id)
+
+    # Assert
+    with pytest.raises(ex.UploadSessionNotFoundException):
+        repo.claim_session(session_id)
+
+@pytest.mark.unit
+def test_collect_expired_removes_idle_sessions(tmp_path):
+    """Ensures sessions idle for longer than the TTL are garbage-collected."""
+
+    # Arrange
+    repo = UploadSessionRepository(staging_dir=str(tmp_path / ".staging"), chunk_size=4, session_ttl_seconds=60)
+    idle_id = uuid.UUID(repo.create_session("old.mp4", 4)["session_id"])
+    active_id = uuid.UUID(repo.create_session("new.mp4", 4)["session_id"])
+    an_hour_ago = time.time() - 3600
+    os.utime(tmp_path / ".staging" / str(idle_id), (an_hour_ago, an_hour_ago))
+
+    # Act
+    removed = repo.collect_expired()
+
+    # Assert
+    assert removed == 1
+    with pytest.raises(ex.UploadSessionNotFoundException):
+        repo.get_session(idle_id)
+    assert repo.get_session(active_id)["filename"] == "new.mp4"
+
+@pytest.mark.unit
+def test_collect_expired_spares_a_session_claimed_near_its_ttl(tmp_path):
+    """Ensures a session claimed for assembly just before expiring is not removed mid-assembly."""
+
+    # Arrange
+    repo = UploadSessionRepository(staging_dir=str(tmp_path / ".staging"), chunk_size=4, session_ttl_seconds=60)
+    session = repo.create_session("video.mp4", 4)
+    session_id = uuid.UUID(session["session_id"])
+    repo.write_chunk(session_id, 0, [b"0123"])
+    almost_expired = time.time() - 59
+    os.utime(tmp_path / ".staging" / str(session_id), (almost_expired, almost_expired))
+
+    # Act: half a minute into the assembly, the old chunk activity alone would be past the TTL
+    repo.claim_session(session_id)
+    repo.SESSION_TTL_SECONDS = 30
+    removed = repo.collect_expired()
+
+    # Assert
+    assert removed == 0
+    assert b"".join(repo.iter_claimed_chunks(session_id, 1)) == b"0123"
+
+@pytest.mark.unit
+def test_write_chunk_racing_completion_reports_the_session_gone(tmp_path):
+    """Ensures a chunk that arrives while the session is claimed or removed raises UploadSessionNotFoundException, not FileNotFoundError."""
+
+    # Arrange
+    repo = UploadSessionRepository(staging_dir=str(tmp_path / ".staging"), chunk_size=4)
+    claimed = uuid.UUID(repo.create_session("video.mp4", 8)["session_id"])
+    removed = uuid.UUID(repo.create_session("video.mp4", 8)["session_id"])
+
+    def chunks_claimed_midway():
+        yield b"01"
+        repo.claim_session(claimed)
+        yield b"23"
+
+    # Act / Assert
+    with pytest.raises(ex.UploadSessionNotFoundException):
+        repo.write_chunk(claimed, 0, chunks_claimed_midway())
+
+    # Removed between reading the session record and staging the chunk
+    session = repo.get_session(removed)
+    repo.delete_session(removed)
+    repo.get_session = lambda session_id: session
+    with pytest.raises(ex.UploadSessionNotFoundException):
+        repo.write_chunk(removed, 0, [b"0123"])
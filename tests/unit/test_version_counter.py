@@ -0,0 +1,79 @@
+import multiprocessing
+import pytest
+from filelock import FileLock
+from app.repositories.version_counter import SharedVersionCounter
+from app.repositories.metadata_repository import MetadataRepository
+from app.repositories.journal_metadata_repository import JournalMetadataRepository
+
+def bump_in_child(path: str, times: int):
+    """Bump the counter from another process, under the same lock as the parent."""
+
+    counter = SharedVersionCounter(path)
+    for _ in range(times):
+        with FileLock(f"{path}.lock"):
+            counter.bump()
+
+@pytest.mark.unit
+def test_bumps_are_seen_by_every_mapping(tmp_path):
+    """Ensures a bump through one mapping is read by another, and the epoch survives reopening."""
+
+    # Arrange
+    path = str(tmp_path / "metadata.json.version")
+    first = SharedVersionCounter(path)
+    second = SharedVersionCounter(path)
+    epoch, initial = first.read()
+
+    # Act
+    first.bump()
+    first.bump()
+
+    # Assert
+    assert initial == 0
+    assert second.read() == (epoch, 2)
+    assert SharedVersionCounter(path).token() == f"{epoch:016x}-2"
+
+@pytest.mark.unit
+def test_bumps_from_two_processes_are_not_lost(tmp_path):
+    """Verifies locked bumps from a second process and this one all land in the shared file."""
+
+    # Arrange
+    path = str(tmp_path / "metadata.json.version")
+    counter = SharedVersionCounter(path)
+    child = multiprocessing.get_context("spawn").Process(target=bump_in_child, args=(path, 200))
+
+    # Act
+    child.start()
+    for _ in range(200):
+        with FileLock(f"{path}.lock"):
+            counter.bump()
+    child.join()
+
+    # Assert
+    assert child.exitcode == 0
+    assert counter.read()[1] == 400
+
+@pytest.mark.unit
+@pytest.mark.parametrize("repository", [MetadataRepository, JournalMetadataRepository])
+def test_every_metadata_write_bumps_the_version(tmp_path, repository):
+    """Ensures writes, appends, updates and compaction each move the shared version."""
+
+    # Arrange
+    repo = repository(metadata_file=str(tmp_path / "metadata.json"))
+    versions = [repo.metadata_version()]
+
+    # Act
+    repo.write_metadata([])
+    versions.append(repo.metadata_version())
+    file_id = repo.add_metadata("a.txt", 1)
+    versions.append(repo.metadata_version())
+    repo.add_metadata_batch([{"filename": "b.txt", "file_size": 2}])
+    versions.append(repo.metadata_version())
+    repo.update_metadata(file_id, {"filename": "c.txt"})
+    versions.append(repo.metadata_version())
+    repo.read_metadata()
+    versions.append(repo.metadata_version())
+
+    # Assert
+    assert len(set(versions)) == 5
+    assert versions[-1] == versions[-2]
+    assert [entry["filename"] for entry in repo.read_metadata()] == ["c.txt", "b.txt"]